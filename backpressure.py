@@ -0,0 +1,74 @@
+"""
+High-water marks, política de backpressure e contagem de descartes.
+
+Por padrão um socket PUB descarta em silêncio as mensagens de subscribers
+lentos quando a fila atinge o HWM (1000 mensagens). Com uma política
+configurada, o publisher ativa ZMQ_XPUB_NODROP, de modo que a fila cheia
+aparece como zmq.Again e pode ser tratada e contada:
+
+- DROP: descarta a mensagem mais nova e contabiliza o descarte
+- BLOCK: aguarda espaço na fila por até `timeout` ms antes de descartar
+- CONFLATE: mantém apenas a última mensagem pendente do tópico ("último
+  valor", ex.: SISTEMA) e a reenvia assim que houver espaço
+
+Observação: com ZMQ_XPUB_NODROP, uma fila cheia bloqueia a mensagem para
+todos os subscribers do tópico, não só para o lento.
+"""
+
+import zmq
+
+DROP = "drop"
+BLOCK = "block"
+CONFLATE = "conflate"
+POLICIES = (DROP, BLOCK, CONFLATE)
+
+
+class DropCounter:
+    """Contagem de mensagens descartadas, no total e por tópico"""
+
+    def __init__(self):
+        self.total = 0
+        self.by_topic = {}
+
+    def record(self, topic, count=1):
+        """Registra `count` mensagens descartadas no tópico"""
+        self.total += count
+        self.by_topic[topic] = self.by_topic.get(topic, 0) + count
+
+    def __repr__(self):
+        return f"DropCounter(total={self.total}, by_topic={self.by_topic})"
+
+
+def configure_send(socket, hwm=None, policy=None, timeout=100):
+    """
+    Configura o lado de envio (PUB/XPUB). Deve ser chamado antes do bind/connect.
+
+    Args:
+        hwm: Limite da fila de envio por subscriber (None = padrão do ZeroMQ)
+        policy: DROP, BLOCK ou CONFLATE; None mantém o descarte silencioso
+        timeout: Espera máxima em ms da política BLOCK
+    """
+    if policy is not None and policy not in POLICIES:
+        raise ValueError(f"Política inválida: {policy!r}. Use uma de {POLICIES}")
+    if hwm is not None:
+        socket.setsockopt(zmq.SNDHWM, hwm)
+    if policy is not None:
+        socket.setsockopt(zmq.XPUB_NODROP, 1)
+        socket.setsockopt(zmq.SNDTIMEO, timeout)
+
+
+def configure_recv(socket, hwm=None, conflate=False, multipart=False):
+    """
+    Configura o lado de recebimento (SUB). Deve ser chamado antes do connect.
+
+    Args:
+        hwm: Limite da fila de recebimento (None = padrão do ZeroMQ)
+        conflate: Mantém apenas a última mensagem recebida (ZMQ_CONFLATE)
+        multipart: ZMQ_CONFLATE não suporta mensagens multipart
+    """
+    if conflate and multipart:
+        raise ValueError("ZMQ_CONFLATE não suporta mensagens multipart")
+    if hwm is not None:
+        socket.setsockopt(zmq.RCVHWM, hwm)
+    if conflate:
+        socket.setsockopt(zmq.CONFLATE, 1)
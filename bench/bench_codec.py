@@ -0,0 +1,132 @@
+"""
+Benchmark do codec binário (codec.py) contra o formato JSON original de
+ChatExtendido.send_structured_message.
+
+Mede, por mensagem:
+- encode: montagem do payload no publisher
+- decode: leitura completa no subscriber
+- filtro: leitura apenas da prioridade (para descartar mensagens)
+
+e o JSON original comprimido com zlib e dicionário treinado (compression.py).
+
+Uso:
+    python bench/bench_codec.py [--json]
+"""
+
+import json
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+import compression
+
+TOPIC = "SD"
+USERNAME = "Professor"
+MESSAGE = "Compartilhou: Slides_ZeroMQ.pdf"
+METADATA = {
+    "priority": "high",
+    "type": "file",
+    "filename": "Slides_ZeroMQ.pdf",
+    "url": "https://exemplo.com/slides.pdf",
+}
+
+
+def legacy_encode():
+    msg_data = {
+        "topic": TOPIC,
+        "username": USERNAME,
+        "message": MESSAGE,
+        "timestamp": time.time(),
+        "formatted_time": "14:00:00",
+        "metadata": METADATA,
+    }
+    return f"{TOPIC} {json.dumps(msg_data, ensure_ascii=False)}".encode("utf-8")
+
+
+def legacy_decode(raw):
+    topic, body = raw.decode("utf-8").split(" ", 1)
+    return json.loads(body)
+
+
+def codec_encode(name):
+    payload = codec.encode_structured(USERNAME, MESSAGE, time.time(), "14:00:00", METADATA, name)
+    return f"{TOPIC} ".encode("utf-8") + payload
+
+
+def codec_decode(raw):
+    return codec.decode_structured(memoryview(raw)[len(TOPIC) + 1:])
+
+
+def codec_priority(raw):
+    return codec.peek(memoryview(raw)[len(TOPIC) + 1:])[2]
+
+
+def compressed_encode(compressor):
+    return compressor.compress(TOPIC, legacy_encode()[len(TOPIC) + 1:])[0]
+
+
+def compressed_decode(decompressor, raw):
+    return json.loads(decompressor.decompress(raw))
+
+
+def measure(func, *args, number=100_000):
+    """Tempo médio por chamada, em microssegundos"""
+    return min(timeit.repeat(lambda: func(*args), number=number, repeat=3)) / number * 1e6
+
+
+def run():
+    legacy_raw = legacy_encode()
+    results = {
+        "json_original": {
+            "bytes": len(legacy_raw),
+            "encode_us": measure(legacy_encode),
+            "decode_us": measure(legacy_decode, legacy_raw),
+            "filter_us": measure(lambda raw: legacy_decode(raw)["metadata"]["priority"], legacy_raw),
+        }
+    }
+
+    codecs = ["json"] + (["msgpack"] if codec.msgpack is not None else [])
+    for name in codecs:
+        raw = codec_encode(name)
+        results[f"binario_{name}"] = {
+            "bytes": len(raw),
+            "encode_us": measure(codec_encode, name),
+            "decode_us": measure(codec_decode, raw),
+            "filter_us": measure(codec_priority, raw),
+        }
+
+    # Corpo JSON (sem o prefixo do tópico), com o dicionário já treinado;
+    # a mensagem se repete, então é o melhor caso da compressão
+    compressor = compression.Compressor(threshold=0)
+    decompressor = compression.Decompressor()
+    for _ in range(compressor.train_every):
+        body, announcement = compressor.compress(TOPIC, legacy_encode()[len(TOPIC) + 1:])
+        if announcement is not None:
+            decompressor.decompress(announcement)
+    raw = compressed_encode(compressor)
+    results["json_zlib_dicionario"] = {
+        "bytes": len(raw) + len(TOPIC) + 1,
+        "encode_us": measure(compressed_encode, compressor),
+        "decode_us": measure(compressed_decode, decompressor, raw),
+        "filter_us": measure(lambda raw: compressed_decode(decompressor, raw)["metadata"]["priority"], raw),
+    }
+    return results
+
+
+def main():
+    results = run()
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'formato':<22}{'bytes':>8}{'encode µs':>12}{'decode µs':>12}{'filtro µs':>12}")
+    for name, r in results.items():
+        print(f"{name:<22}{r['bytes']:>8}{r['encode_us']:>12.2f}{r['decode_us']:>12.2f}{r['filter_us']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
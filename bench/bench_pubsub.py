@@ -0,0 +1,185 @@
+"""
+Benchmark de vazão e latência do caminho ChatPublisher -> ChatSubscriber.
+
+Cada execução cria um publisher (multipart, XPUB com política BLOCK para não
+perder mensagens) e N subscribers no mesmo contexto, cada um inscrito em
+todos os tópicos do teste e recebendo em sua própria thread. A latência
+ponta a ponta vem do `sent_at` embutido no cabeçalho de cada mensagem.
+
+Varre todas as combinações de transporte, tamanho da mensagem, número de
+tópicos, número de subscribers e tamanho do lote, e informa:
+- msgs/s publicadas e entregues, MB/s entregues
+- latência p50/p99/p999 em microssegundos
+
+Uso:
+    python bench/bench_pubsub.py [--transportes inproc,ipc,tcp] [--tamanhos 64,4096]
+        [--topicos 1,8] [--subscribers 1,4] [--lotes 1,100] [--mensagens 20000] [--json]
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zmq
+
+from backpressure import BLOCK
+from console import ConsoleSink
+from publisher import ChatPublisher
+from subscriber import ChatSubscriber
+
+TRANSPORTS = ("inproc", "ipc", "tcp")
+IDLE_TIMEOUT = 5000  # ms sem mensagens até o subscriber desistir
+
+
+def endpoint(transport, directory):
+    """Endereço de bind de cada transporte (tcp em porta livre)"""
+    if transport == "inproc":
+        return "inproc://bench"
+    if transport == "ipc":
+        return f"ipc://{os.path.join(directory, 'bench.ipc')}"
+    return "tcp://127.0.0.1:*"
+
+
+def percentile(values, fraction):
+    """Percentil de uma lista já ordenada"""
+    if not values:
+        return None
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def receive(subscriber, expected, latencies):
+    """Recebe `expected` mensagens e registra a latência de cada uma"""
+    received = 0
+    while received < expected and subscriber.socket.poll(IDLE_TIMEOUT):
+        message = subscriber.recv()
+        latencies.append(time.time() - message.sent_at)
+        received += 1
+
+
+def run_case(transport, size, topics, subscribers, batch, messages, directory):
+    """Executa uma combinação e retorna suas métricas"""
+    context = zmq.Context()
+    topic_names = [f"BENCH{i}" for i in range(topics)]
+    payload = b"x" * size
+    # Console silenciado: os construtores imprimem banners e avisos
+    console = ConsoleSink(sample=0, summary_interval=0, stream=io.StringIO())
+    with contextlib.redirect_stdout(io.StringIO()):
+        publisher = ChatPublisher(
+            multipart=True, track_subscriptions=True, policy=BLOCK, send_timeout=-1,
+            context=context, address=endpoint(transport, directory), console=console,
+            announce=False
+        )
+        address = publisher.address
+        clients = []
+        for i in range(subscribers):
+            client = ChatSubscriber(f"bench{i}", multipart=True, context=context, address=address,
+                                    console=console)
+            client.available_topics = topic_names
+            client.subscribe_to_all()
+            clients.append(client)
+    publisher.subscriptions.wait(subscribers * topics, timeout=10.0)
+
+    latencies = [[] for _ in clients]
+    threads = [
+        threading.Thread(target=receive, args=(client, messages, samples))
+        for client, samples in zip(clients, latencies)
+    ]
+    for thread in threads:
+        thread.start()
+
+    stream = [(topic_names[i % topics], "bench", payload) for i in range(messages)]
+    start = time.perf_counter()
+    sent = 0
+    for i in range(0, messages, batch):
+        sent += publisher.publish_batch(stream[i:i + batch])
+    published = time.perf_counter() - start
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    samples = sorted(latency for client_samples in latencies for latency in client_samples)
+    delivered = len(samples)
+    for client in clients:
+        client.socket.close(linger=0)
+    publisher.socket.close(linger=0)
+    console.close()
+    context.term()
+
+    return {
+        "transporte": transport,
+        "tamanho": size,
+        "topicos": topics,
+        "subscribers": subscribers,
+        "lote": batch,
+        "enviadas": sent,
+        "entregues": delivered,
+        "perdidas": sent * subscribers - delivered,
+        "msgs_s_publicadas": sent / published,
+        "msgs_s_entregues": delivered / elapsed,
+        "mb_s": delivered * size / elapsed / 1e6,
+        "p50_us": _us(percentile(samples, 0.50)),
+        "p99_us": _us(percentile(samples, 0.99)),
+        "p999_us": _us(percentile(samples, 0.999)),
+    }
+
+
+def _us(seconds):
+    return None if seconds is None else seconds * 1e6
+
+
+def _option(name, default):
+    """Lista de valores de uma opção --nome a,b,c"""
+    if name not in sys.argv:
+        return default
+    return sys.argv[sys.argv.index(name) + 1].split(",")
+
+
+def run():
+    transports = _option("--transportes", list(TRANSPORTS))
+    sizes = [int(v) for v in _option("--tamanhos", [64, 4096])]
+    topic_counts = [int(v) for v in _option("--topicos", [1, 8])]
+    subscriber_counts = [int(v) for v in _option("--subscribers", [1, 4])]
+    batches = [int(v) for v in _option("--lotes", [1, 100])]
+    messages = int(_option("--mensagens", [20000])[0])
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for transport in transports:
+            for size in sizes:
+                for topics in topic_counts:
+                    for subscribers in subscriber_counts:
+                        for batch in batches:
+                            results.append(run_case(
+                                transport, size, topics, subscribers, batch, messages, directory
+                            ))
+    return {
+        "pyzmq": zmq.__version__,
+        "libzmq": zmq.zmq_version(),
+        "mensagens": messages,
+        "resultados": results,
+    }
+
+
+def main():
+    report = run()
+    if "--json" in sys.argv:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'transp':<8}{'bytes':>7}{'tóp':>5}{'subs':>6}{'lote':>6}"
+          f"{'pub msg/s':>12}{'ent msg/s':>12}{'MB/s':>9}{'p50 µs':>10}{'p99 µs':>10}{'p999 µs':>10}")
+    for r in report["resultados"]:
+        print(f"{r['transporte']:<8}{r['tamanho']:>7}{r['topicos']:>5}{r['subscribers']:>6}{r['lote']:>6}"
+              f"{r['msgs_s_publicadas']:>12.0f}{r['msgs_s_entregues']:>12.0f}{r['mb_s']:>9.1f}"
+              f"{r['p50_us'] or 0:>10.0f}{r['p99_us'] or 0:>10.0f}{r['p999_us'] or 0:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark de escalabilidade do ShardedPublisher (sharded.py).
+
+Publica o mesmo volume de mensagens, distribuídas entre vários tópicos, com
+1, 2, 4, ... processos trabalhadores e informa a vazão agregada (msgs/s do
+primeiro envio até todos os trabalhadores terminarem). Sem subscribers, a
+medida é o custo de formatação e envio, a parte limitada pelo GIL.
+
+Uso:
+    python bench/bench_sharded.py [--trabalhadores 1,2,4] [--mensagens 200000]
+        [--topicos 16] [--tamanho 64] [--json]
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sharded import ShardedPublisher
+
+FRONTEND = ["tcp://127.0.0.1:5601"]
+BACKEND = ["tcp://127.0.0.1:5602"]
+
+
+def _option(name, default):
+    if name not in sys.argv:
+        return default
+    return sys.argv[sys.argv.index(name) + 1]
+
+
+def run_case(workers, messages, topics, size):
+    names = [f"BENCH{i}" for i in range(topics)]
+    payload = b"x" * size
+    publisher = ShardedPublisher(workers, multipart=True, frontend=FRONTEND, backend=BACKEND)
+    start = time.perf_counter()
+    publisher.publish_batch((names[i % topics], "bench", payload) for i in range(messages))
+    stats = publisher.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "trabalhadores": workers,
+        "enviadas": sum(sent for sent, _ in stats.values()),
+        "msgs_s": messages / elapsed,
+        "por_trabalhador": {index: sent for index, (sent, _) in sorted(stats.items())},
+    }
+
+
+def run():
+    workers = [int(v) for v in _option("--trabalhadores", f"1,2,{os.cpu_count() or 1}").split(",")]
+    messages = int(_option("--mensagens", 200000))
+    topics = int(_option("--topicos", 16))
+    size = int(_option("--tamanho", 64))
+    return {
+        "nucleos": os.cpu_count(),
+        "mensagens": messages,
+        "resultados": [run_case(n, messages, topics, size) for n in sorted(set(workers))],
+    }
+
+
+def main():
+    report = run()
+    if "--json" in sys.argv:
+        print(json.dumps(report, indent=2))
+        return
+    base = report["resultados"][0]["msgs_s"]
+    print(f"{'trabalhadores':>14}{'msgs/s':>12}{'escala':>9}")
+    for r in report["resultados"]:
+        print(f"{r['trabalhadores']:>14}{r['msgs_s']:>12.0f}{r['msgs_s'] / base:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
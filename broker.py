@@ -0,0 +1,129 @@
+"""
+Broker XSUB/XPUB do sistema de chat.
+
+Sem o broker, o publisher faz bind em tcp://HOST:PORT e apenas um publisher
+pode existir (um segundo falha com "Address already in use"). Com o broker:
+
+    publishers --connect--> XSUB (BROKER_PORT) ==proxy==> XPUB (PORT) <--connect-- subscribers
+
+Qualquer número de publishers pode se conectar ao frontend. O backend XPUB
+repassa as inscrições dos subscribers para os publishers, de modo que cada
+publisher só transmite os tópicos que têm algum interessado.
+"""
+
+import struct
+import sys
+import threading
+import time
+
+import zmq
+
+from constPS import *
+from endpoints import BROKER, CHAT, bind_all, load_endpoints
+
+# Contadores da resposta a STATISTICS, na ordem do libzmq (uint64 nativos)
+STATISTICS = (
+    "frontend_messages_in", "frontend_bytes_in", "frontend_messages_out", "frontend_bytes_out",
+    "backend_messages_in", "backend_bytes_in", "backend_messages_out", "backend_bytes_out",
+)
+
+
+class ChatBroker:
+    """
+    Proxy XSUB/XPUB controlável (zmq.proxy_steerable).
+
+    Args:
+        frontend: Endpoint(s) onde os publishers se conectam
+            (padrão: endpoints.load_endpoints(BROKER))
+        backend: Endpoint(s) onde os subscribers se conectam
+            (padrão: endpoints.load_endpoints())
+        context: zmq.Context compartilhado (None = usa a instância global)
+    """
+
+    def __init__(self, frontend=None, backend=None, context=None):
+        self.context = context or zmq.Context.instance()
+        self.frontend = self.context.socket(zmq.XSUB)
+        self.frontend_address = ", ".join(
+            bind_all(self.frontend, frontend or load_endpoints(BROKER))
+        )
+
+        self.backend = self.context.socket(zmq.XPUB)
+        # Repassa todas as (des)inscrições, inclusive repetidas, para que os
+        # publishers possam manter contagem de interessados por tópico
+        self.backend.setsockopt(zmq.XPUB_VERBOSER, 1)
+        self.backend_address = ", ".join(bind_all(self.backend, backend or load_endpoints()))
+
+        # Canal de controle: PAUSE, RESUME, TERMINATE e STATISTICS
+        self.control_address = f"inproc://chat-broker-{id(self)}"
+        self.control = self.context.socket(zmq.PAIR)
+        self.control.bind(self.control_address)
+        self._commands = None
+        self._thread = None
+
+    def run(self):
+        """Executa o proxy; bloqueia até receber TERMINATE"""
+        zmq.proxy_steerable(self.frontend, self.backend, None, self.control)
+
+    def start(self):
+        """Executa o proxy em uma thread em segundo plano"""
+        self._commands = self.context.socket(zmq.PAIR)
+        self._commands.connect(self.control_address)
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def send_command(self, command):
+        """
+        Envia um comando ao proxy iniciado com start().
+
+        Returns:
+            Para STATISTICS, {contador: valor} com mensagens e bytes que
+            entraram/saíram do frontend e do backend; None para os demais
+        """
+        self._commands.send(command)
+        if command != b"STATISTICS":
+            return None
+        frames = self._commands.recv_multipart()
+        while len(frames) != len(STATISTICS):
+            # libzmq >= 4.3.5 também responde (vazio) a PAUSE e RESUME
+            frames = self._commands.recv_multipart()
+        return {name: struct.unpack("=Q", frame)[0] for name, frame in zip(STATISTICS, frames)}
+
+    def statistics(self):
+        """Contadores de tráfego do proxy (ver send_command)"""
+        return self.send_command(b"STATISTICS")
+
+    def stop(self):
+        """Encerra o proxy e fecha os sockets"""
+        if self._thread is not None:
+            self.send_command(b"TERMINATE")
+            self._thread.join()
+            self._thread = None
+            self._commands.close(linger=0)
+        self.control.close(linger=0)
+        self.frontend.close(linger=0)
+        self.backend.close(linger=0)
+
+
+def main():
+    # python broker.py --broker-endpoints ... --endpoints ... (ver endpoints.py)
+    broker = ChatBroker(load_endpoints(BROKER, sys.argv), load_endpoints(CHAT, sys.argv))
+
+    print("=" * 60)
+    print("BROKER XSUB/XPUB - SISTEMA DE CHAT POR TÓPICOS")
+    print("=" * 60)
+    print(f"Publishers -> {broker.frontend_address}")
+    print(f"Subscribers -> {broker.backend_address}")
+    print("Pressione Ctrl+C para encerrar")
+    print("=" * 60)
+
+    broker.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nEncerrando broker...")
+    broker.stop()
+
+
+if __name__ == "__main__":
+    main()
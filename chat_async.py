@@ -0,0 +1,201 @@
+"""
+Publisher e subscriber do sistema de chat sobre asyncio (zmq.asyncio).
+
+Diferente de ChatSubscriber, que usa uma thread por cliente com polling de
+100ms, aqui cada subscriber é apenas uma corrotina aguardando o socket:
+um único event loop hospeda milhares de subscribers sem threads extras.
+
+Uso:
+    async for message in subscriber:
+        print(message)
+"""
+
+import asyncio
+import time
+
+import zmq
+import zmq.asyncio
+
+from constPS import *
+from endpoints import bind_all, connect_first, load_endpoints
+from protocolo import Message, encode_frames, format_text
+from subscriptions import SubscriptionTable, create_xpub
+from topics import TopicTrie, is_pattern, subscription_filter
+
+
+class AsyncChatPublisher:
+    """
+    Publisher assíncrono para o sistema de chat.
+
+    Args:
+        multipart: Envia [tópico, cabeçalho, corpo] em frames separados
+        context: zmq.asyncio.Context compartilhado (None = usa a instância global)
+        address: Endpoint ou lista de endpoints para bind (padrão:
+            endpoints.load_endpoints())
+        track_subscriptions: Usa um socket XPUB e acompanha as inscrições,
+            para aguardar os subscribers com wait_for_subscribers()
+    """
+
+    def __init__(self, multipart=False, context=None, address=None, track_subscriptions=False):
+        self.multipart = multipart
+        self.context = context or zmq.asyncio.Context.instance()
+        if track_subscriptions:
+            self.socket = create_xpub(self.context)
+            # A tabela lê as notificações sem bloquear por um socket
+            # síncrono sobre o mesmo socket do libzmq
+            self.subscriptions = SubscriptionTable(zmq.Socket.shadow(self.socket.underlying))
+        else:
+            self.socket = self.context.socket(zmq.PUB)
+            self.subscriptions = None
+        self.address = ", ".join(bind_all(self.socket, address or load_endpoints()))
+
+    async def wait_for_subscribers(self, expected=1, topic=None, timeout=5.0):
+        """
+        Aguarda, sem bloquear o event loop, até haver `expected` inscrições
+        (no tópico ou no total); requer track_subscriptions.
+
+        Returns:
+            True se atingiu o esperado, False se o timeout expirou
+        """
+        subscriptions = self.subscriptions
+        deadline = time.monotonic() + timeout
+        subscriptions.update()
+        while subscriptions.count(topic) < expected:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not await self.socket.poll(int(remaining * 1000) + 1):
+                return False
+            subscriptions.update()
+        return True
+
+    async def send_message(self, topic, username, message):
+        """Envia uma mensagem para um tópico específico"""
+        timestamp = time.strftime("%H:%M:%S")
+        if self.multipart:
+            frames = encode_frames(topic, timestamp, username, message)
+            await self.socket.send_multipart(frames, copy=False)
+        else:
+            await self.socket.send_string(format_text(topic, timestamp, username, message))
+
+    async def send_system_message(self, message):
+        """Envia uma mensagem do sistema para o tópico SISTEMA"""
+        await self.send_message("SISTEMA", "[SISTEMA]", message)
+
+    def close(self):
+        """Fecha o socket sem aguardar mensagens pendentes"""
+        self.socket.close(linger=0)
+
+
+class AsyncChatSubscriber:
+    """
+    Subscriber assíncrono, iterável com `async for` (produz protocolo.Message).
+
+    Args:
+        username: Nome do usuário
+        multipart: Recebe mensagens multipart (deve coincidir com o publisher)
+        context: zmq.asyncio.Context compartilhado (None = usa a instância global)
+        address: Endpoint ou lista de endpoints; conecta no primeiro
+            (padrão: endpoints.load_endpoints(); aceita inproc://)
+    """
+
+    def __init__(self, username, multipart=False, context=None, address=None):
+        self.username = username
+        self.multipart = multipart
+        self.context = context or zmq.asyncio.Context.instance()
+        self.socket = self.context.socket(zmq.SUB)
+        self.address = connect_first(self.socket, address or load_endpoints(), inproc=True)
+        # tópico ou padrão -> filtro do ZeroMQ (ver ChatSubscriber)
+        self.subscribed_topics = {}
+        self.topic_index = TopicTrie()
+        self.wildcards = 0
+
+    def subscribe_to_topic(self, topic):
+        """Inscreve-se em um tópico específico ou em um padrão com curingas"""
+        if topic in self.subscribed_topics:
+            return False
+        subscription = subscription_filter(topic, self.multipart)
+        self.socket.setsockopt(zmq.SUBSCRIBE, subscription)
+        self.subscribed_topics[topic] = subscription
+        self.topic_index.add(topic)
+        if is_pattern(topic):
+            self.wildcards += 1
+        return True
+
+    def unsubscribe_from_topic(self, topic):
+        """Cancela inscrição de um tópico"""
+        if topic not in self.subscribed_topics:
+            return False
+        self.socket.setsockopt(zmq.UNSUBSCRIBE, self.subscribed_topics.pop(topic))
+        self.topic_index.remove(topic)
+        if is_pattern(topic):
+            self.wildcards -= 1
+        return True
+
+    async def recv(self):
+        """Recebe a próxima mensagem como Message (decodificação preguiçosa)"""
+        while True:
+            if self.multipart:
+                message = Message.from_frames(await self.socket.recv_multipart(copy=False))
+            else:
+                message = Message(await self.socket.recv())
+            # Descarta o que chegou pelo prefixo de um padrão sem casar com ele
+            if not self.wildcards or self.topic_index.match(message.topic):
+                return message
+
+    async def recv_message(self):
+        """Recebe uma mensagem e retorna sua representação texto"""
+        return str(await self.recv())
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.recv()
+        except zmq.ZMQError as e:
+            # Socket já fechado quando a espera começou encerra a iteração
+            if e.errno in (zmq.ENOTSOCK, zmq.ETERM):
+                raise StopAsyncIteration
+            raise
+        except asyncio.CancelledError:
+            # close() cancela o recv pendente: fim da iteração, não da tarefa
+            if self.socket.closed:
+                raise StopAsyncIteration
+            raise
+
+    def close(self):
+        """Fecha o socket; iterações `async for` em andamento terminam normalmente"""
+        self.socket.close(linger=0)
+
+
+async def main(num_subscribers=1000):
+    """Demonstração: um publisher e milhares de subscribers em um único loop"""
+    publisher = AsyncChatPublisher(track_subscriptions=True)
+    subscribers = [AsyncChatSubscriber(f"user{i}") for i in range(num_subscribers)]
+    for subscriber in subscribers:
+        subscriber.subscribe_to_topic("GERAL")
+
+    received = 0
+
+    async def consume(subscriber):
+        nonlocal received
+        async for message in subscriber:
+            received += 1
+
+    tasks = [asyncio.create_task(consume(subscriber)) for subscriber in subscribers]
+    # Envia assim que todas as inscrições chegaram ao publisher
+    if not await publisher.wait_for_subscribers(num_subscribers, "GERAL", timeout=10.0):
+        print(f"Aviso: {publisher.subscriptions.count('GERAL')} de {num_subscribers} inscrições")
+
+    await publisher.send_message("GERAL", "Admin", "Olá a todos!")
+    await asyncio.sleep(1)
+    print(f"{num_subscribers} subscribers em um único event loop receberam {received} mensagens")
+
+    for task in tasks:
+        task.cancel()
+    for subscriber in subscribers:
+        subscriber.close()
+    publisher.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+"""
+Codec binário para as mensagens estruturadas de ChatExtendido.
+
+O formato original envia "TOPICO {json}" e obriga o subscriber a fazer
+split + json.loads em toda mensagem, mesmo para ler apenas a prioridade.
+Aqui a mensagem começa com um cabeçalho binário de tamanho fixo:
+
+    versão (uint8) | timestamp (float64) | prioridade (uint8) | tipo (uint8)
+
+seguido do corpo (usuário, texto, horário formatado e demais metadados). O
+byte de versão identifica o codec do corpo: JSON (stdlib) ou msgpack (se o
+pacote estiver instalado). Prioridade e tipo são lidos com peek() sem
+decodificar o corpo, permitindo filtrar/rotear mensagens a custo O(1).
+"""
+
+import json
+import struct
+
+try:
+    import msgpack
+except ImportError:  # msgpack é opcional
+    msgpack = None
+
+HEADER = struct.Struct("!BdBB")
+
+# Byte de versão -> codec do corpo
+VERSION_JSON = 1
+VERSION_MSGPACK = 2
+CODECS = {"json": VERSION_JSON, "msgpack": VERSION_MSGPACK}
+
+# Enumerações do cabeçalho; 0 = não informado (valores desconhecidos
+# continuam nos metadados do corpo)
+PRIORITIES = (None, "low", "normal", "high")
+TYPES = (None, "file", "poll")
+_PRIORITY_CODES = {name: code for code, name in enumerate(PRIORITIES) if name}
+_TYPE_CODES = {name: code for code, name in enumerate(TYPES) if name}
+
+
+def _encode_body(version, data):
+    if version == VERSION_MSGPACK:
+        return msgpack.packb(data, use_bin_type=True)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _decode_body(version, body):
+    if version == VERSION_MSGPACK:
+        if msgpack is None:
+            raise ImportError("Mensagem em msgpack recebida, mas o pacote msgpack não está instalado")
+        return msgpack.unpackb(body, raw=False)
+    if version == VERSION_JSON:
+        return json.loads(bytes(body))
+    raise ValueError(f"Versão de codec desconhecida: {version}")
+
+
+def encode_structured(username, message, timestamp, formatted_time, metadata=None, codec="json"):
+    """
+    Codifica uma mensagem estruturada: cabeçalho binário + corpo.
+
+    Args:
+        codec: "json" ou "msgpack" (requer o pacote msgpack)
+
+    Returns:
+        bytes prontos para envio
+    """
+    version = CODECS[codec]
+    if version == VERSION_MSGPACK and msgpack is None:
+        raise ImportError("codec 'msgpack' requer o pacote msgpack (pip install msgpack)")
+
+    metadata = dict(metadata or {})
+    priority = _PRIORITY_CODES.get(metadata.get("priority"), 0)
+    msg_type = _TYPE_CODES.get(metadata.get("type"), 0)
+    if priority:
+        del metadata["priority"]
+    if msg_type:
+        del metadata["type"]
+
+    body = _encode_body(version, {
+        "username": username,
+        "message": message,
+        "formatted_time": formatted_time,
+        "metadata": metadata,
+    })
+    return HEADER.pack(version, timestamp, priority, msg_type) + body
+
+
+def is_structured(payload):
+    """Indica se o payload começa com um byte de versão conhecido"""
+    return len(payload) >= HEADER.size and payload[0] in (VERSION_JSON, VERSION_MSGPACK)
+
+
+def peek(payload):
+    """
+    Lê apenas o cabeçalho, sem decodificar o corpo.
+
+    Returns:
+        (versao, timestamp, prioridade, tipo) com prioridade/tipo como nomes
+        (None quando não informados)
+    """
+    version, timestamp, priority, msg_type = HEADER.unpack_from(payload)
+    return version, timestamp, PRIORITIES[priority], TYPES[msg_type]
+
+
+def decode_structured(payload):
+    """
+    Decodifica cabeçalho e corpo no mesmo dicionário do formato JSON original
+    (sem o tópico, que vem no frame/prefixo da mensagem).
+    """
+    version, timestamp, priority, msg_type = peek(payload)
+    data = _decode_body(version, memoryview(payload)[HEADER.size:])
+    data["timestamp"] = timestamp
+    if priority:
+        data["metadata"]["priority"] = priority
+    if msg_type:
+        data["metadata"]["type"] = msg_type
+    return data
@@ -0,0 +1,245 @@
+"""
+Compressão por tópico dos corpos das mensagens estruturadas.
+
+JSON de chat é repetitivo (mesmas chaves, usuários, URLs) e comprime bem,
+mas mensagens curtas quase não ganham nada com um compressor genérico. Aqui
+cada tópico tem um limite de tamanho (abaixo dele o corpo segue como está)
+e, no zlib, um dicionário compartilhado treinado com as mensagens recentes
+do próprio tópico, o que faz até mensagens pequenas encolherem.
+
+Um corpo comprimido começa com um envelope de tamanho fixo:
+
+    marcador 0xC1 (uint8) | algoritmo (uint8) | id do dicionário (uint32)
+
+0xC1 nunca inicia um texto UTF-8 válido nem um payload do codec binário,
+então o marcador basta para distinguir corpos comprimidos dos demais.
+
+O dicionário é enviado no próprio tópico (algoritmo DICTIONARY) antes da
+primeira mensagem que o usa e reenviado periodicamente, para subscribers
+que entram depois. O Decompressor guarda os dicionários recebidos e só
+descomprime um corpo quando ele é lido.
+"""
+
+import struct
+import threading
+import zlib
+from collections import OrderedDict, deque
+
+try:
+    import lz4.frame
+except ImportError:  # lz4 é opcional
+    lz4 = None
+
+MARKER = 0xC1
+ENVELOPE = struct.Struct("!BBI")
+
+# Byte de algoritmo do envelope
+ZLIB = 1
+LZ4 = 2
+DICTIONARY = 3
+ALGORITHMS = {"zlib": ZLIB, "lz4": LZ4}
+
+# zlib sem cabeçalho/checksum (wbits negativo): o envelope já identifica
+WBITS = -15
+
+
+class MissingDictionary(LookupError):
+    """Corpo comprimido com um dicionário que ainda não foi anunciado"""
+
+
+def is_compressed(payload):
+    """Indica se o corpo começa com o envelope de compressão"""
+    return len(payload) >= ENVELOPE.size and payload[0] == MARKER
+
+
+class _TopicState:
+    __slots__ = ("samples", "sampled", "messages", "dictionary", "dictionary_id", "template",
+                 "since_announce")
+
+    def __init__(self, history):
+        self.samples = deque(maxlen=history)
+        self.sampled = 0
+        self.messages = 0
+        self.dictionary = None
+        self.dictionary_id = 0
+        self.template = None
+        self.since_announce = 0
+
+
+class Compressor:
+    """
+    Compressor do publisher, com limite e dicionário por tópico.
+
+    Args:
+        algorithm: "zlib" (padrão, com dicionário treinado) ou "lz4"
+            (lz4.frame, mais rápido e sem dicionário; requer o pacote lz4)
+        threshold: Tamanho mínimo, em bytes, de um corpo comprimido
+        topic_thresholds: Limites por tópico, ex.: {"AVISOS": 128}; None
+            desliga a compressão do tópico
+        level: Nível do zlib (1 a 9)
+        dictionary_size: Tamanho máximo do dicionário, em bytes
+        train_every: Mensagens de um tópico entre dois treinos do dicionário
+            (0 = sem dicionário)
+        announce_every: Mensagens entre reenvios do dicionário em uso
+    """
+
+    def __init__(self, algorithm="zlib", threshold=256, topic_thresholds=None, level=6,
+                 dictionary_size=16384, train_every=200, announce_every=100):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Algoritmo de compressão desconhecido: {algorithm}")
+        if algorithm == "lz4" and lz4 is None:
+            raise ImportError("compressão 'lz4' requer o pacote lz4 (pip install lz4)")
+        self.algorithm = ALGORITHMS[algorithm]
+        self.threshold = threshold
+        self.topic_thresholds = topic_thresholds or {}
+        self.level = level
+        self.dictionary_size = dictionary_size
+        self.train_every = train_every if self.algorithm == ZLIB else 0
+        self.announce_every = announce_every
+        self.topics = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _state(self, topic):
+        state = self.topics.get(topic)
+        if state is None:
+            # Amostras suficientes para preencher o dicionário
+            state = self.topics[topic] = _TopicState(max(self.dictionary_size // 64, 16))
+        return state
+
+    def compress(self, topic, body):
+        """
+        Comprime o corpo se o tópico permitir e o tamanho passar do limite.
+
+        Returns:
+            (corpo, anúncio) - anúncio é o corpo de uma mensagem de
+            dicionário a enviar antes desta no mesmo tópico, ou None
+        """
+        threshold = self.topic_thresholds.get(topic, self.threshold)
+        if threshold is None:
+            return body, None
+        state = self._state(topic)
+        announcement = None
+
+        if self.train_every:
+            if len(body) >= 32:
+                state.samples.append(bytes(body[:1024]))
+                state.sampled += 1
+                if state.sampled % self.train_every == 0:
+                    self._train(state)
+                    announcement = self._announcement(state)
+            if announcement is None and state.dictionary is not None:
+                state.since_announce += 1
+                if state.since_announce >= self.announce_every:
+                    announcement = self._announcement(state)
+
+        if len(body) < threshold:
+            return body, announcement
+        if self.algorithm == LZ4:
+            compressed = ENVELOPE.pack(MARKER, LZ4, 0) + lz4.frame.compress(body)
+        elif state.template is not None:
+            compressor = state.template.copy()
+            compressed = (ENVELOPE.pack(MARKER, ZLIB, state.dictionary_id)
+                          + compressor.compress(body) + compressor.flush())
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, WBITS)
+            compressed = ENVELOPE.pack(MARKER, ZLIB, 0) + compressor.compress(body) + compressor.flush()
+
+        state.messages += 1
+        self.bytes_in += len(body)
+        if len(compressed) >= len(body):
+            self.bytes_out += len(body)
+            return body, announcement
+        self.bytes_out += len(compressed)
+        return compressed, announcement
+
+    def _train(self, state):
+        """Novo dicionário: as amostras mais recentes, as últimas no fim
+        (o zlib aproveita melhor o final do dicionário)"""
+        dictionary = b"".join(state.samples)[-self.dictionary_size:]
+        state.dictionary = dictionary
+        state.dictionary_id = zlib.crc32(dictionary) or 1
+        state.template = zlib.compressobj(self.level, zlib.DEFLATED, WBITS, zdict=dictionary)
+
+    def _announcement(self, state):
+        state.since_announce = 0
+        return ENVELOPE.pack(MARKER, DICTIONARY, state.dictionary_id) + state.dictionary
+
+    def announce(self, topic=None):
+        """Força o reenvio do dicionário do tópico (None = todos) na próxima
+        mensagem, ex.: quando um subscriber novo se inscreve"""
+        states = self.topics.values() if topic is None else [self._state(topic)]
+        for state in states:
+            state.since_announce = self.announce_every
+
+    def ratio(self):
+        """Bytes enviados / bytes originais dos corpos acima do limite"""
+        return self.bytes_out / self.bytes_in if self.bytes_in else 1.0
+
+
+class Decompressor:
+    """
+    Descompressão no subscriber, com os dicionários anunciados.
+
+    Pode ser compartilhado pelas threads de um HandlerPool: o acesso aos
+    dicionários é protegido por um lock (a descompressão em si não). Com
+    processos, cada um recebe sua cópia, sem o lock.
+
+    Args:
+        max_dictionaries: Dicionários guardados (os mais antigos saem)
+    """
+
+    def __init__(self, max_dictionaries=64):
+        self.dictionaries = OrderedDict()
+        self.max_dictionaries = max_dictionaries
+        self.missing = 0  # corpos com dicionário ainda não recebido
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def decompress(self, payload):
+        """
+        Corpo original de um payload (recebido como bytes/memoryview).
+
+        Returns:
+            O corpo descomprimido; o próprio payload se não estiver
+            comprimido; None para anúncios de dicionário (guardados aqui)
+
+        Raises:
+            MissingDictionary: Se o dicionário do corpo ainda não chegou
+        """
+        if not is_compressed(payload):
+            return payload
+        _, algorithm, dictionary_id = ENVELOPE.unpack_from(payload)
+        data = memoryview(payload)[ENVELOPE.size:]
+
+        if algorithm == DICTIONARY:
+            with self._lock:
+                self.dictionaries[dictionary_id] = bytes(data)
+                self.dictionaries.move_to_end(dictionary_id)
+                while len(self.dictionaries) > self.max_dictionaries:
+                    self.dictionaries.popitem(last=False)
+            return None
+        if algorithm == LZ4:
+            if lz4 is None:
+                raise ImportError("Mensagem em lz4 recebida, mas o pacote lz4 não está instalado")
+            return lz4.frame.decompress(data)
+        if algorithm != ZLIB:
+            raise ValueError(f"Algoritmo de compressão desconhecido: {algorithm}")
+        if not dictionary_id:
+            return zlib.decompress(data, WBITS)
+        with self._lock:
+            dictionary = self.dictionaries.get(dictionary_id)
+            if dictionary is None:
+                self.missing += 1
+        if dictionary is None:
+            raise MissingDictionary(f"Dicionário {dictionary_id:#010x} ainda não recebido")
+        decompressor = zlib.decompressobj(WBITS, zdict=dictionary)
+        return decompressor.decompress(data) + decompressor.flush()
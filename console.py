@@ -0,0 +1,157 @@
+"""
+Saída de console sem bloqueio para os laços de envio e recebimento.
+
+Um print por mensagem faz do terminal o gargalo: enquanto o stdout não
+escoa, a thread de recebimento para de ler o socket e as filas do ZeroMQ
+enchem. O ConsoleSink apenas enfileira a mensagem (fila limitada) e uma
+thread escritora formata e grava em lotes. Se a fila encher, a linha é
+descartada e contada em vez de bloquear.
+
+Modo amostrado: com sample=N só 1 a cada N mensagens é exibida (sample=0
+não exibe nenhuma) e uma linha de resumo periódica informa o total.
+
+Publishers e subscribers sem console explícito compartilham um único sink
+(default_console), com uma única thread escritora por processo.
+"""
+
+import atexit
+import queue
+import sys
+import threading
+import time
+import weakref
+
+_STOP = object()
+
+# Sinks com a thread escritora ativa, encerrados na saída do processo (sem
+# manter vivos os que já foram fechados)
+_open_sinks = weakref.WeakSet()
+_default = None
+_default_lock = threading.Lock()
+
+
+class ConsoleSink:
+    """
+    Escritor de console assíncrono e em lotes.
+
+    Args:
+        maxsize: Capacidade da fila de linhas pendentes
+        batch_size: Máximo de linhas gravadas por escrita
+        sample: Exibe 1 a cada `sample` mensagens (1 = todas, 0 = nenhuma)
+        summary_interval: Segundos entre linhas de resumo; None = 10s no
+            modo amostrado e desligado quando todas são exibidas
+        stream: Destino (padrão: o sys.stdout do momento de cada escrita)
+    """
+
+    def __init__(self, maxsize=10000, batch_size=256, sample=1, summary_interval=None, stream=None):
+        self.queue = queue.Queue(maxsize)
+        self.batch_size = batch_size
+        self.sample = sample
+        if summary_interval is None and sample != 1:
+            summary_interval = 10.0
+        self.summary_interval = summary_interval
+        self.stream = stream
+
+        self.received = 0  # mensagens oferecidas ao console
+        self.shown = 0     # linhas gravadas
+        self.dropped = 0   # linhas descartadas com a fila cheia
+
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        _open_sinks.add(self)
+
+    def message(self, message, prefix=""):
+        """
+        Exibe uma mensagem recebida/enviada, sujeita à amostragem.
+
+        A conversão para texto (str(message)) acontece na thread escritora,
+        então um protocolo.Message só é decodificado se for exibido.
+
+        Returns:
+            True se a linha foi enfileirada
+        """
+        self.received += 1
+        if not self.sample or self.received % self.sample:
+            return False
+        return self._put((prefix, message))
+
+    def notice(self, message, prefix=""):
+        """Exibe uma linha sempre, sem amostragem (avisos, mensagens do sistema)"""
+        return self._put((prefix, message))
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def run(self):
+        """Laço da thread escritora"""
+        interval = self.summary_interval
+        next_summary = time.monotonic() + interval if interval else None
+        last_received = last_shown = 0
+
+        while True:
+            timeout = None if next_summary is None else max(next_summary - time.monotonic(), 0)
+            lines = []
+            stop = False
+            try:
+                item = self.queue.get(timeout=timeout)
+                while True:
+                    if item is _STOP:
+                        stop = True
+                        break
+                    prefix, message = item
+                    lines.append(f"{prefix}{message}")
+                    if len(lines) >= self.batch_size:
+                        break
+                    item = self.queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            self.shown += len(lines)
+            if next_summary is not None and time.monotonic() >= next_summary:
+                lines.append(
+                    f"📊 {self.received - last_received} mensagens em {interval:g}s "
+                    f"({self.shown - last_shown} exibidas, {self.dropped} descartadas pela fila)"
+                )
+                last_received, last_shown = self.received, self.shown
+                next_summary += interval
+
+            if lines:
+                stream = self.stream or sys.stdout
+                stream.write("\n".join(lines) + "\n")
+                stream.flush()
+            if stop:
+                return
+
+    def close(self):
+        """Grava as linhas pendentes e encerra a thread escritora"""
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join(timeout=2)
+        _open_sinks.discard(self)
+
+
+def default_console():
+    """ConsoleSink compartilhado (exibe todas), criado no primeiro uso"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ConsoleSink()
+        return _default
+
+
+@atexit.register
+def _close_sinks():
+    for sink in list(_open_sinks):
+        sink.close()
+
+
+def console_from_args(argv):
+    """ConsoleSink configurado pela opção --amostra N (0 = só resumos)"""
+    if "--amostra" in argv:
+        return ConsoleSink(sample=int(argv[argv.index("--amostra") + 1]))
+    return default_console()
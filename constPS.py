@@ -1,2 +1,35 @@
 HOST = "localhost"
 PORT = "5555"
+
+# Tópicos iniciais; com o registro (registry.py) outros podem ser criados em
+# tempo de execução
+DEFAULT_TOPICS = ["GERAL", "TECNOLOGIA", "ESPORTES", "ENTRETENIMENTO", "NOTICIAS", "SISTEMA"]
+
+# Broker XSUB/XPUB (broker.py): publishers conectam em BROKER_PORT e os
+# subscribers continuam conectando em PORT, agora servida pelo broker
+BROKER_PORT = "5556"
+
+# Histórico de mensagens (message_log.py): diretório do log e porta do
+# serviço de replay consultado por subscribers atrasados
+REPLAY_PORT = "5557"
+LOG_DIR = "historico"
+
+# Retrato dos últimos valores de cada tópico (snapshot.py)
+SNAPSHOT_PORT = "5558"
+
+# Endpoints do canal de chat (endpoints.py): o publisher/broker faz bind em
+# todos e os clientes conectam no primeiro utilizável. Podem ser trocados por
+# CHAT_ENDPOINTS / CHAT_BROKER_ENDPOINTS ou --endpoints / --broker-endpoints,
+# ex.: ipc:///tmp/chat.ipc para processos na mesma máquina
+ENDPOINTS = [f"tcp://{HOST}:{PORT}"]
+BROKER_ENDPOINTS = [f"tcp://{HOST}:{BROKER_PORT}"]
+
+# Métricas (metrics.py): PUB com o tópico STATS e endpoint HTTP /metrics
+# no formato do Prometheus
+STATS_PORT = "5559"
+METRICS_PORT = "9555"
+
+# Registro dinâmico de tópicos (registry.py): pedidos (ROUTER) e feed de
+# alterações (PUB)
+REGISTRY_PORT = "5560"
+REGISTRY_FEED_PORT = "5561"
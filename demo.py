@@ -5,59 +5,68 @@ Este script simula múltiplos usuários interagindo em diferentes tópicos
 
 import zmq
 import time
-import threading
+from console import default_console
 from constPS import *
+from endpoints import bind_all
+from hub import SubscriberHub
+from protocolo import encode_frames, format_text
+from subscriptions import SubscriptionTable, create_xpub
 
 class ChatDemo:
-    """Demonstração automatizada do sistema de chat"""
+    """
+    Demonstração automatizada do sistema de chat
     
-    def __init__(self):
-        # Configurar publisher
+    Args:
+        address: Endpoint(s) do publisher; publisher e usuários simulados
+            compartilham o contexto, então o padrão é inproc:// (sem TCP)
+        console: console.ConsoleSink das mensagens enviadas e recebidas
+    """
+    
+    def __init__(self, multipart=False, address="inproc://chat-demo", console=None):
+        self.multipart = multipart
+        self.console = console or default_console()
+        
+        # Configurar publisher (XPUB: sabe quando cada filtro foi registrado)
         self.context = zmq.Context()
-        self.pub_socket = self.context.socket(zmq.PUB)
-        self.pub_socket.bind(f"tcp://{HOST}:{PORT}")
+        self.pub_socket = create_xpub(self.context)
+        self.address = ", ".join(bind_all(self.pub_socket, address))
+        self.subscriptions = SubscriptionTable(self.pub_socket)
+        
+        # Todos os usuários simulados compartilham um socket SUB e uma thread
+        self.hub = SubscriberHub(multipart=multipart, context=self.context, address=address)
+        self.hub.start()
         
         # Lista de tópicos
-        self.topics = ["GERAL", "TECNOLOGIA", "ESPORTES", "ENTRETENIMENTO", "NOTICIAS", "SISTEMA"]
+        self.topics = list(DEFAULT_TOPICS)
         
         print("=" * 70)
         print("DEMONSTRAÇÃO DO SISTEMA DE CHAT PUBLISH-SUBSCRIBE")
         print("=" * 70)
-        print(f"Servidor iniciado em tcp://{HOST}:{PORT}")
+        print(f"Servidor iniciado em {self.address}")
         print(f"Tópicos disponíveis: {', '.join(self.topics)}")
         print("=" * 70)
-        
-        time.sleep(1)  # Aguardar conexões iniciais
     
     def create_subscriber(self, username, topics_to_subscribe):
-        """Cria um subscriber e inicia thread de recebimento"""
-        sub_socket = self.context.socket(zmq.SUB)
-        sub_socket.connect(f"tcp://{HOST}:{PORT}")
-        
-        # Inscrever nos tópicos
-        for topic in topics_to_subscribe:
-            sub_socket.setsockopt_string(zmq.SUBSCRIBE, topic)
-        
-        def receive_messages():
-            print(f"\n[{username}] Conectado! Inscrito em: {', '.join(topics_to_subscribe)}")
-            while True:
-                try:
-                    if sub_socket.poll(100):
-                        message = sub_socket.recv_string()
-                        print(f"[{username}] 📩 {message}")
-                except:
-                    break
-        
-        thread = threading.Thread(target=receive_messages, daemon=True)
-        thread.start()
-        return sub_socket
+        """Registra um usuário simulado no hub e aguarda seus filtros chegarem ao publisher"""
+        self.hub.add_user(username, topics_to_subscribe, self.print_message)
+        self.subscriptions.wait_for_topics(topics_to_subscribe)
+        print(f"\n[{username}] Conectado! Inscrito em: {', '.join(topics_to_subscribe)}")
+        return username
+    
+    def print_message(self, username, message):
+        """Callback do hub: exibe a mensagem recebida por um usuário"""
+        self.console.message(message, f"[{username}] 📩 ")
     
     def send_message(self, topic, username, message):
         """Envia uma mensagem para um tópico"""
         timestamp = time.strftime("%H:%M:%S")
-        formatted_msg = f"{topic} [{timestamp}] {username}: {message}"
-        self.pub_socket.send_string(formatted_msg)
-        print(f"\n📤 Enviado: {formatted_msg}")
+        formatted_msg = format_text(topic, timestamp, username, message)
+        if self.multipart:
+            frames = encode_frames(topic, timestamp, username, message)
+            self.pub_socket.send_multipart(frames, copy=False)
+        else:
+            self.pub_socket.send_string(formatted_msg)
+        self.console.message(formatted_msg, "\n📤 Enviado: ")
     
     def run_demo(self):
         """Executa a demonstração"""
@@ -71,19 +80,15 @@ class ChatDemo:
         
         # João gosta de tecnologia e notícias
         joao = self.create_subscriber("João", ["TECNOLOGIA", "NOTICIAS", "SISTEMA"])
-        time.sleep(0.5)
         
         # Maria gosta de esportes e entretenimento
         maria = self.create_subscriber("Maria", ["ESPORTES", "ENTRETENIMENTO", "SISTEMA"])
-        time.sleep(0.5)
         
         # Pedro está inscrito em tudo
         pedro = self.create_subscriber("Pedro", self.topics)
-        time.sleep(0.5)
         
         # Ana só quer chat geral
         ana = self.create_subscriber("Ana", ["GERAL", "SISTEMA"])
-        time.sleep(1)
         
         print("\n" + "=" * 70)
         print("SIMULANDO CONVERSAS...")
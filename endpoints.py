@@ -0,0 +1,106 @@
+"""
+Endpoints do canal de chat: listas de URLs ZeroMQ configuráveis.
+
+Em vez de tcp://HOST:PORT fixo, cada papel usa uma lista de endpoints:
+
+- tcp://host:porta  entre máquinas
+- ipc:///caminho    entre processos da mesma máquina (sem pilha TCP)
+- inproc://nome     entre threads que compartilham o mesmo zmq.Context
+
+Quem faz bind (publisher, broker) faz bind em todos os endpoints da lista;
+quem conecta usa o primeiro utilizável. A lista vem, em ordem de
+prioridade, da linha de comando (--endpoints a,b), da variável de ambiente
+(CHAT_ENDPOINTS) ou de constPS.ENDPOINTS. Exemplo com o publisher servindo
+clientes locais por ipc e remotos por tcp:
+
+    CHAT_ENDPOINTS=ipc:///tmp/chat.ipc,tcp://*:5555 python publisher.py
+"""
+
+import os
+
+import zmq
+
+from constPS import *
+
+SCHEMES = ("tcp", "ipc", "inproc")
+
+# Variável de ambiente e opção de linha de comando de cada papel
+CHAT = ("CHAT_ENDPOINTS", "--endpoints")
+BROKER = ("CHAT_BROKER_ENDPOINTS", "--broker-endpoints")
+
+
+def parse_endpoints(value):
+    """
+    Converte "url1,url2" (ou uma lista) em lista de endpoints validados.
+
+    Raises:
+        ValueError: lista vazia ou esquema não suportado
+    """
+    if isinstance(value, str):
+        value = value.replace(",", " ").split()
+    endpoints = list(value)
+    if not endpoints:
+        raise ValueError("Nenhum endpoint informado")
+    for endpoint in endpoints:
+        scheme, separator, _ = endpoint.partition("://")
+        if not separator or scheme not in SCHEMES:
+            raise ValueError(f"Endpoint inválido: {endpoint!r}. Use {', '.join(SCHEMES)}")
+    return endpoints
+
+
+def load_endpoints(role=CHAT, argv=None, environ=None):
+    """
+    Endpoints de um papel (CHAT ou BROKER): linha de comando, ambiente ou constPS.
+
+    Args:
+        argv: Argumentos onde procurar a opção do papel (None = ignora)
+        environ: Ambiente (None = os.environ)
+    """
+    variable, option = role
+    if argv and option in argv:
+        return parse_endpoints(argv[argv.index(option) + 1])
+    value = (os.environ if environ is None else environ).get(variable)
+    if value:
+        return parse_endpoints(value)
+    return parse_endpoints(ENDPOINTS if role == CHAT else BROKER_ENDPOINTS)
+
+
+def bind_all(socket, endpoints):
+    """
+    Faz bind do socket em todos os endpoints.
+
+    Returns:
+        Endpoints efetivos (portas curinga "tcp://*:*" resolvidas)
+    """
+    bound = []
+    for endpoint in parse_endpoints(endpoints):
+        socket.bind(endpoint)
+        if "*" in endpoint:
+            endpoint = socket.getsockopt_string(zmq.LAST_ENDPOINT)
+        bound.append(endpoint)
+    return bound
+
+
+def connect_first(socket, endpoints, inproc=False):
+    """
+    Conecta o socket ao primeiro endpoint utilizável da lista.
+
+    Conectar a mais de um endpoint do mesmo publisher entregaria cada
+    mensagem em dobro, então apenas um é usado. Endpoints de bind em todas
+    as interfaces (tcp://*:porta) viram tcp://HOST:porta.
+
+    Args:
+        inproc: O socket compartilha o contexto do publisher; sem isso,
+            endpoints inproc:// são ignorados
+
+    Returns:
+        O endpoint conectado
+    """
+    for endpoint in parse_endpoints(endpoints):
+        if endpoint.startswith("inproc://") and not inproc:
+            continue
+        endpoint = endpoint.replace("tcp://*:", f"tcp://{HOST}:")
+        socket.connect(endpoint)
+        return endpoint
+    raise ValueError(f"Nenhum endpoint utilizável sem contexto compartilhado: {endpoints}")
+
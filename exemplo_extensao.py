@@ -3,10 +3,19 @@ Exemplo de extensão do sistema de chat com tópicos personalizados
 Demonstra como adicionar novos tópicos e funcionalidades
 """
 
+import sys
 import zmq
 import time
 import json
+from functools import partial
 from constPS import *
+from codec import decode_structured, encode_structured, is_structured, peek
+from compression import Compressor, Decompressor, MissingDictionary, is_compressed
+from endpoints import BROKER, bind_all, connect_first, load_endpoints
+from filters import base_topic, filter_topic
+from handlers import HandlerPool
+from protocolo import Message, decode_frames, encode_body, encode_frames, format_frames, format_text, topic_filter
+from subscriptions import SubscriptionTable, create_xpub
 
 class ChatExtendido:
     """
@@ -15,12 +24,38 @@ class ChatExtendido:
     - Mensagens com metadados (JSON)
     - Prioridades de mensagens
     - Mensagens privadas usando tópicos únicos
+    - Filtros por conteúdo (prioridade, tipo, usuário) avaliados aqui, no
+      publisher: cada mensagem também é enviada com o tópico de filtro de
+      cada inscrição que ela satisfaz (ver filters.py)
+    
+    Args:
+        expected_subscriptions: Antes de enviar, aguarda até este número de
+            inscrições chegarem ao publisher (XPUB), em vez de um tempo fixo
+        startup_wait: Sem expected_subscriptions, aguarda até este tempo (s)
+            pela primeira inscrição, para as mensagens iniciais não se
+            perderem enquanto os subscribers conectam
+        codec: Codec das mensagens estruturadas ("json" ou "msgpack", ver
+            codec.py); None mantém o formato original "TOPICO {json}"
+        registry: registry.RegistryClient onde os tópicos das disciplinas
+            são registrados, com suas descrições
+        compression: compression.Compressor aplicado aos corpos das
+            mensagens estruturadas (limite e dicionário por tópico)
     """
     
-    def __init__(self):
+    def __init__(self, multipart=False, use_broker=False, expected_subscriptions=0, codec=None,
+                 registry=None, compression=None, startup_wait=1.0):
+        self.multipart = multipart
+        self.codec = codec
+        self.compression = compression
+        self._subscription_count = 0
         self.context = zmq.Context()
-        self.pub_socket = self.context.socket(zmq.PUB)
-        self.pub_socket.bind(f"tcp://{HOST}:{PORT}")
+        self.pub_socket = create_xpub(self.context)
+        self.subscriptions = SubscriptionTable(self.pub_socket, exact_counts=not use_broker)
+        if use_broker:
+            # Publica através do broker.py, junto com outros publishers
+            connect_first(self.pub_socket, load_endpoints(BROKER))
+        else:
+            bind_all(self.pub_socket, load_endpoints())
         
         # Tópicos personalizados para diferentes disciplinas
         self.topics = {
@@ -33,6 +68,9 @@ class ChatExtendido:
             "DUVIDAS": "Dúvidas",
             "PROJETOS": "Discussão de Projetos"
         }
+        if registry is not None:
+            for code, name in self.topics.items():
+                registry.register(code, name, owner="exemplo_extensao")
         
         print("=" * 70)
         print("SISTEMA DE CHAT ESTENDIDO - Ambiente Acadêmico")
@@ -42,18 +80,49 @@ class ChatExtendido:
             print(f"  • {code}: {name}")
         print("=" * 70)
         
-        time.sleep(1)
+        if expected_subscriptions:
+            if not self.subscriptions.wait(expected_subscriptions):
+                print(f"Aviso: {self.subscriptions.count()} de "
+                      f"{expected_subscriptions} inscrições recebidas")
+        elif startup_wait:
+            self.subscriptions.wait(1, timeout=startup_wait)
+    
+    def _routes(self, topic, username, metadata=None):
+        """
+        Tópico da mensagem seguido dos tópicos de filtro que ela satisfaz
+        (consulta ao índice da SubscriptionTable, atualizado pelo XPUB)
+        """
+        self.subscriptions.update()
+        if self.compression is not None:
+            # Subscriber novo: reenvia os dicionários de compressão
+            count = self.subscriptions.count()
+            if count > self._subscription_count:
+                self.compression.announce()
+            self._subscription_count = count
+        if not self.subscriptions.filters:
+            return [topic]
+        metadata = metadata or {}
+        fields = {
+            "username": username,
+            "priority": metadata.get("priority"),
+            "type": metadata.get("type"),
+        }
+        return [topic, *self.subscriptions.filters.match(topic, fields)]
     
     def send_simple_message(self, topic, username, message):
         """Envia mensagem simples (formato original)"""
         timestamp = time.strftime("%H:%M:%S")
-        formatted_msg = f"{topic} [{timestamp}] {username}: {message}"
-        self.pub_socket.send_string(formatted_msg)
+        for route in self._routes(topic, username):
+            if self.multipart:
+                frames = encode_frames(route, timestamp, username, message)
+                self.pub_socket.send_multipart(frames, copy=False)
+            else:
+                self.pub_socket.send_string(format_text(route, timestamp, username, message))
         print(f"✓ Enviado para {topic}: {message}")
     
     def send_structured_message(self, topic, username, message, metadata=None):
         """
-        Envia mensagem estruturada com metadados em JSON
+        Envia mensagem estruturada com metadados (JSON ou codec binário)
         Útil para mensagens com prioridade, anexos, etc.
         """
         msg_data = {
@@ -65,11 +134,42 @@ class ChatExtendido:
             "metadata": metadata or {}
         }
         
-        # O tópico ainda é enviado como prefixo para o filtro do ZeroMQ
-        formatted_msg = f"{topic} {json.dumps(msg_data, ensure_ascii=False)}"
-        self.pub_socket.send_string(formatted_msg)
+        if self.codec:
+            body = encode_structured(
+                username,
+                message,
+                msg_data["timestamp"],
+                msg_data["formatted_time"],
+                metadata,
+                self.codec
+            )
+        else:
+            body = json.dumps(msg_data, ensure_ascii=False)
+        
+        body = encode_body(body)
+        routes = self._routes(topic, username, metadata)
+        if self.compression is not None:
+            body, announcement = self.compression.compress(topic, body)
+            if announcement is not None:
+                # O dicionário vai antes da primeira mensagem que o usa, em
+                # todas as rotas ativas do tópico: um inscrito em um filtro
+                # que esta mensagem não satisfaz também vai precisar dele
+                for route in [topic, *self.subscriptions.filters.names(topic)]:
+                    self._send_body(route, msg_data["formatted_time"], username, announcement)
+        for route in routes:
+            self._send_body(route, msg_data["formatted_time"], username, body)
         print(f"✓ Enviado (estruturado) para {topic}")
     
+    def _send_body(self, route, formatted_time, username, body):
+        """Envia um corpo já codificado com o tópico (ou filtro) da rota"""
+        if self.multipart:
+            # Tópico no frame 0 (filtro do ZeroMQ) e o JSON como corpo
+            frames = encode_frames(route, formatted_time, username, body)
+            self.pub_socket.send_multipart(frames, copy=False)
+        else:
+            # O tópico ainda é enviado como prefixo para o filtro do ZeroMQ
+            self.pub_socket.send(f"{route} ".encode("utf-8") + body)
+    
     def send_priority_message(self, topic, username, message, priority="normal"):
         """Envia mensagem com prioridade"""
         self.send_structured_message(
@@ -190,56 +290,126 @@ class ChatExtendido:
         )
         time.sleep(2)
 
-def criar_subscriber_exemplo(username, topics):
-    """Cria um subscriber de exemplo que mostra mensagens estruturadas"""
+def exibir_mensagem_exemplo(username, priorities, message, decompressor=None):
+    """
+    Handler do subscriber de exemplo: decodifica e exibe uma mensagem
+    estruturada (protocolo.Message)
+    
+    Args:
+        decompressor: compression.Decompressor para corpos comprimidos; a
+            descompressão só acontece aqui, quando a mensagem é exibida
+    """
+    if message.multipart:
+        topic, header, payload = decode_frames(message.raw)
+    else:
+        topic, _, payload = message.raw.partition(b" ")
+        topic = topic.decode("utf-8")
+    topic = base_topic(topic)
+    
+    if decompressor is not None and is_compressed(payload):
+        try:
+            payload = decompressor.decompress(payload)
+        except MissingDictionary as error:
+            print(f"\n[{username}] ⚠ Mensagem de {topic} descartada: {error}")
+            return
+        if payload is None:
+            return  # anúncio de dicionário
+    
+    if is_structured(payload):
+        # Codec binário: prioridade e tipo vêm do cabeçalho fixo
+        if priorities is not None and peek(payload)[2] not in priorities:
+            return
+        data = decode_structured(payload)
+    else:
+        # Tentar parsear como JSON
+        try:
+            data = json.loads(bytes(payload))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            data = None
+        
+        if not isinstance(data, dict):
+            # Mensagem simples (não JSON)
+            if priorities is None:
+                if message.multipart:
+                    print(f"\n[{username}] 💬 {format_frames(topic, header, payload)}")
+                else:
+                    print(f"\n[{username}] 💬 {message.raw.decode('utf-8')}")
+            return
+        
+        if priorities is not None and data['metadata'].get('priority') not in priorities:
+            return
+    
+    # Exibir com formatação especial baseada no tipo
+    print(f"\n[{username}] 📨 De: {data['username']} ({topic})")
+    print(f"    💬 {data['message']}")
+    
+    if data.get('metadata'):
+        meta = data['metadata']
+        
+        if meta.get('priority') == 'high':
+            print("    ⚠️  ALTA PRIORIDADE")
+        
+        if meta.get('type') == 'file':
+            print(f"    📎 Arquivo: {meta['filename']}")
+            print(f"    🔗 Link: {meta['url']}")
+        
+        if meta.get('type') == 'poll':
+            print(f"    📊 Opções: {', '.join(meta['options'])}")
+
+def criar_subscriber_exemplo(username, topics, multipart=False, priorities=None, workers=0,
+                             processes=False):
+    """
+    Cria um subscriber de exemplo que mostra mensagens estruturadas
+    
+    Args:
+        priorities: Conjunto de prioridades aceitas (ex.: {"high"}); o
+            subscriber se inscreve nos tópicos de filtro correspondentes e o
+            ChatExtendido só envia as mensagens que os satisfazem
+        workers: Com workers > 0, a decodificação e a exibição rodam em um
+            HandlerPool (ordem preservada por tópico) e o laço só recebe
+        processes: O pool usa processos em vez de threads
+    """
     context = zmq.Context()
     socket = context.socket(zmq.SUB)
-    socket.connect(f"tcp://{HOST}:{PORT}")
+    connect_first(socket, load_endpoints())
     
     for topic in topics:
-        socket.setsockopt_string(zmq.SUBSCRIBE, topic)
+        if priorities is None:
+            socket.setsockopt(zmq.SUBSCRIBE, topic_filter(topic, multipart))
+            continue
+        # Filtro avaliado no publisher: só chegam as prioridades pedidas
+        for priority in priorities:
+            socket.setsockopt(zmq.SUBSCRIBE, topic_filter(filter_topic(topic, priority=priority), multipart))
     
     print(f"\n[{username}] Conectado aos tópicos: {', '.join(topics)}")
     
+    # Um Decompressor para todos os trabalhadores (o acesso aos dicionários é
+    # sincronizado); ordered=True leva o anúncio ao trabalhador do tópico
+    handler = partial(exibir_mensagem_exemplo, username, priorities, decompressor=Decompressor())
+    pool = None
+    if workers:
+        pool = HandlerPool(handler, workers, processes, ordered=True, context=context)
+    
     while True:
         try:
-            message = socket.recv_string()
+            if multipart:
+                message = Message.from_frames(socket.recv_multipart(copy=False))
+            else:
+                message = Message(socket.recv())
             
-            # Tentar parsear como JSON
-            parts = message.split(' ', 1)
-            if len(parts) == 2:
-                topic = parts[0]
-                try:
-                    data = json.loads(parts[1])
-                    
-                    # Exibir com formatação especial baseada no tipo
-                    print(f"\n[{username}] 📨 De: {data['username']} ({topic})")
-                    print(f"    💬 {data['message']}")
-                    
-                    if data.get('metadata'):
-                        meta = data['metadata']
-                        
-                        if meta.get('priority') == 'high':
-                            print("    ⚠️  ALTA PRIORIDADE")
-                        
-                        if meta.get('type') == 'file':
-                            print(f"    📎 Arquivo: {meta['filename']}")
-                            print(f"    🔗 Link: {meta['url']}")
-                        
-                        if meta.get('type') == 'poll':
-                            print(f"    📊 Opções: {', '.join(meta['options'])}")
-                    
-                except json.JSONDecodeError:
-                    # Mensagem simples (não JSON)
-                    print(f"\n[{username}] 💬 {message}")
+            if pool is not None:
+                pool.submit(message)
             else:
-                print(f"\n[{username}] 💬 {message}")
+                handler(message)
                 
         except KeyboardInterrupt:
             break
         except Exception as e:
             print(f"Erro: {e}")
             break
+    
+    if pool is not None:
+        pool.close()
 
 def main():
     print("""
@@ -270,8 +440,15 @@ def main():
     
     choice = input("\nOpção (1-5): ").strip()
     
-    chat = ChatExtendido()
-    time.sleep(1)
+    # python exemplo_extensao.py --compressao -> comprime (zlib + dicionário
+    #   por tópico) os corpos estruturados acima de 256 bytes
+    # python exemplo_extensao.py --esperar N -> aguarda N inscrições antes
+    #   de enviar (ex.: 2 subscribers em 4 tópicos = 8)
+    expected = 0
+    if "--esperar" in sys.argv:
+        expected = int(sys.argv[sys.argv.index("--esperar") + 1])
+    compression = Compressor() if "--compressao" in sys.argv else None
+    chat = ChatExtendido(expected_subscriptions=expected, compression=compression)
     
     if choice == "1":
         chat.demo_basico()
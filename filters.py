@@ -0,0 +1,146 @@
+"""
+Filtros por conteúdo avaliados no publisher (inscrições com predicados).
+
+O filtro do ZeroMQ só compara prefixos de tópico: quem quer apenas os
+avisos de alta prioridade precisa receber e decodificar todo o tópico
+AVISOS e descartar o resto. Aqui o subscriber se inscreve em um "tópico de
+filtro", o tópico seguido de predicados sobre campos do cabeçalho:
+
+    AVISOS?priority=high
+    SD?type=file&username=Professor
+
+O publisher (socket XPUB) recebe essas inscrições, mantém um índice
+pré-compilado {tópico: {campo: {valor: filtros}}} e, para cada mensagem,
+encontra em uma consulta por campo os filtros satisfeitos. A mensagem é
+então enviada também com cada tópico de filtro como prefixo de roteamento,
+e o próprio ZeroMQ a entrega só aos inscritos naquele filtro. Inscritos no
+tópico simples continuam recebendo apenas a cópia original.
+
+Predicados são igualdades; vários predicados no mesmo filtro valem juntos
+(E). Para "OU", o subscriber se inscreve em mais de um filtro.
+"""
+
+from urllib.parse import quote, unquote
+
+SEPARATOR = "?"
+FIELDS = ("priority", "type", "username")
+
+
+def filter_topic(topic, **predicates):
+    """
+    Tópico de filtro canônico (campos em ordem alfabética).
+
+    Exemplo: filter_topic("AVISOS", priority="high") -> "AVISOS?priority=high"
+    """
+    if not predicates:
+        raise ValueError("Filtro sem predicados: use o tópico diretamente")
+    for field in predicates:
+        if field not in FIELDS:
+            raise ValueError(f"Campo de filtro desconhecido: {field} (use {', '.join(FIELDS)})")
+    terms = "&".join(f"{field}={quote(str(value), safe='')}" for field, value in sorted(predicates.items()))
+    return f"{topic}{SEPARATOR}{terms}"
+
+
+def is_filter(name):
+    """Indica se o tópico é um tópico de filtro"""
+    return SEPARATOR in name
+
+
+def base_topic(name):
+    """Tópico da mensagem, sem os predicados de um tópico de filtro"""
+    return name.partition(SEPARATOR)[0]
+
+
+def parse_filter(name):
+    """
+    Separa um tópico de filtro em (tópico, {campo: valor}).
+
+    Raises:
+        ValueError: Se o filtro estiver malformado ou usar campo desconhecido
+    """
+    topic, _, terms = name.partition(SEPARATOR)
+    predicates = {}
+    for term in terms.split("&"):
+        field, equals, value = term.partition("=")
+        if not equals or field not in FIELDS:
+            raise ValueError(f"Filtro inválido: {name}")
+        predicates[field] = unquote(value)
+    return topic, predicates
+
+
+class FilterIndex:
+    """
+    Índice dos filtros ativos, consultado uma vez por mensagem publicada.
+
+    Para cada tópico guarda {campo: {valor: conjunto de filtros}}; um filtro
+    casa quando todos os seus predicados foram encontrados (contagem de
+    acertos igual ao número de predicados).
+    """
+
+    def __init__(self):
+        self.topics = {}
+        self.sizes = {}  # filtro -> número de predicados
+
+    def add(self, name):
+        """Registra um tópico de filtro (ignora filtros inválidos ou repetidos)"""
+        if name in self.sizes:
+            return
+        try:
+            topic, predicates = parse_filter(name)
+        except ValueError:
+            return
+        fields = self.topics.setdefault(topic, {})
+        for field, value in predicates.items():
+            fields.setdefault(field, {}).setdefault(value, set()).add(name)
+        self.sizes[name] = len(predicates)
+
+    def remove(self, name):
+        """Remove um tópico de filtro do índice"""
+        if self.sizes.pop(name, None) is None:
+            return
+        topic, predicates = parse_filter(name)
+        fields = self.topics[topic]
+        for field, value in predicates.items():
+            names = fields[field][value]
+            names.discard(name)
+            if not names:
+                del fields[field][value]
+                if not fields[field]:
+                    del fields[field]
+        if not fields:
+            del self.topics[topic]
+
+    def match(self, topic, fields):
+        """
+        Filtros satisfeitos por uma mensagem.
+
+        Args:
+            topic: Tópico da mensagem
+            fields: {campo: valor} da mensagem (valores None são ignorados)
+
+        Returns:
+            Lista de tópicos de filtro (prefixos de roteamento) que casam
+        """
+        index = self.topics.get(topic)
+        if not index:
+            return []
+        hits = {}
+        for field, values in index.items():
+            value = fields.get(field)
+            if value is None:
+                continue
+            for name in values.get(str(value), ()):
+                hits[name] = hits.get(name, 0) + 1
+        sizes = self.sizes
+        return [name for name, count in hits.items() if count == sizes[name]]
+
+    def names(self, topic):
+        """Todos os filtros ativos de um tópico, satisfeitos ou não"""
+        return sorted({name for values in self.topics.get(topic, {}).values()
+                       for names in values.values() for name in names})
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def __repr__(self):
+        return f"FilterIndex({sorted(self.sizes)})"
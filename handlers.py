@@ -0,0 +1,196 @@
+"""
+Pool de handlers: processamento pesado fora do laço de recebimento.
+
+Se cada mensagem é tratada dentro do laço de recv (parse de JSON, montagem
+de enquetes, consulta de metadados de arquivos), um handler lento faz o
+socket SUB parar de ler e a fila do ZeroMQ transbordar. O HandlerPool
+recebe a mensagem já lida e a repassa, sem cópia, por PUSH/PULL a um
+conjunto de threads ou processos que executam o handler:
+
+    SUB --recv--> HandlerPool.submit --PUSH/PULL--> trabalhador i: handler(message)
+
+- ordered=True: mensagens do mesmo tópico vão sempre ao mesmo trabalhador
+  (hash do tópico), preservando a ordem por tópico
+- max_in_flight: limite de mensagens entregues e ainda não concluídas;
+  ao atingi-lo, submit() aguarda os trabalhadores (backpressure)
+"""
+
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+
+import zmq
+
+from protocolo import Message
+
+MULTIPART = b"M"
+TEXT = b"T"
+STOP = b"S"
+OK = b"ok"
+ERROR = b"erro"
+
+_pool_ids = itertools.count()
+
+
+def _worker(handler, address, acks, context=None):
+    """Laço de um trabalhador: executa o handler e confirma cada mensagem"""
+    own_context = context is None
+    context = context or zmq.Context()
+    commands = context.socket(zmq.PULL)
+    commands.connect(address)
+    done = context.socket(zmq.PUSH)
+    done.connect(acks)
+
+    while True:
+        frames = commands.recv_multipart(copy=False)
+        kind = frames[0].bytes
+        if kind == STOP:
+            break
+        if kind == MULTIPART:
+            message = Message.from_frames(frames[1:])
+        else:
+            message = Message(frames[1].bytes)
+        try:
+            handler(message)
+            done.send(OK)
+        except Exception as e:
+            print(f"Erro no handler: {e}")
+            done.send(ERROR)
+
+    commands.close()
+    done.close()
+    if own_context:
+        context.term()
+
+
+class HandlerPool:
+    """
+    Executa handler(message) em N threads ou processos.
+
+    Args:
+        handler: Função chamada com um protocolo.Message; com processes=True
+            deve ser serializável (função de módulo ou functools.partial)
+        workers: Número de trabalhadores
+        processes: Usa processos (handlers que consomem CPU) em vez de threads
+        ordered: Preserva a ordem das mensagens de cada tópico
+        max_in_flight: Máximo de mensagens pendentes nos trabalhadores
+        context: zmq.Context do subscriber (None = usa a instância global)
+    """
+
+    def __init__(self, handler, workers=4, processes=False, ordered=False, max_in_flight=1000,
+                 context=None):
+        self.workers = workers
+        self.ordered = ordered
+        self.max_in_flight = max_in_flight
+        self.context = context or zmq.Context.instance()
+        self.in_flight = 0
+        self.completed = 0
+        self.errors = 0
+        self._next = 0
+
+        # Threads compartilham o contexto (inproc); processos usam ipc ou tcp
+        pool_id = next(_pool_ids)
+        self._directory = None
+        if processes and zmq.has("ipc"):
+            self._directory = tempfile.mkdtemp(prefix="chat-handlers-")
+
+        def endpoint(name):
+            if not processes:
+                return f"inproc://handler-pool-{pool_id}-{name}"
+            if self._directory:
+                return f"ipc://{os.path.join(self._directory, name)}"
+            return "tcp://127.0.0.1:*"
+
+        self.acks = self.context.socket(zmq.PULL)
+        self.acks.bind(endpoint("acks"))
+        acks = self.acks.getsockopt_string(zmq.LAST_ENDPOINT)
+        self.channels = []
+        for index in range(workers):
+            socket = self.context.socket(zmq.PUSH)
+            socket.bind(endpoint(str(index)))
+            self.channels.append(socket)
+
+        if processes:
+            spawn = multiprocessing.get_context("spawn")
+            self._workers = [
+                spawn.Process(
+                    target=_worker,
+                    args=(handler, socket.getsockopt_string(zmq.LAST_ENDPOINT), acks),
+                    daemon=True,
+                )
+                for socket in self.channels
+            ]
+        else:
+            self._workers = [
+                threading.Thread(
+                    target=_worker,
+                    args=(handler, socket.getsockopt_string(zmq.LAST_ENDPOINT), acks, self.context),
+                    daemon=True,
+                )
+                for socket in self.channels
+            ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, message):
+        """
+        Entrega um protocolo.Message a um trabalhador, sem copiar os frames.
+
+        Bloqueia enquanto houver max_in_flight mensagens pendentes.
+        """
+        self._collect(block=False)
+        while self.in_flight >= self.max_in_flight:
+            self._collect(block=True)
+
+        if self.ordered:
+            index = zlib.crc32(message.topic.encode("utf-8")) % self.workers
+        else:
+            index = self._next
+            self._next = (index + 1) % self.workers
+
+        if message.multipart:
+            frames = [MULTIPART, *message.raw]
+        else:
+            frames = [TEXT, message.raw]
+        self.channels[index].send_multipart(frames, copy=False)
+        self.in_flight += 1
+
+    def _collect(self, block):
+        """Processa as confirmações dos trabalhadores"""
+        flags = 0 if block else zmq.NOBLOCK
+        while True:
+            try:
+                status = self.acks.recv(flags)
+            except zmq.Again:
+                return
+            self.in_flight -= 1
+            self.completed += 1
+            if status == ERROR:
+                self.errors += 1
+            flags = zmq.NOBLOCK
+
+    def join(self):
+        """Aguarda todas as mensagens pendentes serem processadas"""
+        while self.in_flight:
+            self._collect(block=True)
+
+    def close(self):
+        """Aguarda as pendentes, encerra os trabalhadores e fecha os sockets"""
+        self.join()
+        for socket in self.channels:
+            socket.send(STOP)
+        for worker in self._workers:
+            worker.join()
+        for socket in self.channels:
+            socket.close()
+        self.acks.close()
+        if self._directory:
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+    def __repr__(self):
+        return (f"HandlerPool(workers={self.workers}, in_flight={self.in_flight}, "
+                f"completed={self.completed}, errors={self.errors})")
@@ -0,0 +1,170 @@
+"""
+Hub de subscribers: muitos usuários lógicos sobre um único socket SUB.
+
+ChatSubscriber cria um contexto, um socket e uma thread por usuário. Para
+simular milhares de usuários (testes de carga) isso significa milhares de
+threads e de threads de I/O do ZeroMQ. O SubscriberHub usa um único
+contexto, um único socket SUB e uma única thread de recebimento, e entrega
+cada mensagem aos usuários inscritos por meio de um índice tópico -> usuários.
+Inscrições com curingas (disciplinas.*.avisos, ver topics.py) são resolvidas
+por uma TopicTrie, com custo proporcional à profundidade do tópico.
+"""
+
+import itertools
+import threading
+
+import zmq
+
+from constPS import *
+from endpoints import connect_first, load_endpoints
+from protocolo import Message
+from topics import TopicTrie, is_pattern, subscription_filter
+
+_hub_ids = itertools.count()
+
+
+class SubscriberHub:
+    """
+    Multiplexa N usuários lógicos sobre um socket SUB.
+
+    O filtro de um tópico é registrado no socket quando o primeiro usuário se
+    inscreve e removido quando o último sai. Cada mensagem recebida custa um
+    acesso a dicionário para encontrar os usuários do tópico.
+
+    Args:
+        multipart: Recebe mensagens multipart (deve coincidir com o publisher)
+        context: zmq.Context compartilhado (None = usa a instância global)
+        address: Endpoint ou lista de endpoints; conecta no primeiro
+            (padrão: endpoints.load_endpoints(); aceita inproc://)
+    """
+
+    def __init__(self, multipart=False, context=None, address=None):
+        self.multipart = multipart
+        self.context = context or zmq.Context.instance()
+        self.socket = self.context.socket(zmq.SUB)
+        self.address = connect_first(self.socket, address or load_endpoints(), inproc=True)
+
+        # tópico -> {usuario: callback}; cada dicionário é substituído (nunca
+        # alterado) em inscrições, então a thread de recebimento itera sem lock
+        self.users_by_topic = {}
+        # Padrões com curinga ativos (as chaves de users_by_topic que os usam)
+        self.patterns = TopicTrie()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        # Sockets ZeroMQ não são thread-safe: com a thread de recebimento
+        # ativa, alterações de filtro são enviadas a ela por um par inproc
+        control_address = f"inproc://subscriber-hub-{next(_hub_ids)}"
+        self._control = self.context.socket(zmq.PAIR)
+        self._control.bind(control_address)
+        self._commands = self.context.socket(zmq.PAIR)
+        self._commands.connect(control_address)
+
+    def subscribe(self, username, topic, callback):
+        """
+        Inscreve um usuário lógico em um tópico.
+
+        Args:
+            username: Nome do usuário
+            topic: Tópico de interesse ou padrão com curingas (* e #)
+            callback: Função chamada como callback(username, message), com
+                message sendo um protocolo.Message
+        """
+        with self._lock:
+            users = self.users_by_topic.get(topic, {})
+            if not users:
+                self._set_filter(zmq.SUBSCRIBE, topic)
+                if is_pattern(topic):
+                    self.patterns.add(topic)
+            self.users_by_topic[topic] = {**users, username: callback}
+
+    def unsubscribe(self, username, topic):
+        """Cancela a inscrição de um usuário em um tópico"""
+        with self._lock:
+            users = dict(self.users_by_topic.get(topic, {}))
+            if users.pop(username, None) is None:
+                return False
+            if users:
+                self.users_by_topic[topic] = users
+            else:
+                del self.users_by_topic[topic]
+                self._set_filter(zmq.UNSUBSCRIBE, topic)
+                self.patterns.remove(topic)
+            return True
+
+    def add_user(self, username, topics, callback):
+        """Inscreve um usuário em vários tópicos com o mesmo callback"""
+        for topic in topics:
+            self.subscribe(username, topic, callback)
+
+    def remove_user(self, username):
+        """Remove um usuário de todos os tópicos"""
+        for topic in list(self.users_by_topic):
+            self.unsubscribe(username, topic)
+
+    def _set_filter(self, option, topic):
+        """Aplica o filtro no socket ou o encaminha à thread de recebimento"""
+        if self._thread is None:
+            self.socket.setsockopt(option, subscription_filter(topic, self.multipart))
+        else:
+            self._commands.send_multipart([
+                b"%d" % option, subscription_filter(topic, self.multipart)
+            ])
+
+    def _recv(self):
+        """Recebe a próxima mensagem como Message (decodificação preguiçosa)"""
+        if self.multipart:
+            return Message.from_frames(self.socket.recv_multipart(copy=False))
+        return Message(self.socket.recv())
+
+    def dispatch(self, topic, message):
+        """
+        Entrega a mensagem a todos os usuários inscritos no tópico ou em um
+        padrão que case com ele (uma única vez por usuário)
+        """
+        users = self.users_by_topic.get(topic, {})
+        if self.patterns:
+            # A trie é alterada no lugar pelas inscrições
+            with self._lock:
+                matched = self.patterns.match(topic)
+            if matched:
+                users = dict(users)
+                for pattern in matched:
+                    users.update(self.users_by_topic.get(pattern, {}))
+        for username, callback in users.items():
+            callback(username, message)
+
+    def run(self):
+        """Laço de recebimento; bloqueia até stop() ser chamado"""
+        poller = zmq.Poller()
+        poller.register(self.socket, zmq.POLLIN)
+        poller.register(self._control, zmq.POLLIN)
+
+        while True:
+            events = dict(poller.poll())
+
+            if self._control in events:
+                option, value = self._control.recv_multipart()
+                if option == b"stop":
+                    break
+                self.socket.setsockopt(int(option), value)
+
+            if self.socket in events:
+                message = self._recv()
+                self.dispatch(message.topic, message)
+
+    def start(self):
+        """Inicia a thread única de recebimento"""
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Encerra a thread de recebimento e fecha os sockets"""
+        if self._thread is not None:
+            with self._lock:
+                self._commands.send_multipart([b"stop", b""])
+            self._thread.join()
+            self._thread = None
+        self._commands.close(linger=0)
+        self._control.close(linger=0)
+        self.socket.close(linger=0)
@@ -0,0 +1,320 @@
+"""
+Log persistente de mensagens, append-only, com replay para clientes atrasados.
+
+Sockets SUB perdem tudo o que foi publicado antes de se conectarem. O
+publisher pode gravar cada mensagem em um log por tópico e um serviço de
+replay (ROUTER) responde a pedidos "tópico X desde a sequência N" lendo
+direto dos segmentos mapeados em memória (mmap), sem republicar nada no
+caminho do PUB.
+
+Estrutura em disco:
+
+    <diretorio>/<topico>/<seq_inicial>.log   registros: SEQ | HEADER | BODY
+    <diretorio>/<topico>/<seq_inicial>.idx   índice esparso: (seq, posição)
+
+Cada segmento é fechado ao atingir `segment_size` bytes e um novo começa. A
+cada `index_interval` registros uma entrada vai para o índice, então uma
+busca custa uma busca binária no índice mais a leitura de no máximo
+`index_interval` registros.
+"""
+
+import bisect
+import itertools
+import mmap
+import os
+import struct
+import threading
+from urllib.parse import quote, unquote
+
+import zmq
+
+from constPS import *
+from protocolo import Message, encode_topic
+
+# sequência (uint64), tamanho do cabeçalho (uint32), tamanho do corpo (uint32)
+RECORD = struct.Struct("!QII")
+INDEX_ENTRY = struct.Struct("!QQ")
+
+# Respostas do serviço de replay
+REPLY_MESSAGE = b"M"
+REPLY_END = b"E"
+
+_service_ids = itertools.count()
+
+
+class _Segment:
+    """Um arquivo de log de um tópico e seu índice esparso em memória"""
+
+    def __init__(self, path, base_seq):
+        self.path = path
+        self.index_path = path[:-len(".log")] + ".idx"
+        self.base_seq = base_seq
+        self.index = []
+        self.size = os.path.getsize(path) if os.path.exists(path) else 0
+        self.last_seq = base_seq - 1
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+            self.index = [
+                INDEX_ENTRY.unpack_from(data, offset)
+                for offset in range(0, len(data) - len(data) % INDEX_ENTRY.size, INDEX_ENTRY.size)
+            ]
+        # Recupera a última sequência lendo a partir da última entrada do índice
+        for seq, _, _, _ in self.records(self.index[-1][0] if self.index else base_seq):
+            self.last_seq = seq
+
+    def find_position(self, since):
+        """Posição do registro indexado mais próximo antes de `since`"""
+        i = bisect.bisect_right(self.index, (since, float("inf"))) - 1
+        return self.index[i][1] if i >= 0 else 0
+
+    def records(self, since, size=None):
+        """
+        Percorre os registros com sequência >= since, direto do mmap.
+
+        Args:
+            since: Primeira sequência desejada
+            size: Bytes do segmento a ler, fotografados junto com o flush
+                (None = tamanho atual); o escritor pode continuar anexando
+
+        Yields:
+            (seq, posicao, cabecalho, corpo) com cabeçalho/corpo como memoryview
+        """
+        size = self.size if size is None else size
+        if size == 0:
+            return
+        with open(self.path, "rb") as f:
+            # Nunca além do que já está no arquivo (buffer ainda não descarregado)
+            size = min(size, os.fstat(f.fileno()).st_size)
+            if size == 0:
+                return
+            data = memoryview(mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ))
+
+        pos = self.find_position(since)
+        while pos + RECORD.size <= size:
+            seq, header_len, body_len = RECORD.unpack_from(data, pos)
+            start = pos + RECORD.size
+            end = start + header_len + body_len
+            if end > size:
+                break  # registro incompleto (gravação interrompida)
+            if seq >= since:
+                yield seq, pos, data[start:start + header_len], data[start + header_len:end]
+            pos = end
+
+
+class MessageLog:
+    """
+    Log segmentado por tópico.
+
+    Args:
+        directory: Diretório base do log
+        segment_size: Tamanho máximo (bytes) de cada segmento
+        index_interval: Um registro a cada `index_interval` entra no índice
+    """
+
+    def __init__(self, directory=LOG_DIR, segment_size=64 * 1024 * 1024, index_interval=64):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.index_interval = index_interval
+        self.segments = {}  # tópico -> [_Segment] em ordem de seq_inicial
+        self._writers = {}  # tópico -> (arquivo .log, arquivo .idx)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        for name in os.listdir(directory):
+            topic_dir = os.path.join(directory, name)
+            if os.path.isdir(topic_dir):
+                self.segments[unquote(name)] = self._load_segments(topic_dir)
+
+    def _load_segments(self, topic_dir):
+        bases = sorted(
+            int(name[:-len(".log")]) for name in os.listdir(topic_dir) if name.endswith(".log")
+        )
+        return [_Segment(os.path.join(topic_dir, f"{base:020d}.log"), base) for base in bases]
+
+    def last_sequences(self):
+        """Última sequência gravada de cada tópico"""
+        return {
+            topic: segments[-1].last_seq for topic, segments in self.segments.items() if segments
+        }
+
+    def append(self, topic, seq, header, body):
+        """
+        Grava uma mensagem no log do tópico.
+
+        Args:
+            seq: Sequência da mensagem no tópico (crescente)
+            header: Cabeçalho multipart (b"" para mensagens no formato texto)
+            body: Corpo multipart ou o frame completo no formato texto
+        """
+        with self._lock:
+            segments = self.segments.setdefault(topic, [])
+            if not segments or segments[-1].size >= self.segment_size:
+                self._roll(topic, seq)
+            segment = segments[-1]
+            if topic not in self._writers:  # segmento recuperado do disco
+                self._writers[topic] = (open(segment.path, "ab"), open(segment.index_path, "ab"))
+            log_file, index_file = self._writers[topic]
+
+            if (seq - segment.base_seq) % self.index_interval == 0:
+                entry = (seq, segment.size)
+                segment.index.append(entry)
+                index_file.write(INDEX_ENTRY.pack(*entry))
+
+            log_file.write(RECORD.pack(seq, len(header), len(body)))
+            log_file.write(header)
+            log_file.write(body)
+            segment.size += RECORD.size + len(header) + len(body)
+            segment.last_seq = seq
+
+    def _roll(self, topic, seq):
+        """Fecha o segmento atual do tópico e abre um novo a partir de `seq`"""
+        for f in self._writers.pop(topic, ()):
+            f.close()
+        topic_dir = os.path.join(self.directory, quote(topic, safe=""))
+        os.makedirs(topic_dir, exist_ok=True)
+        segment = _Segment(os.path.join(topic_dir, f"{seq:020d}.log"), seq)
+        self.segments[topic].append(segment)
+        self._writers[topic] = (open(segment.path, "ab"), open(segment.index_path, "ab"))
+
+    def flush(self):
+        """Descarrega os buffers de escrita para que leitores vejam tudo"""
+        with self._lock:
+            for log_file, index_file in self._writers.values():
+                log_file.flush()
+                index_file.flush()
+
+    def read(self, topic, since=1):
+        """
+        Lê as mensagens do tópico com sequência >= since.
+
+        Yields:
+            (seq, cabecalho, corpo) como memoryviews dos segmentos mapeados
+        """
+        with self._lock:
+            # Flush e tamanhos na mesma fotografia: o que foi anexado depois
+            # (ainda no buffer do escritor) fica para a próxima leitura
+            for f in self._writers.get(topic, ()):
+                f.flush()
+            segments = [(segment, segment.size) for segment in self.segments.get(topic, ())]
+        bases = [segment.base_seq for segment, _ in segments]
+        first = max(bisect.bisect_right(bases, since) - 1, 0)
+        for segment, size in segments[first:]:
+            for seq, _, header, body in segment.records(since, size):
+                yield seq, header, body
+
+    def close(self):
+        with self._lock:
+            for files in self._writers.values():
+                for f in files:
+                    f.close()
+            self._writers.clear()
+
+
+class ReplayService:
+    """
+    Serviço ROUTER que reenvia mensagens do log a clientes atrasados.
+
+    Pedido (DEALER):  [topico, sequencia_inicial (uint64)]
+    Respostas:        [b"M", frames da mensagem...] por mensagem, seguidas de
+                      [b"E", ultima_sequencia (uint64)]
+
+    Args:
+        log: MessageLog de onde as mensagens são lidas
+        address: Endereço para bind (padrão: tcp://HOST:REPLAY_PORT)
+        context: zmq.Context compartilhado (None = usa a instância global)
+    """
+
+    def __init__(self, log, address=None, context=None):
+        self.log = log
+        self.context = context or zmq.Context.instance()
+        self.address = address or f"tcp://{HOST}:{REPLAY_PORT}"
+        self.socket = self.context.socket(zmq.ROUTER)
+        # Cliente lento ou desconectado gera erro em vez de descarte silencioso
+        self.socket.setsockopt(zmq.ROUTER_MANDATORY, 1)
+        self.socket.setsockopt(zmq.SNDTIMEO, 1000)
+        self.socket.bind(self.address)
+        self._thread = None
+
+        control_address = f"inproc://replay-service-{next(_service_ids)}"
+        self._control = self.context.socket(zmq.PAIR)
+        self._control.bind(control_address)
+        self._commands = self.context.socket(zmq.PAIR)
+        self._commands.connect(control_address)
+
+    def handle(self, identity, topic, since):
+        """Transmite ao cliente as mensagens do tópico desde `since`"""
+        topic_frame = encode_topic(topic)
+        last = since - 1
+        for seq, header, body in self.log.read(topic, since):
+            if header:
+                frames = [identity, REPLY_MESSAGE, topic_frame, header, body]
+            else:
+                frames = [identity, REPLY_MESSAGE, body]
+            self.socket.send_multipart(frames, copy=False)
+            last = seq
+        self.socket.send_multipart([identity, REPLY_END, struct.pack("!Q", max(last, 0))])
+
+    def run(self):
+        """Laço do serviço; bloqueia até stop() ser chamado"""
+        poller = zmq.Poller()
+        poller.register(self.socket, zmq.POLLIN)
+        poller.register(self._control, zmq.POLLIN)
+
+        while True:
+            events = dict(poller.poll())
+            if self._control in events:
+                self._control.recv()
+                break
+            if self.socket in events:
+                frames = self.socket.recv_multipart()
+                try:
+                    identity, topic, since = frames
+                    self.handle(identity, topic.decode("utf-8"), struct.unpack("!Q", since)[0])
+                except zmq.ZMQError as e:
+                    print(f"Replay interrompido para o cliente: {e}")
+                except (ValueError, struct.error, OSError) as e:
+                    # Pedido malformado ou falha de leitura: só este pedido falha
+                    print(f"Pedido de replay inválido ou com falha: {e}")
+
+    def start(self):
+        """Executa o serviço em uma thread em segundo plano"""
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Encerra o serviço e fecha os sockets"""
+        if self._thread is not None:
+            self._commands.send(b"stop")
+            self._thread.join()
+            self._thread = None
+        self._commands.close(linger=0)
+        self._control.close(linger=0)
+        self.socket.close(linger=0)
+
+
+def request_replay(topic, since=1, address=None, context=None, timeout=5000):
+    """
+    Pede ao serviço de replay as mensagens do tópico desde `since`.
+
+    Yields:
+        protocolo.Message de cada mensagem registrada, em ordem de sequência
+    """
+    context = context or zmq.Context.instance()
+    socket = context.socket(zmq.DEALER)
+    socket.setsockopt(zmq.RCVTIMEO, timeout)
+    socket.setsockopt(zmq.LINGER, 0)
+    socket.connect(address or f"tcp://{HOST}:{REPLAY_PORT}")
+    try:
+        socket.send_multipart([topic.encode("utf-8"), struct.pack("!Q", since)])
+        while True:
+            frames = socket.recv_multipart(copy=False)
+            if frames[0].bytes == REPLY_END:
+                return
+            if len(frames) == 2:
+                yield Message(frames[1].bytes)
+            else:
+                yield Message.from_frames(frames[1:])
+    finally:
+        socket.close()
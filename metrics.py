@@ -0,0 +1,282 @@
+"""
+Métricas do chat: contadores por tópico e histogramas de latência.
+
+Publisher e subscriber registram, por tópico, mensagens, bytes, descartes e
+tempo de codificação/decodificação; o subscriber registra também a latência
+ponta a ponta a partir do `sent_at` do cabeçalho multipart. A latência vai
+para um histograma no estilo HDR: baldes log-lineares de precisão relativa
+fixa, com custo O(1) por registro e memória limitada.
+
+As métricas são expostas por um MetricsReporter, que periodicamente:
+- publica um JSON no tópico STATS de um socket PUB próprio
+- grava um arquivo no formato texto do Prometheus
+- serve o mesmo texto em http://HOST:METRICS_PORT/metrics
+"""
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import zmq
+
+from constPS import *
+
+STATS_TOPIC = "STATS"
+
+
+def _label(value):
+    """Valor de rótulo do Prometheus, com \\, " e quebras de linha escapados"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class LatencyHistogram:
+    """
+    Histograma log-linear (estilo HDR) de latências em microssegundos.
+
+    Cada potência de 2 é dividida em 2**precision_bits baldes, então o erro
+    relativo de um percentil é no máximo 1 / 2**precision_bits (3% com o
+    padrão 5).
+    """
+
+    def __init__(self, precision_bits=5):
+        self.precision_bits = precision_bits
+        self.sub_buckets = 1 << precision_bits
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _index(self, micros):
+        if micros < self.sub_buckets:
+            return micros
+        shift = micros.bit_length() - self.precision_bits - 1
+        return (shift + 1) * self.sub_buckets + (micros >> shift) - self.sub_buckets
+
+    def _value(self, index):
+        """Maior valor (µs) que cai no balde"""
+        if index < self.sub_buckets:
+            return index
+        shift = index // self.sub_buckets - 1
+        return ((index % self.sub_buckets + self.sub_buckets + 1) << shift) - 1
+
+    def record(self, seconds):
+        """Registra uma latência em segundos"""
+        micros = max(int(seconds * 1e6), 0)
+        index = self._index(micros)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """Latência em segundos no percentil `fraction` (ex.: 0.99)"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in sorted(dict(self.counts).items()):
+            seen += count
+            if seen >= target:
+                return min(self._value(index) / 1e6, self.max)
+        return self.max
+
+
+class TopicMetrics:
+    """Contadores de um tópico"""
+
+    __slots__ = ("messages", "bytes", "drops", "codec_seconds", "latency")
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+        self.drops = 0
+        self.codec_seconds = 0.0
+        self.latency = LatencyHistogram()
+
+
+class Metrics:
+    """
+    Métricas de um participante do chat, por tópico.
+
+    Args:
+        role: "publisher" ou "subscriber" (rótulo das métricas exportadas)
+        name: Identificação do participante (ex.: nome do usuário)
+    """
+
+    QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+    def __init__(self, role, name=""):
+        self.role = role
+        self.name = name
+        self.topics = {}
+        self.started = time.time()
+
+    def topic(self, topic):
+        metrics = self.topics.get(topic)
+        if metrics is None:
+            metrics = self.topics[topic] = TopicMetrics()
+        return metrics
+
+    def record_message(self, topic, size, codec_seconds=0.0, latency=None):
+        """Registra uma mensagem enviada/recebida e o tempo de (de)codificação"""
+        metrics = self.topic(topic)
+        metrics.messages += 1
+        metrics.bytes += size
+        metrics.codec_seconds += codec_seconds
+        if latency is not None:
+            metrics.latency.record(latency)
+
+    def record_drop(self, topic, count=1):
+        """Registra mensagens descartadas (fila cheia, lacuna de sequência)"""
+        self.topic(topic).drops += count
+
+    def snapshot(self):
+        """Métricas atuais como dicionário serializável em JSON"""
+        elapsed = max(time.time() - self.started, 1e-9)
+        topics = {}
+        for topic, metrics in list(self.topics.items()):
+            latency = metrics.latency
+            topics[topic] = {
+                "messages": metrics.messages,
+                "bytes": metrics.bytes,
+                "drops": metrics.drops,
+                "rate": metrics.messages / elapsed,
+                "codec_seconds": metrics.codec_seconds,
+                "latency": {
+                    "count": latency.count,
+                    "max": latency.max,
+                    **{f"p{q * 100:g}": latency.percentile(q) for q in self.QUANTILES},
+                },
+            }
+        return {"role": self.role, "name": self.name, "uptime": elapsed, "topics": topics}
+
+    def prometheus(self):
+        """Métricas no formato texto de exposição do Prometheus"""
+        op = "encode" if self.role == "publisher" else "decode"
+        base = f'role="{_label(self.role)}",name="{_label(self.name)}"'
+        counters = (
+            ("chat_messages_total", "Mensagens por tópico", "messages"),
+            ("chat_bytes_total", "Bytes por tópico", "bytes"),
+            ("chat_drops_total", "Mensagens descartadas por tópico", "drops"),
+        )
+        # Tópicos e nomes de usuário vêm dos clientes: escapados nos rótulos
+        topics = [(_label(topic), metrics) for topic, metrics in self.topics.items()]
+        lines = []
+        for name, help_text, attribute in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for topic, metrics in topics:
+                lines.append(f'{name}{{{base},topic="{topic}"}} {getattr(metrics, attribute)}')
+
+        lines += ["# HELP chat_codec_seconds_total Tempo de codificação/decodificação",
+                  "# TYPE chat_codec_seconds_total counter"]
+        for topic, metrics in topics:
+            lines.append(
+                f'chat_codec_seconds_total{{{base},topic="{topic}",op="{op}"}} {metrics.codec_seconds:.9f}'
+            )
+
+        lines += ["# HELP chat_latency_seconds Latência ponta a ponta (sent_at)",
+                  "# TYPE chat_latency_seconds summary"]
+        for topic, metrics in topics:
+            latency = metrics.latency
+            if not latency.count:
+                continue
+            labels = f'{base},topic="{topic}"'
+            for q in self.QUANTILES:
+                lines.append(f'chat_latency_seconds{{{labels},quantile="{q}"}} {latency.percentile(q):.6f}')
+            lines.append(f"chat_latency_seconds_sum{{{labels}}} {latency.total:.6f}")
+            lines.append(f"chat_latency_seconds_count{{{labels}}} {latency.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Grava o texto do Prometheus de forma atômica (para o textfile collector)"""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(temporary, path)
+
+
+class MetricsReporter:
+    """
+    Exporta periodicamente as métricas em uma thread própria.
+
+    Args:
+        metrics: Metrics a exportar
+        interval: Segundos entre exportações
+        address: Endpoint de bind do PUB de estatísticas (tópico STATS);
+            None = não publica
+        path: Arquivo .prom a gravar; None = não grava
+        http_port: Porta do endpoint HTTP /metrics; None = sem HTTP
+        http_host: Interface do endpoint HTTP (padrão: HOST, como os
+            sockets ZeroMQ; "" escuta em todas)
+        context: zmq.Context compartilhado (None = usa a instância global)
+    """
+
+    def __init__(self, metrics, interval=5.0, address=None, path=None, http_port=None,
+                 context=None, http_host=HOST):
+        self.metrics = metrics
+        self.interval = interval
+        self.path = path
+        self.address = address
+        self.socket = None
+        if address is not None:
+            self.socket = (context or zmq.Context.instance()).socket(zmq.PUB)
+            self.socket.bind(address)
+        self.http = None
+        if http_port is not None:
+            self.http = ThreadingHTTPServer((http_host, int(http_port)), _handler(metrics))
+            threading.Thread(target=self.http.serve_forever, daemon=True).start()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def report(self):
+        """Exporta as métricas atuais uma vez"""
+        if self.socket is not None:
+            self.socket.send_multipart([
+                STATS_TOPIC.encode("utf-8"),
+                json.dumps(self.metrics.snapshot()).encode("utf-8"),
+            ])
+        if self.path is not None:
+            self.metrics.write_prometheus(self.path)
+
+    def run(self):
+        # O socket PUB só é usado por esta thread
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Faz uma última exportação e encerra a thread, o HTTP e o socket"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.report()
+        if self.http is not None:
+            self.http.shutdown()
+        if self.socket is not None:
+            self.socket.close(linger=0)
+
+
+def _handler(metrics):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # sem log de acesso no console do chat
+
+    return MetricsHandler
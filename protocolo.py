@@ -0,0 +1,398 @@
+"""
+Formato das mensagens na rede (wire format) do sistema de chat.
+
+Dois modos de envio são suportados:
+- Texto (original): um único frame "TOPICO [HH:MM:SS] usuario: mensagem"
+- Multipart: frames separados [tópico, cabeçalho, corpo]
+
+No modo multipart o frame 0 é o tópico em bytes (o filtro por prefixo do
+ZeroMQ continua funcionando) e o corpo é enviado/recebido sem cópia, como
+zmq.Frame/memoryview, sem formatar nem decodificar a mensagem inteira.
+
+O filtro do ZeroMQ compara prefixos, então inscrever-se em "GERAL" também
+entregaria "GERAL2". Por isso o tópico é sempre seguido de um terminador
+(espaço no modo texto, byte nulo no frame de tópico do modo multipart) e as
+inscrições usam topic_filter(), fazendo a correspondência exata no libzmq.
+
+O cabeçalho multipart começa com uma parte binária de tamanho fixo (HEADER):
+versão, identificador do publisher, número de sequência por tópico e
+horário de envio (epoch). O número de sequência permite ao subscriber
+detectar mensagens perdidas (HWM, slow joiner) em O(1) por mensagem, sem
+decodificar o restante. Cada publisher numera os tópicos por conta própria;
+com vários publishers no mesmo tópico (broker) o identificador, sorteado a
+cada execução, separa as sequências de cada um. Sequência 0 significa "sem
+sequência" (publishers que não numeram as mensagens).
+"""
+
+import random
+import struct
+import time
+from collections import OrderedDict
+
+import zmq
+
+ENCODING = "utf-8"
+TOPIC_TERMINATOR = b"\x00"
+
+# versão (uint8), publisher (uint32), sequência (uint64), horário de envio (float64)
+HEADER = struct.Struct("!BIQd")
+HEADER_VERSION = 2
+
+
+def encode_topic(topic):
+    """Frame de tópico do modo multipart, terminado por byte nulo"""
+    return topic.encode(ENCODING) + TOPIC_TERMINATOR
+
+
+def decode_topic(topic_bytes):
+    """Remove o terminador do frame de tópico"""
+    return topic_bytes[:-1].decode(ENCODING)
+
+
+def topic_filter(topic, multipart=False):
+    """Filtro para zmq.SUBSCRIBE que casa apenas com o tópico exato"""
+    if multipart:
+        return encode_topic(topic)
+    return f"{topic} ".encode(ENCODING)
+
+
+def topic_from_filter(filter_bytes):
+    """Tópico de um filtro gerado por topic_filter() (em ambos os modos)"""
+    return filter_bytes[:-1].decode(ENCODING)
+
+
+def format_text(topic, timestamp, username, message):
+    """Monta a mensagem no formato texto original (um único frame)"""
+    return f"{topic} [{timestamp}] {username}: {message}"
+
+
+def encode_text_prefix(topic, timestamp, username):
+    """Parte fixa da mensagem texto, reutilizável entre mensagens de um lote"""
+    return f"{topic} [{timestamp}] {username}: ".encode(ENCODING)
+
+
+def encode_header_text(timestamp, username):
+    """Parte texto do cabeçalho multipart: horário e remetente"""
+    return f"[{timestamp}] {username}".encode(ENCODING)
+
+
+def new_publisher_id():
+    """Identificador aleatório de um publisher (0 = publisher sem sequência)"""
+    return random.getrandbits(32) or 1
+
+
+def encode_header(timestamp, username, seq=0, sent_at=None, publisher=0):
+    """Cabeçalho do modo multipart: parte binária + horário e remetente"""
+    if sent_at is None:
+        sent_at = time.time()
+    return HEADER.pack(HEADER_VERSION, publisher, seq, sent_at) + encode_header_text(timestamp, username)
+
+
+def unpack_header(header):
+    """
+    Lê a parte binária do cabeçalho sem decodificar o texto.
+
+    Args:
+        header: zmq.Frame ou bytes/memoryview do frame de cabeçalho
+
+    Returns:
+        (versao, publisher, sequencia, enviado_em)
+    """
+    return HEADER.unpack_from(getattr(header, "buffer", header))
+
+
+def encode_body(message):
+    """Corpo do modo multipart; bytes/memoryview são enviados como estão"""
+    if isinstance(message, str):
+        return message.encode(ENCODING)
+    return message
+
+
+def encode_frames(topic, timestamp, username, message, seq=0, sent_at=None, publisher=0):
+    """Monta a lista de frames [tópico, cabeçalho, corpo] do modo multipart"""
+    return [
+        encode_topic(topic),
+        encode_header(timestamp, username, seq, sent_at, publisher),
+        encode_body(message),
+    ]
+
+
+def decode_frames(frames):
+    """
+    Separa os frames recebidos com recv_multipart(copy=False).
+
+    Returns:
+        (topico, cabecalho, corpo) - o corpo é um memoryview do frame
+        recebido, sem cópia e sem decodificação
+    """
+    topic, header, body = frames[0], frames[1], frames[2]
+    header_text = header.bytes[HEADER.size:].decode(ENCODING)
+    return decode_topic(topic.bytes), header_text, body.buffer
+
+
+def decode_body(body):
+    """Decodifica o corpo (memoryview/bytes) apenas quando for exibido"""
+    return str(body, ENCODING)
+
+
+def _frame_bytes(frame):
+    """Conteúdo de um zmq.Frame recebido ou de um frame enviado (bytes)"""
+    return frame.bytes if isinstance(frame, zmq.Frame) else frame
+
+
+def _frame_buffer(frame):
+    """memoryview do frame, sem cópia"""
+    return frame.buffer if isinstance(frame, zmq.Frame) else memoryview(frame)
+
+
+def format_frames(topic, header, body):
+    """Reconstrói a representação texto de uma mensagem multipart"""
+    return f"{topic} {header}: {decode_body(body)}"
+
+
+class EncodedCache:
+    """
+    LRU de corpos codificados por (usuário, mensagem, horário HH:MM:SS).
+
+    No modo multipart, um broadcast ou um lote que repete a mesma mensagem
+    em N tópicos codifica o corpo uma vez: a partir do primeiro reuso ele
+    vira um zmq.Frame, que o libzmq reenvia a cada tópico sem copiar, e cada
+    envio só acrescenta o frame de tópico e a parte binária do cabeçalho. No
+    modo texto o tópico faz parte do único frame e o corpo é copiado de
+    qualquer forma, então só o cabeçalho do remetente é reaproveitado.
+
+    Só corpos a partir de min_size entram na LRU: codificar um texto curto
+    custa menos que a consulta, e o zmq.Frame só compensa a cópia a partir
+    de alguns KB. A mensagem entra na chave pela identidade (o mesmo objeto
+    str/bytes), não pelo conteúdo: calcular o hash de um corpo grande e
+    inédito custaria mais que codificá-lo. Buffers mutáveis (bytearray,
+    memoryview) não são guardados.
+
+    Args:
+        capacity: Entradas mantidas na LRU (0 desliga o cache)
+        multipart: Codifica para o modo multipart (senão, modo texto)
+        min_size: Tamanho mínimo da mensagem guardada na LRU
+    """
+
+    def __init__(self, capacity=16, multipart=False, min_size=4096):
+        self.capacity = capacity
+        self.multipart = multipart
+        self.min_size = min_size
+        # (usuario, id(mensagem), horario) -> (mensagem, corpo); a mensagem
+        # guardada mantém o id da chave válido
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._header_key = None
+        self._header = None
+
+    def get(self, timestamp, username, message):
+        """
+        Partes da mensagem que não dependem do tópico.
+
+        Returns:
+            (cabeçalho, corpo) - no multipart, a parte texto do cabeçalho e
+            o corpo (zmq.Frame a partir do primeiro reuso); no modo texto,
+            "[HH:MM:SS] usuario: " e o corpo em bytes
+        """
+        header = self.header(timestamp, username)
+        if (not self.multipart or not self.capacity or len(message) < self.min_size
+                or type(message) not in (str, bytes)):
+            return header, encode_body(message)
+        key = (username, id(message), timestamp)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            body = encode_body(message)
+            self.entries[key] = (message, body)
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+            return header, body
+        self.hits += 1
+        self.entries.move_to_end(key)
+        body = entry[1]
+        if type(body) is bytes:
+            body = zmq.Frame(body)
+            self.entries[key] = (message, body)
+        return header, body
+
+    def header(self, timestamp, username):
+        """Cabeçalho do remetente, reaproveitado enquanto o horário não muda"""
+        key = (username, timestamp)
+        if key != self._header_key:
+            if self.multipart:
+                self._header = encode_header_text(timestamp, username)
+            else:
+                self._header = f"[{timestamp}] {username}: ".encode(ENCODING)
+            self._header_key = key
+        return self._header
+
+    def __repr__(self):
+        return f"EncodedCache({self.hits} acertos, {self.misses} falhas)"
+
+
+class SequenceTracker:
+    """
+    Detecta lacunas na sequência de cada tópico e calcula a taxa de perda.
+
+    Cada mensagem custa O(1): compara a sequência recebida com a última do
+    mesmo publisher no tópico (`last` é indexado por (tópico, publisher)),
+    então publishers que dividem um tópico não geram lacunas falsas entre
+    si. Uma sequência menor ou igual à anterior do publisher indica que ele
+    foi reiniciado e não conta como perda.
+    """
+
+    def __init__(self):
+        self.last = {}
+        self.received = {}
+        self.lost = {}
+
+    def track(self, topic, seq, publisher=0):
+        """
+        Registra a sequência recebida no tópico.
+
+        Args:
+            publisher: Identificador do publisher (cabeçalho multipart)
+
+        Returns:
+            Número de mensagens perdidas antes desta (0 se nenhuma)
+        """
+        if not seq:
+            return 0
+        key = (topic, publisher)
+        last = self.last.get(key)
+        self.last[key] = seq
+        self.received[topic] = self.received.get(topic, 0) + 1
+        if last is None or seq <= last + 1:
+            return 0
+        gap = seq - last - 1
+        self.lost[topic] = self.lost.get(topic, 0) + gap
+        return gap
+
+    def loss_rate(self, topic):
+        """Fração das mensagens do tópico que foram perdidas"""
+        lost = self.lost.get(topic, 0)
+        total = lost + self.received.get(topic, 0)
+        return lost / total if total else 0.0
+
+    def stats(self):
+        """Retorna {topico: (recebidas, perdidas, taxa_de_perda)}"""
+        return {
+            topic: (received, self.lost.get(topic, 0), self.loss_rate(topic))
+            for topic, received in self.received.items()
+        }
+
+
+class Message:
+    """
+    Visão preguiçosa de uma mensagem recebida, sem cópia do conteúdo.
+
+    Guarda apenas o frame bruto (modo texto) ou a lista de zmq.Frame (modo
+    multipart). Tópico, remetente e horário são extraídos só quando
+    acessados, e o corpo só é decodificado ao ler `body` ou ao converter a
+    mensagem com str(). Consumidores que apenas contam, filtram por tópico ou
+    repassam mensagens (`raw`) nunca pagam pela decodificação completa. O
+    publisher também entrega ao console um Message dos frames que enviou,
+    formatado só se a linha for exibida.
+    """
+
+    __slots__ = ("raw", "multipart", "_topic", "_header_end")
+
+    def __init__(self, raw, multipart=False):
+        self.raw = raw
+        self.multipart = multipart
+        self._topic = None
+        self._header_end = None
+
+    @classmethod
+    def from_frames(cls, frames):
+        """
+        Mensagem multipart: zmq.Frame recebidos com recv_multipart(copy=False)
+        ou os frames (bytes/zmq.Frame) montados pelo publisher
+        """
+        return cls(frames, multipart=True)
+
+    @property
+    def topic(self):
+        if self._topic is None:
+            if self.multipart:
+                self._topic = decode_topic(_frame_bytes(self.raw[0]))
+            else:
+                self._topic = self.raw[:self.raw.find(b" ")].decode(ENCODING)
+        return self._topic
+
+    @property
+    def publisher(self):
+        """Identificador do publisher que numerou a mensagem (0 no modo texto)"""
+        if not self.multipart:
+            return 0
+        return unpack_header(self.raw[1])[1]
+
+    @property
+    def sequence(self):
+        """Número de sequência no tópico (0 = sem sequência / modo texto)"""
+        if not self.multipart:
+            return 0
+        return unpack_header(self.raw[1])[2]
+
+    @property
+    def sent_at(self):
+        """Horário de envio em epoch (None no modo texto)"""
+        if not self.multipart:
+            return None
+        return unpack_header(self.raw[1])[3]
+
+    def _header(self):
+        """Trecho "[HH:MM:SS] usuario" da mensagem, como bytes"""
+        if self.multipart:
+            return _frame_bytes(self.raw[1])[HEADER.size:]
+        start = self.raw.find(b" ") + 1
+        if self._header_end is None:
+            self._header_end = self.raw.find(b": ", start)
+        if not self.raw.startswith(b"[", start) or self._header_end < 0:
+            return b""
+        return self.raw[start:self._header_end]
+
+    @property
+    def timestamp(self):
+        """Horário formatado (HH:MM:SS) ou None"""
+        header = self._header()
+        end = header.find(b"]")
+        return header[1:end].decode(ENCODING) if end > 0 else None
+
+    @property
+    def username(self):
+        """Remetente da mensagem ou None"""
+        header = self._header()
+        end = header.find(b"] ")
+        return header[end + 2:].decode(ENCODING) if end > 0 else None
+
+    @property
+    def body_buffer(self):
+        """Corpo sem decodificação (memoryview)"""
+        if self.multipart:
+            return _frame_buffer(self.raw[2])
+        start = self.raw.find(b" ") + 1
+        if self._header():
+            start = self._header_end + 2
+        return memoryview(self.raw)[start:]
+
+    @property
+    def body(self):
+        """Corpo decodificado"""
+        return decode_body(self.body_buffer)
+
+    def __str__(self):
+        # Exibição: bytes inválidos em UTF-8 (corpo binário) são substituídos
+        if self.multipart:
+            body = str(self.body_buffer, ENCODING, "replace")
+            return f"{self.topic} {self._header().decode(ENCODING)}: {body}"
+        return self.raw.decode(ENCODING, "replace")
+
+    def __repr__(self):
+        return f"<Message topic={self.topic!r} {len(self)} bytes>"
+
+    def __len__(self):
+        if self.multipart:
+            return sum(len(frame) for frame in self.raw)
+        return len(self.raw)
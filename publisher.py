@@ -1,29 +1,115 @@
+import sys
 import zmq
 import time
-import threading
 from constPS import *
+from endpoints import BROKER, CHAT, bind_all, connect_first, load_endpoints
+from console import console_from_args, default_console
+from backpressure import BLOCK, CONFLATE, DROP, DropCounter, configure_send
+from protocolo import HEADER, HEADER_VERSION, EncodedCache, Message, encode_topic, new_publisher_id
+from message_log import MessageLog, ReplayService
+from metrics import STATS_TOPIC, Metrics, MetricsReporter
+from registry import RegistryClient, RegistryService
+from snapshot import LastValueCache, SnapshotService
+from subscriptions import SubscriptionTable, create_xpub
 
 class ChatPublisher:
     """
     Publisher para sistema de chat em grupo baseado em tópicos.
     Cada grupo/tópico representa uma sala de chat diferente.
+    
+    Args:
+        multipart: Envia [tópico, cabeçalho, corpo] em frames separados,
+            sem cópia, em vez de uma única string formatada
+        use_broker: Conecta ao frontend do broker (broker.py) em vez de
+            fazer bind, permitindo vários publishers simultâneos
+        track_subscriptions: Usa um socket XPUB para acompanhar as
+            inscrições e não serializar mensagens de tópicos sem inscritos
+        hwm: Limite da fila de envio por subscriber (ZMQ_SNDHWM)
+        policy: Política com a fila cheia: DROP, BLOCK ou CONFLATE (ver
+            backpressure.py); None mantém o descarte silencioso do ZeroMQ
+        send_timeout: Espera máxima em ms da política BLOCK
+        topic_policies: Políticas por tópico, ex.: {"SISTEMA": CONFLATE}
+        expected_subscribers: Antes da mensagem de boas-vindas, aguarda até
+            este número de inscrições no tópico SISTEMA (usa XPUB)
+        startup_timeout: Espera máxima em segundos por expected_subscribers
+        startup_wait: Sem expected_subscribers, espera curta (s) pelas
+            conexões iniciais antes da mensagem de boas-vindas; com
+            track_subscriptions termina na primeira inscrição em SISTEMA
+        message_log: message_log.MessageLog onde cada mensagem é gravada antes
+            do envio (inclusive de tópicos sem inscritos), para replay
+        cache: snapshot.LastValueCache com as últimas mensagens de cada
+            tópico, entregues a novos subscribers pelo SnapshotService
+        context: zmq.Context compartilhado (necessário para inproc://)
+        address: Endpoint ou lista de endpoints para bind (padrão:
+            endpoints.load_endpoints()); com use_broker, o frontend do broker
+        console: console.ConsoleSink que exibe o eco das mensagens enviadas
+            sem bloquear o envio (padrão: console.default_console(), compartilhado)
+        metrics: metrics.Metrics onde mensagens, bytes, descartes e tempo de
+            codificação por tópico são registrados (None = sem métricas)
+        registry: registry.RegistryClient onde os tópicos são registrados;
+            create_topic() cria salas novas em tempo de execução
+        encode_cache: Capacidade da LRU de corpos já codificados do modo
+            multipart (protocolo.EncodedCache); 0 desliga o cache
+        announce: Envia "Servidor de chat iniciado!" em SISTEMA ao iniciar;
+            False quando vários publishers compartilham o tópico
     """
     
-    def __init__(self):
-        self.context = zmq.Context()
-        self.socket = self.context.socket(zmq.PUB)
-        self.address = f"tcp://{HOST}:{PORT}"
-        self.socket.bind(self.address)
+    TOPICS = DEFAULT_TOPICS
+    
+    def __init__(self, multipart=False, use_broker=False, track_subscriptions=False,
+                 hwm=None, policy=None, send_timeout=100, topic_policies=None,
+                 expected_subscribers=0, startup_timeout=5.0, message_log=None,
+                 cache=None, context=None, address=None, console=None,
+                 metrics=None, registry=None, encode_cache=16, announce=True, startup_wait=1.0):
+        self.multipart = multipart
+        self.encoded = EncodedCache(encode_cache, multipart)
+        self.metrics = metrics
+        self.console = console or default_console()
+        self.use_broker = use_broker
+        self.track_subscriptions = track_subscriptions
+        self.context = context or zmq.Context()
+        if track_subscriptions or expected_subscribers:
+            self.socket = create_xpub(self.context)
+        else:
+            self.socket = self.context.socket(zmq.PUB)
+        
+        # Backpressure: mensagens descartadas e pendentes (CONFLATE) por tópico
+        self.policy = policy or DROP
+        self.topic_policies = topic_policies or {}
+        self.drops = DropCounter()
+        self.pending = {}
+        if policy is None and self.topic_policies:
+            policy = DROP
+        configure_send(self.socket, hwm, policy, send_timeout)
+        
+        # Inscrições ativas por tópico, lidas do socket XPUB
+        self.subscriptions = SubscriptionTable(self.socket, exact_counts=not use_broker)
+        
+        # tópico -> última sequência enviada; com log, continua de onde parou.
+        # O identificador vai no cabeçalho: subscribers acompanham a
+        # sequência de cada publisher do tópico separadamente
+        self.message_log = message_log
+        self.sequences = message_log.last_sequences() if message_log else {}
+        self.publisher_id = new_publisher_id()
+        
+        # Destinos onde cada mensagem é gravada antes do envio (log e cache)
+        self.cache = cache
+        self.stores = [store for store in (message_log, cache) if store is not None]
+        
+        if use_broker:
+            self.endpoints = [connect_first(
+                self.socket, address or load_endpoints(BROKER), inproc=context is not None
+            )]
+        else:
+            self.endpoints = bind_all(self.socket, address or load_endpoints())
+        self.address = ", ".join(self.endpoints)
         
         # Lista de tópicos/grupos disponíveis
-        self.topics = [
-            "GERAL",
-            "TECNOLOGIA", 
-            "ESPORTES",
-            "ENTRETENIMENTO",
-            "NOTICIAS",
-            "SISTEMA"
-        ]
+        self.topics = list(self.TOPICS)
+        self.registry = registry
+        if registry is not None:
+            for topic in self.topics:
+                registry.register(topic, owner="publisher")
         
         print("=" * 60)
         print("SERVIDOR PUBLISHER - SISTEMA DE CHAT POR TÓPICOS")
@@ -32,29 +118,219 @@ class ChatPublisher:
         print(f"\nTópicos/Grupos disponíveis: {', '.join(self.topics)}")
         print("=" * 60)
         
-        # Enviar mensagem de boas-vindas
-        time.sleep(1)  # Aguardar para conexões iniciais
-        self.send_system_message("Servidor de chat iniciado!")
+        # Enviar mensagem de boas-vindas assim que os filtros esperados
+        # chegarem, em vez de aguardar um tempo fixo pelas conexões
+        if expected_subscribers:
+            if not self.subscriptions.wait(expected_subscribers, "SISTEMA", startup_timeout):
+                print(f"Aviso: {self.subscriptions.count('SISTEMA')} de "
+                      f"{expected_subscribers} subscribers conectados")
+        elif announce and startup_wait:
+            # Sem número esperado, a boas-vindas enviada logo após o bind se
+            # perderia para os subscribers que ainda estão conectando
+            if self.track_subscriptions:
+                self.subscriptions.wait(1, "SISTEMA", startup_wait)
+            else:
+                time.sleep(startup_wait)
+        if announce:
+            self.send_system_message("Servidor de chat iniciado!")
+    
+    def update_subscriptions(self):
+        """Processa as notificações de (des)inscrição pendentes no socket XPUB"""
+        self.subscriptions.update()
+    
+    def has_subscribers(self, topic):
+        """Indica se algum subscriber está inscrito no tópico"""
+        if not self.track_subscriptions:
+            return True
+        self.subscriptions.update()
+        return self.subscriptions.has_subscribers(topic)
+    
+    def _should_publish(self, topic):
+        """Mensagens com log/cache são sempre gravadas, mesmo sem inscritos"""
+        return bool(self.stores) or self.has_subscribers(topic)
+    
+    def create_topic(self, topic, description=""):
+        """
+        Cria uma sala em tempo de execução e a anuncia no registro, se houver
+        
+        Returns:
+            True se o tópico era novo
+        """
+        if self.registry is not None:
+            self.registry.register(topic, description, owner="publisher")
+        if topic in self.topics:
+            return False
+        self.topics.append(topic)
+        return True
     
     def send_message(self, topic, username, message):
         """Envia uma mensagem para um tópico específico"""
+        if not self._should_publish(topic):
+            return
         timestamp = time.strftime("%H:%M:%S")
-        formatted_msg = f"{topic} [{timestamp}] {username}: {message}"
-        self.socket.send_string(formatted_msg)
-        print(f"Enviado -> {formatted_msg}")
+        self.console.message(self._publish(topic, timestamp, username, message), "Enviado -> ")
     
     def send_system_message(self, message):
         """Envia uma mensagem do sistema para o tópico SISTEMA"""
+        if not self._should_publish("SISTEMA"):
+            return
+        timestamp = time.strftime("%H:%M:%S")
+        self.console.notice(self._publish("SISTEMA", timestamp, "[SISTEMA]", message), "Sistema -> ")
+    
+    def _publish(self, topic, timestamp, username, message):
+        """
+        Envia a mensagem no formato configurado.
+        
+        Returns:
+            protocolo.Message dos frames enviados, para o eco no console: a
+            forma texto só é montada pela thread escritora, se for exibida
+        """
+        started = time.perf_counter()
+        seq = self.sequences[topic] = self.sequences.get(topic, 0) + 1
+        header_text, body = self.encoded.get(timestamp, username, message)
+        if self.multipart:
+            header = HEADER.pack(HEADER_VERSION, self.publisher_id, seq, time.time()) + header_text
+            frames = [encode_topic(topic), header, body]
+        else:
+            frames = [b"".join((f"{topic} ".encode("utf-8"), header_text, body))]
+        encode_seconds = time.perf_counter() - started
+        if self.stores:
+            self._record(topic, seq, frames)
+        self._send_frames(topic, frames, encode_seconds=encode_seconds)
+        if self.multipart:
+            return Message.from_frames(frames)
+        return Message(frames[0])
+    
+    def _record(self, topic, seq, frames):
+        """Grava a mensagem no log/cache: [tópico, cabeçalho, corpo] ou [texto]"""
+        if len(frames) == 1:
+            header, body = b"", frames[0]
+        else:
+            header, body = frames[1], frames[2]
+        for store in self.stores:
+            store.append(topic, seq, header, body)
+    
+    def _send_frames(self, topic, frames, flags=None, encode_seconds=0.0):
+        """
+        Envia os frames aplicando a política de backpressure do tópico.
+        
+        Args:
+            encode_seconds: Tempo gasto montando os frames (para as métricas)
+        
+        Returns:
+            True se a mensagem entrou na fila do socket
+        """
+        policy = self.topic_policies.get(topic, self.policy)
+        if flags is None:
+            flags = 0 if policy == BLOCK else zmq.NOBLOCK
+        
+        if self.pending:
+            if policy == CONFLATE and topic in self.pending:
+                # A mensagem nova substitui a pendente do mesmo tópico
+                del self.pending[topic]
+                self._drop(topic)
+            self.flush_pending()
+        
+        try:
+            self.socket.send_multipart(frames, flags, copy=False)
+        except zmq.Again:
+            if policy == CONFLATE:
+                self.pending[topic] = frames
+            else:
+                self._drop(topic)
+            return False
+        if self.metrics is not None:
+            self.metrics.record_message(topic, sum(map(len, frames)), encode_seconds)
+        return True
+    
+    def _drop(self, topic):
+        """Contabiliza uma mensagem descartada"""
+        self.drops.record(topic)
+        if self.metrics is not None:
+            self.metrics.record_drop(topic)
+    
+    def flush_pending(self):
+        """Tenta reenviar as últimas mensagens retidas pela política CONFLATE"""
+        for topic, frames in list(self.pending.items()):
+            try:
+                self.socket.send_multipart(frames, zmq.NOBLOCK, copy=False)
+            except zmq.Again:
+                return
+            del self.pending[topic]
+            if self.metrics is not None:
+                self.metrics.record_message(topic, sum(map(len, frames)))
+    
+    def publish_batch(self, messages, block=None):
+        """
+        Publica um lote de mensagens em sequência, sem eco no console.
+        
+        Todo o lote usa um único timestamp e as partes repetidas são
+        codificadas uma só vez: o tópico por lote e cada (usuário, mensagem)
+        pelo EncodedCache, cujo corpo é compartilhado entre os tópicos.
+        
+        Args:
+            messages: Iterável de tuplas (topico, usuario, mensagem); com
+                track_subscriptions, tópicos sem inscritos são ignorados
+            block: Se False, envia com zmq.NOBLOCK e descarta as mensagens
+                que não couberem na fila; se True, aguarda espaço; None
+                (padrão) segue a política de backpressure de cada tópico
+        
+        Returns:
+            Número de mensagens efetivamente enviadas
+        """
         timestamp = time.strftime("%H:%M:%S")
-        formatted_msg = f"SISTEMA [{timestamp}] [SISTEMA]: {message}"
-        self.socket.send_string(formatted_msg)
-        print(f"Sistema -> {formatted_msg}")
+        sent_at = time.time()
+        flags = None if block is None else (0 if block else zmq.NOBLOCK)
+        send_frames = self._send_frames
+        record = self._record if self.stores else None
+        clock = time.perf_counter if self.metrics is not None else None
+        encode_seconds = 0.0
+        sequences = self.sequences
+        pack_header = HEADER.pack
+        publisher_id = self.publisher_id
+        cached = self.encoded.get
+        encoded = {}
+        sent = 0
+        
+        if self.track_subscriptions:
+            self.subscriptions.update()
+        live = self.subscriptions.counts
+        everything = not self.track_subscriptions or record is not None or "" in live
+        # Inscrições com curinga chegam como prefixos: consulta por nível
+        prefixed = self.subscriptions.has_subscribers if self.subscriptions.prefixes else None
+        
+        for topic, username, message in messages:
+            if not (everything or topic in live or (prefixed and prefixed(topic))):
+                continue
+            if clock is not None:
+                started = clock()
+            seq = sequences[topic] = sequences.get(topic, 0) + 1
+            header_text, body = cached(timestamp, username, message)
+            if self.multipart:
+                topic_frame = encoded.get(topic)
+                if topic_frame is None:
+                    topic_frame = encoded[topic] = encode_topic(topic)
+                header = pack_header(HEADER_VERSION, publisher_id, seq, sent_at) + header_text
+                frames = [topic_frame, header, body]
+            else:
+                prefix = encoded.get(topic)
+                if prefix is None:
+                    prefix = encoded[topic] = f"{topic} ".encode("utf-8")
+                frames = [b"".join((prefix, header_text, body))]
+            if clock is not None:
+                encode_seconds = clock() - started
+            if record is not None:
+                record(topic, seq, frames)
+            if send_frames(topic, frames, flags, encode_seconds):
+                sent += 1
+        
+        return sent
     
     def broadcast_to_all(self, username, message):
         """Envia uma mensagem para todos os tópicos"""
-        for topic in self.topics:
-            if topic != "SISTEMA":
-                self.send_message(topic, username, message)
+        topics = [topic for topic in self.topics if topic != "SISTEMA"]
+        sent = self.publish_batch((topic, username, message) for topic in topics)
+        self.console.notice(f"{sent} tópicos: {username}: {message}", "Broadcast -> ")
     
     def run_interactive_mode(self):
         """Modo interativo para o publisher enviar mensagens"""
@@ -66,6 +342,7 @@ class ChatPublisher:
         print("  - Formato: <número_tópico> <nome_usuario> <mensagem>")
         print("  - Exemplo: 1 Admin Olá a todos!")
         print("  - Digite 'broadcast <usuario> <msg>' para enviar a todos")
+        print("  - Digite 'sala <nome> [descrição]' para criar um tópico")
         print("  - Digite 'sair' para encerrar")
         print("=" * 60)
         
@@ -95,6 +372,17 @@ class ChatPublisher:
                         print("Formato inválido. Use: broadcast <usuario> <mensagem>")
                     continue
                 
+                if user_input.startswith('sala '):
+                    parts = user_input.split(' ', 2)
+                    try:
+                        if self.create_topic(parts[1], parts[2] if len(parts) > 2 else ""):
+                            print(f"✓ Tópico {len(self.topics)}. {parts[1]} criado")
+                        else:
+                            print(f"Tópico {parts[1]} já existe")
+                    except (ValueError, zmq.Again) as e:
+                        print(f"Registro indisponível ou nome inválido: {e}")
+                    continue
+                
                 # Processar mensagem para tópico específico
                 parts = user_input.split(' ', 2)
                 if len(parts) >= 3:
@@ -124,6 +412,15 @@ class ChatPublisher:
         print("\nModo automático ativado - enviando mensagens periódicas...")
         print("Pressione Ctrl+C para parar\n")
         
+        # Mensagens automáticas variadas
+        messages = [
+            "Bem-vindos ao chat!",
+            "Alguém online?",
+            "Sistema funcionando normalmente",
+            "Nova atualização disponível",
+            "Chat ativo!"
+        ]
+        
         counter = 0
         try:
             while True:
@@ -137,15 +434,6 @@ class ChatPublisher:
                 if topic == "SISTEMA":
                     continue
                 
-                # Mensagens automáticas variadas
-                messages = [
-                    "Bem-vindos ao chat!",
-                    "Alguém online?",
-                    "Sistema funcionando normalmente",
-                    "Nova atualização disponível",
-                    "Chat ativo!"
-                ]
-                
                 message = messages[counter % len(messages)]
                 self.send_message(topic, "Bot", message)
                 
@@ -154,7 +442,66 @@ class ChatPublisher:
             self.send_system_message("Modo automático encerrado")
 
 def main():
-    publisher = ChatPublisher()
+    # python publisher.py --broker  -> publica através do broker.py
+    # python publisher.py --multipart -> formato multipart (com sequência)
+    # python publisher.py --xpub    -> ignora tópicos sem inscritos
+    # python publisher.py --esperar N -> aguarda N subscribers antes de iniciar
+    # python publisher.py --historico -> grava as mensagens e atende replay
+    # python publisher.py --retrato K -> guarda as K últimas de cada tópico
+    # python publisher.py --metricas -> exporta métricas (STATS, .prom, HTTP)
+    # python publisher.py --amostra N -> exibe só 1 a cada N mensagens enviadas
+    # python publisher.py --endpoints ipc:///tmp/chat.ipc,tcp://*:5555
+    #   -> bind em vários endpoints (ver endpoints.py)
+    # python publisher.py --registro -> registra os tópicos no registry.py
+    #   (inicia o serviço neste processo se ainda não houver um)
+    expected = 0
+    if "--esperar" in sys.argv:
+        expected = int(sys.argv[sys.argv.index("--esperar") + 1])
+    message_log = replay = None
+    if "--historico" in sys.argv:
+        message_log = MessageLog(LOG_DIR)
+        replay = ReplayService(message_log)
+        replay.start()
+        print(f"Histórico em {LOG_DIR}/, replay em {replay.address}")
+    cache = None
+    if "--retrato" in sys.argv:
+        cache = LastValueCache(int(sys.argv[sys.argv.index("--retrato") + 1]))
+        snapshots = SnapshotService(cache)
+        snapshots.start()
+        print(f"Retrato das últimas mensagens em {snapshots.address}")
+    metrics = reporter = None
+    if "--metricas" in sys.argv:
+        metrics = Metrics("publisher")
+        reporter = MetricsReporter(
+            metrics,
+            address=f"tcp://{HOST}:{STATS_PORT}",
+            path="metricas_publisher.prom",
+            http_port=METRICS_PORT,
+        )
+        reporter.start()
+        print(f"Métricas: tópico {STATS_TOPIC} em {reporter.address}, "
+              f"http://{HOST}:{METRICS_PORT}/metrics")
+    registry = None
+    if "--registro" in sys.argv:
+        try:
+            RegistryService(topics=DEFAULT_TOPICS).start()
+            print(f"Registro de tópicos em tcp://{HOST}:{REGISTRY_PORT}")
+        except zmq.ZMQError:
+            pass  # outro publisher ou o registry.py já atende
+        registry = RegistryClient()
+    use_broker = "--broker" in sys.argv
+    publisher = ChatPublisher(
+        multipart="--multipart" in sys.argv,
+        registry=registry,
+        metrics=metrics,
+        use_broker=use_broker,
+        address=load_endpoints(BROKER if use_broker else CHAT, sys.argv),
+        console=console_from_args(sys.argv),
+        track_subscriptions="--xpub" in sys.argv,
+        expected_subscribers=expected,
+        message_log=message_log,
+        cache=cache
+    )
     
     print("\nEscolha o modo de operação:")
     print("1. Modo Interativo (enviar mensagens manualmente)")
@@ -169,6 +516,9 @@ def main():
     else:
         print("Opção inválida. Iniciando modo interativo...")
         publisher.run_interactive_mode()
+    
+    if reporter is not None:
+        reporter.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,473 @@
+"""
+Registro dinâmico de tópicos (salas) do chat.
+
+As listas de tópicos eram fixas em cada programa e os clientes escolhiam
+tópicos pelo número na lista. O registro é um serviço ROUTER com um
+catálogo em memória onde publishers registram (e removem) tópicos em tempo
+de execução; subscribers consultam o catálogo com paginação e busca por
+prefixo e acompanham as alterações por um feed PUB:
+
+    publisher --REGISTER--> ROUTER (REGISTRY_PORT) <--LIST/CHANGES-- subscriber
+                                  |
+                            PUB (REGISTRY_FEED_PORT) --alterações--> subscriber
+
+Cada alteração incrementa a versão do catálogo. O RegistryClient mantém uma
+cópia local (opcionalmente em arquivo) marcada com (época, versão): ao
+iniciar pede apenas as alterações desde a versão guardada e só recarrega
+tudo se a época mudou (registro reiniciado) ou se as alterações já saíram
+do histórico do serviço.
+
+Pedidos (DEALER) e respostas:
+    [REGISTER, json {name, description, owner}]  -> [OK, época, versão]
+    [UNREGISTER, nome]                            -> [OK, época, versão]
+    [LIST, json {prefix, after, limit}]           -> [PAGE, época, versão, json {topics, next}]
+    [CHANGES, versão (uint64)]                    -> [CHANGES, época, versão, json [alterações]]
+                                                     ou [RESET, época, versão]
+    qualquer erro                                 -> [ERR, mensagem]
+Feed PUB: [FEED_TOPIC, época, versão, json {op, name, info}]
+"""
+
+import bisect
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+from collections import deque
+
+import zmq
+
+from constPS import *
+
+REGISTER = b"REGISTER"
+UNREGISTER = b"UNREGISTER"
+LIST = b"LIST"
+CHANGES = b"CHANGES"
+OK = b"OK"
+PAGE = b"PAGE"
+RESET = b"RESET"
+ERR = b"ERR"
+FEED_TOPIC = b"REGISTRY"
+
+VERSION = struct.Struct("!Q")
+
+_service_ids = itertools.count()
+
+
+class TopicRegistry:
+    """
+    Catálogo de tópicos em memória, versionado.
+
+    Os nomes ficam também em uma lista ordenada, então paginação e busca
+    por prefixo são buscas binárias, sem percorrer o catálogo.
+
+    Args:
+        history: Alterações guardadas para clientes que pedem CHANGES; um
+            cliente mais atrasado que isso recarrega o catálogo inteiro
+    """
+
+    def __init__(self, history=1000):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.version = 0
+        self.topics = {}  # nome -> {"name", "description", "owner", "created"}
+        self.names = []   # nomes em ordem
+        self.changes = deque(maxlen=history)  # {"version", "op", "name", "info"}
+        self._lock = threading.Lock()
+
+    def register(self, name, description="", owner=""):
+        """
+        Registra (ou atualiza) um tópico.
+
+        Returns:
+            (versão, alteração) - alteração é None quando nada mudou
+        """
+        if not name or " " in name:
+            raise ValueError(f"Nome de tópico inválido: {name!r}")
+        with self._lock:
+            current = self.topics.get(name)
+            if current is not None and (current["description"], current["owner"]) == (description, owner):
+                return self.version, None
+            info = {
+                "name": name,
+                "description": description,
+                "owner": owner,
+                "created": current["created"] if current else time.time(),
+            }
+            if current is None:
+                bisect.insort(self.names, name)
+            self.topics[name] = info
+            return self._change("add", name, info)
+
+    def unregister(self, name):
+        """Remove um tópico; (versão, alteração) como em register()"""
+        with self._lock:
+            if self.topics.pop(name, None) is None:
+                return self.version, None
+            del self.names[bisect.bisect_left(self.names, name)]
+            return self._change("remove", name, None)
+
+    def _change(self, op, name, info):
+        self.version += 1
+        change = {"version": self.version, "op": op, "name": name, "info": info}
+        self.changes.append(change)
+        return self.version, change
+
+    def page(self, prefix="", after="", limit=100):
+        """
+        Uma página do catálogo, em ordem de nome.
+
+        Args:
+            prefix: Só tópicos que começam com este prefixo
+            after: Cursor - último nome da página anterior ("" = início)
+            limit: Máximo de tópicos na página
+
+        Returns:
+            (lista de infos, cursor da próxima página ou None)
+        """
+        with self._lock:
+            names = self.names
+            start = bisect.bisect_right(names, after) if after else 0
+            start = max(start, bisect.bisect_left(names, prefix))
+            page = []
+            for name in itertools.islice(names, start, start + limit + 1):
+                if not name.startswith(prefix):
+                    break
+                page.append(self.topics[name])
+            more = len(page) > limit
+            page = page[:limit]
+            return page, (page[-1]["name"] if more else None)
+
+    def changes_since(self, version):
+        """
+        Alterações posteriores a `version`.
+
+        Returns:
+            Lista de alterações, ou None se já saíram do histórico
+        """
+        with self._lock:
+            if version >= self.version:
+                return []
+            if not self.changes or self.changes[0]["version"] > version + 1:
+                return None
+            return [change for change in self.changes if change["version"] > version]
+
+
+class RegistryService:
+    """
+    Serviço ROUTER do registro, com feed PUB de alterações.
+
+    Args:
+        registry: TopicRegistry atendido (padrão: um catálogo novo)
+        topics: Tópicos registrados ao iniciar (ex.: DEFAULT_TOPICS)
+        address: Endereço do ROUTER (padrão: tcp://HOST:REGISTRY_PORT)
+        feed_address: Endereço do PUB de alterações
+            (padrão: tcp://HOST:REGISTRY_FEED_PORT)
+        context: zmq.Context compartilhado (None = usa a instância global)
+    """
+
+    def __init__(self, registry=None, topics=(), address=None, feed_address=None, context=None):
+        self.registry = registry or TopicRegistry()
+        for topic in topics:
+            self.registry.register(topic)
+        self.context = context or zmq.Context.instance()
+        self.address = address or f"tcp://{HOST}:{REGISTRY_PORT}"
+        self.feed_address = feed_address or f"tcp://{HOST}:{REGISTRY_FEED_PORT}"
+        self.socket = self.context.socket(zmq.ROUTER)
+        self.socket.setsockopt(zmq.ROUTER_MANDATORY, 1)
+        self.socket.setsockopt(zmq.SNDTIMEO, 1000)
+        self.socket.bind(self.address)
+        self.feed = self.context.socket(zmq.PUB)
+        self.feed.bind(self.feed_address)
+        self._thread = None
+
+        control_address = f"inproc://registry-service-{next(_service_ids)}"
+        self._control = self.context.socket(zmq.PAIR)
+        self._control.bind(control_address)
+        self._commands = self.context.socket(zmq.PAIR)
+        self._commands.connect(control_address)
+
+    def _stamp(self, version):
+        return [self.registry.epoch.encode("utf-8"), VERSION.pack(version)]
+
+    def handle(self, command, payload):
+        """Executa um pedido e devolve os frames da resposta"""
+        registry = self.registry
+        if command == REGISTER:
+            request = json.loads(payload)
+            version, change = registry.register(
+                request["name"], request.get("description", ""), request.get("owner", "")
+            )
+        elif command == UNREGISTER:
+            version, change = registry.unregister(payload.decode("utf-8"))
+        elif command == LIST:
+            request = json.loads(payload or b"{}")
+            # Versão lida antes da página: o cliente aplica depois as
+            # alterações desde ela, sem risco de perder uma
+            version = registry.version
+            topics, cursor = registry.page(
+                request.get("prefix", ""), request.get("after", ""), int(request.get("limit", 100))
+            )
+            body = json.dumps({"topics": topics, "next": cursor}).encode("utf-8")
+            return [PAGE, *self._stamp(version), body]
+        elif command == CHANGES:
+            since = VERSION.unpack(payload)[0]
+            version = registry.version
+            changes = registry.changes_since(since)
+            if changes is None:
+                return [RESET, *self._stamp(version)]
+            return [CHANGES, *self._stamp(version), json.dumps(changes).encode("utf-8")]
+        else:
+            raise ValueError(f"Comando desconhecido: {command!r}")
+
+        if change is not None:
+            self.feed.send_multipart([FEED_TOPIC, *self._stamp(version), json.dumps(change).encode("utf-8")])
+        return [OK, *self._stamp(version)]
+
+    def run(self):
+        """Laço do serviço; bloqueia até stop() ser chamado"""
+        poller = zmq.Poller()
+        poller.register(self.socket, zmq.POLLIN)
+        poller.register(self._control, zmq.POLLIN)
+
+        while True:
+            events = dict(poller.poll())
+            if self._control in events:
+                self._control.recv()
+                break
+            if self.socket in events:
+                identity, command, *payload = self.socket.recv_multipart()
+                try:
+                    reply = self.handle(command, payload[0] if payload else b"")
+                except (ValueError, KeyError, struct.error) as e:
+                    reply = [ERR, str(e).encode("utf-8")]
+                try:
+                    self.socket.send_multipart([identity, *reply])
+                except zmq.ZMQError as e:
+                    print(f"Resposta do registro não entregue: {e}")
+
+    def start(self):
+        """Executa o serviço em uma thread em segundo plano"""
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Encerra o serviço e fecha os sockets"""
+        if self._thread is not None:
+            self._commands.send(b"stop")
+            self._thread.join()
+            self._thread = None
+        self._commands.close(linger=0)
+        self._control.close(linger=0)
+        self.socket.close(linger=0)
+        self.feed.close(linger=0)
+
+
+class RegistryClient:
+    """
+    Cliente do registro com cópia local versionada do catálogo.
+
+    Args:
+        address: Endereço do RegistryService (padrão: tcp://HOST:REGISTRY_PORT)
+        feed_address: Endereço do feed de alterações; None = sem feed (o
+            catálogo só é atualizado por sync())
+        cache_path: Arquivo JSON onde o catálogo é guardado entre execuções
+            (None = só em memória)
+        context: zmq.Context compartilhado (None = usa a instância global)
+        timeout: Espera máxima por uma resposta, em ms
+    """
+
+    def __init__(self, address=None, feed_address=None, cache_path=None, context=None, timeout=2000):
+        self.context = context or zmq.Context.instance()
+        self.address = address or f"tcp://{HOST}:{REGISTRY_PORT}"
+        self.timeout = timeout
+        self.cache_path = cache_path
+        self.epoch = None
+        self.version = 0
+        self.topics = {}
+        self.socket = self._connect()
+        self.feed = None
+        if feed_address is not None:
+            self.feed = self.context.socket(zmq.SUB)
+            self.feed.setsockopt(zmq.LINGER, 0)
+            self.feed.connect(feed_address)
+            self.feed.setsockopt(zmq.SUBSCRIBE, FEED_TOPIC)
+        if cache_path is not None and os.path.exists(cache_path):
+            with open(cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            self.epoch, self.version, self.topics = cached["epoch"], cached["version"], cached["topics"]
+
+    def _connect(self):
+        socket = self.context.socket(zmq.DEALER)
+        socket.setsockopt(zmq.RCVTIMEO, self.timeout)
+        socket.setsockopt(zmq.LINGER, 0)
+        socket.connect(self.address)
+        return socket
+
+    def _request(self, *frames):
+        """
+        Envia um pedido e aguarda a resposta.
+
+        Raises:
+            zmq.Again: O registro não respondeu dentro do timeout
+            ValueError: O registro recusou o pedido
+        """
+        self.socket.send_multipart(list(frames))
+        try:
+            reply = self.socket.recv_multipart()
+        except zmq.Again:
+            # Uma resposta atrasada não pode ser lida como a do próximo pedido
+            self.socket.close()
+            self.socket = self._connect()
+            raise
+        if reply[0] == ERR:
+            raise ValueError(reply[1].decode("utf-8"))
+        return reply[0], reply[1].decode("utf-8"), VERSION.unpack(reply[2])[0], reply[3:]
+
+    def register(self, name, description="", owner=""):
+        """Registra um tópico no serviço; retorna a versão do catálogo"""
+        request = json.dumps({"name": name, "description": description, "owner": owner})
+        return self._request(REGISTER, request.encode("utf-8"))[2]
+
+    def unregister(self, name):
+        """Remove um tópico do serviço; retorna a versão do catálogo"""
+        return self._request(UNREGISTER, name.encode("utf-8"))[2]
+
+    def page(self, prefix="", after="", limit=100):
+        """
+        Consulta uma página do catálogo no serviço.
+
+        Returns:
+            (lista de infos, cursor da próxima página ou None)
+        """
+        request = json.dumps({"prefix": prefix, "after": after, "limit": limit}).encode("utf-8")
+        _, _, _, (body,) = self._request(LIST, request)
+        body = json.loads(body)
+        return body["topics"], body["next"]
+
+    def search(self, prefix="", page_size=100):
+        """Percorre, página a página, os tópicos que começam com o prefixo"""
+        after = ""
+        while True:
+            topics, after = self.page(prefix, after, page_size)
+            yield from topics
+            if after is None:
+                return
+
+    def sync(self):
+        """
+        Atualiza a cópia local: só as alterações desde a versão guardada, ou
+        o catálogo inteiro se a época mudou ou o histórico não alcança.
+
+        Returns:
+            True se o catálogo foi recarregado por inteiro
+        """
+        reloaded = False
+        kind, epoch, version, rest = self._request(CHANGES, VERSION.pack(self.version))
+        if epoch != self.epoch or kind == RESET:
+            self._reload()
+            reloaded = True
+        else:
+            self._apply(json.loads(rest[0]))
+        self._save()
+        return reloaded
+
+    def _reload(self):
+        topics = {}
+        after = ""
+        version = epoch = None
+        while True:
+            request = json.dumps({"after": after, "limit": 500}).encode("utf-8")
+            _, page_epoch, page_version, (body,) = self._request(LIST, request)
+            if epoch is None:
+                epoch, version = page_epoch, page_version
+            body = json.loads(body)
+            for info in body["topics"]:
+                topics[info["name"]] = info
+            after = body["next"]
+            if after is None:
+                break
+        self.epoch, self.version, self.topics = epoch, version, topics
+        # Alterações feitas enquanto as páginas eram lidas
+        kind, _, _, rest = self._request(CHANGES, VERSION.pack(version))
+        if kind == CHANGES:
+            self._apply(json.loads(rest[0]))
+
+    def _apply(self, changes):
+        for change in changes:
+            if change["version"] <= self.version:
+                continue
+            if change["op"] == "add":
+                self.topics[change["name"]] = change["info"]
+            else:
+                self.topics.pop(change["name"], None)
+            self.version = change["version"]
+
+    def poll_updates(self):
+        """
+        Aplica as alterações pendentes no feed, sem bloquear; uma lacuna de
+        versão (alteração perdida) dispara sync().
+
+        Returns:
+            Número de alterações aplicadas
+        """
+        if self.feed is None:
+            return 0
+        applied = 0
+        while True:
+            try:
+                _, epoch, version, body = self.feed.recv_multipart(zmq.NOBLOCK)
+            except zmq.Again:
+                break
+            version = VERSION.unpack(version)[0]
+            if epoch.decode("utf-8") != self.epoch or version > self.version + 1:
+                self.sync()
+            else:
+                self._apply([json.loads(body)])
+            applied += 1
+        if applied:
+            self._save()
+        return applied
+
+    def _save(self):
+        if self.cache_path is None:
+            return
+        temporary = f"{self.cache_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"epoch": self.epoch, "version": self.version, "topics": self.topics}, f)
+        os.replace(temporary, self.cache_path)
+
+    def names(self, prefix=""):
+        """Nomes do catálogo local, em ordem"""
+        return sorted(name for name in self.topics if name.startswith(prefix))
+
+    def close(self):
+        self.socket.close()
+        if self.feed is not None:
+            self.feed.close()
+
+
+def main():
+    service = RegistryService(topics=DEFAULT_TOPICS)
+
+    print("=" * 60)
+    print("REGISTRO DE TÓPICOS - SISTEMA DE CHAT POR TÓPICOS")
+    print("=" * 60)
+    print(f"Pedidos -> {service.address}")
+    print(f"Alterações -> {service.feed_address}")
+    print(f"Tópicos iniciais: {', '.join(DEFAULT_TOPICS)}")
+    print("Pressione Ctrl+C para encerrar")
+    print("=" * 60)
+
+    service.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nEncerrando registro...")
+    service.stop()
+
+
+if __name__ == "__main__":
+    main()
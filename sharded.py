@@ -0,0 +1,222 @@
+"""
+Publisher fragmentado em vários processos (um por núcleo).
+
+Um ChatPublisher formata e envia tudo em uma única thread Python, limitado a
+um núcleo pelo GIL. O ShardedPublisher é um despachante leve: cada tópico é
+atribuído, por hash estável, a um de N processos trabalhadores; cada
+trabalhador tem seu próprio ChatPublisher conectado ao frontend do broker
+(XSUB), e os subscribers continuam conectando no backend (XPUB):
+
+    despachante --PUSH/PULL--> trabalhador i (ChatPublisher) --> XSUB ==broker==> XPUB --> subscribers
+
+Como um tópico sempre vai para o mesmo trabalhador e cada canal PUSH/PULL
+é FIFO, a ordem (e a numeração de sequência) por tópico é preservada;
+por isso só o trabalhador dono de SISTEMA envia a mensagem de boas-vindas. O
+despachante apenas agrupa as mensagens em lotes por trabalhador; a
+formatação e o envio acontecem em paralelo nos trabalhadores.
+"""
+
+import contextlib
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import zlib
+
+import zmq
+
+from broker import ChatBroker
+from console import ConsoleSink
+from constPS import *
+from endpoints import BROKER, bind_all, load_endpoints
+from publisher import ChatPublisher
+
+ENCODING = "utf-8"
+STOP = b"stop"
+
+
+def shard_of(topic, shards):
+    """Trabalhador responsável pelo tópico (hash estável entre processos)"""
+    return zlib.crc32(topic.encode(ENCODING)) % shards
+
+
+def _worker(index, workers, address, results, frontend, options):
+    """Processo trabalhador: recebe lotes do despachante e publica"""
+    context = zmq.Context()
+    commands = context.socket(zmq.PULL)
+    commands.connect(address)
+    report = context.socket(zmq.PUSH)
+    report.connect(results)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        publisher = ChatPublisher(
+            use_broker=True, address=frontend, context=context,
+            console=ConsoleSink(sample=0, summary_interval=0, stream=io.StringIO()),
+            announce=index == shard_of("SISTEMA", workers),
+            **options
+        )
+    report.send_multipart([b"ready", b"%d" % index])
+
+    sent = 0
+    while True:
+        frames = commands.recv_multipart()
+        if len(frames) == 1 and frames[0] == STOP:
+            break
+        # Só tópico e remetente são texto; o corpo segue como bytes
+        topics = [frame.decode(ENCODING) for frame in frames[0::3]]
+        usernames = [frame.decode(ENCODING) for frame in frames[1::3]]
+        sent += publisher.publish_batch(zip(topics, usernames, frames[2::3]))
+
+    report.send_multipart([b"done", b"%d" % index, b"%d" % sent, b"%d" % publisher.drops.total])
+    publisher.console.close()
+    publisher.socket.close()
+    for socket in (commands, report):
+        socket.close()
+    context.term()
+
+
+class ShardedPublisher:
+    """
+    Despachante que distribui os tópicos entre N processos publishers.
+
+    Args:
+        workers: Número de processos trabalhadores (padrão: núcleos da máquina)
+        batch_size: Mensagens acumuladas por trabalhador antes do envio
+        start_broker: Inicia um ChatBroker neste processo; False usa um
+            broker.py já em execução
+        frontend: Endpoint(s) do frontend do broker (padrão:
+            endpoints.load_endpoints(BROKER))
+        backend: Endpoint(s) do backend do broker onde os subscribers
+            conectam, quando start_broker (padrão: endpoints.load_endpoints())
+        **publisher_options: Repassados ao ChatPublisher de cada trabalhador
+            (multipart, hwm, policy, ...)
+    """
+
+    def __init__(self, workers=None, batch_size=100, start_broker=True, frontend=None,
+                 backend=None, **publisher_options):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.topics = list(ChatPublisher.TOPICS)
+        self.context = zmq.Context()
+
+        frontend = frontend or load_endpoints(BROKER)
+        self.broker = ChatBroker(frontend, backend, self.context) if start_broker else None
+        if self.broker is not None:
+            self.broker.start()
+        # Trabalhadores estão em outros processos: inproc não serve
+        frontend = [endpoint for endpoint in frontend if not endpoint.startswith("inproc://")]
+
+        # Canais despachante -> trabalhador: ipc quando disponível
+        self._directory = tempfile.mkdtemp(prefix="chat-shards-") if zmq.has("ipc") else None
+        self.channels = []
+        for index in range(self.workers):
+            socket = self.context.socket(zmq.PUSH)
+            endpoint = (f"ipc://{os.path.join(self._directory, f'shard-{index}')}"
+                        if self._directory else "tcp://127.0.0.1:*")
+            self.channels.append((socket, bind_all(socket, [endpoint])[0]))
+        self.results = self.context.socket(zmq.PULL)
+        results = (f"ipc://{os.path.join(self._directory, 'results')}"
+                   if self._directory else "tcp://127.0.0.1:*")
+        results = bind_all(self.results, [results])[0]
+
+        # spawn: o processo filho não herda o contexto ZeroMQ nem a thread do broker
+        spawn = multiprocessing.get_context("spawn")
+        self.processes = [
+            spawn.Process(
+                target=_worker,
+                args=(index, self.workers, address, results, frontend, publisher_options),
+                daemon=True,
+            )
+            for index, (_, address) in enumerate(self.channels)
+        ]
+        for process in self.processes:
+            process.start()
+        for _ in self._results():
+            pass  # b"ready"
+
+        self.pending = [[] for _ in range(self.workers)]
+        self._shards = {}
+
+    def _results(self, timeout=100):
+        """
+        Lê um relatório (b"ready" ou b"done") de cada trabalhador.
+
+        Um trabalhador que morreu não vai responder: a cada `timeout` ms sem
+        relatório, os processos encerrados deixam de ser aguardados.
+
+        Yields:
+            (índice, frames restantes do relatório)
+        """
+        pending = set(range(self.workers))
+        poller = zmq.Poller()
+        poller.register(self.results, zmq.POLLIN)
+        while pending:
+            if poller.poll(timeout):
+                _, index, *rest = self.results.recv_multipart()
+                pending.discard(int(index))
+                yield int(index), rest
+                continue
+            for index in [index for index in pending if not self.processes[index].is_alive()]:
+                pending.discard(index)
+                print(f"Trabalhador {index} encerrou sem responder "
+                      f"(código {self.processes[index].exitcode})")
+
+    def shard(self, topic):
+        """Índice do trabalhador do tópico (memorizado)"""
+        index = self._shards.get(topic)
+        if index is None:
+            index = self._shards[topic] = shard_of(topic, self.workers)
+        return index
+
+    def send_message(self, topic, username, message):
+        """Enfileira uma mensagem; o lote do trabalhador é enviado ao encher"""
+        index = self.shard(topic)
+        pending = self.pending[index]
+        pending += (topic.encode(ENCODING), username.encode(ENCODING),
+                    message.encode(ENCODING) if isinstance(message, str) else message)
+        if len(pending) >= 3 * self.batch_size:
+            self._flush(index)
+
+    def publish_batch(self, messages):
+        """Distribui um lote de tuplas (topico, usuario, mensagem) e envia tudo"""
+        for topic, username, message in messages:
+            self.send_message(topic, username, message)
+        self.flush()
+
+    def _flush(self, index):
+        pending = self.pending[index]
+        if pending:
+            self.channels[index][0].send_multipart(pending, copy=False)
+            self.pending[index] = []
+
+    def flush(self):
+        """Envia aos trabalhadores os lotes incompletos"""
+        for index in range(self.workers):
+            self._flush(index)
+
+    def close(self):
+        """
+        Envia os lotes pendentes, encerra os trabalhadores e o broker.
+
+        Returns:
+            {indice_do_trabalhador: (enviadas, descartadas)} - sem os
+            trabalhadores que morreram antes de responder
+        """
+        self.flush()
+        for socket, _ in self.channels:
+            socket.send(STOP)
+        stats = {}
+        for index, (sent, drops) in self._results():
+            stats[index] = (int(sent), int(drops))
+        for process in self.processes:
+            process.join()
+        for socket, _ in self.channels:
+            socket.close()
+        self.results.close()
+        if self.broker is not None:
+            self.broker.stop()
+        self.context.term()
+        if self._directory:
+            shutil.rmtree(self._directory, ignore_errors=True)
+        return stats
@@ -0,0 +1,132 @@
+"""
+Cache de últimos valores por tópico (padrão Clone do guia do ZeroMQ).
+
+Um subscriber novo só recebe as mensagens publicadas depois da inscrição. O
+LastValueCache guarda, em memória, as K mensagens mais recentes de cada
+tópico; um SnapshotService (ROUTER) entrega esse retrato sob pedido e o
+subscriber passa para o fluxo ao vivo descartando, pela sequência, o que já
+veio no retrato:
+
+    1. SUB se inscreve no tópico (mensagens ao vivo ficam na fila)
+    2. DEALER pede o retrato e recebe [M...] + [E, ultima_sequencia]
+    3. mensagens ao vivo com sequência <= ultima_sequencia são descartadas
+
+A memória de cada tópico é limitada por número de mensagens, por bytes e,
+opcionalmente, por idade; ao exceder qualquer limite as mais antigas saem.
+"""
+
+import threading
+import time
+from collections import deque
+
+from constPS import *
+from message_log import ReplayService, request_replay
+
+
+class LastValueCache:
+    """
+    Buffer circular das mensagens mais recentes de cada tópico.
+
+    Tem a mesma interface de gravação/leitura do MessageLog (append/read),
+    então pode ser servido pelo ReplayService.
+
+    Args:
+        capacity: Mensagens mantidas por tópico
+        max_bytes: Limite de bytes (cabeçalho + corpo) por tópico; None = sem limite
+        max_age: Idade máxima em segundos das mensagens; None = sem limite
+        topic_capacity: Capacidades por tópico, ex.: {"SISTEMA": 1}
+    """
+
+    def __init__(self, capacity=50, max_bytes=None, max_age=None, topic_capacity=None):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.topic_capacity = topic_capacity or {}
+        self.entries = {}  # tópico -> deque[(seq, cabecalho, corpo, gravado_em)]
+        self.sizes = {}    # tópico -> bytes em uso
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def append(self, topic, seq, header, body):
+        """Guarda uma mensagem do tópico, removendo as mais antigas se preciso"""
+        # Cópias: o corpo pode ser um buffer do chamador (envio sem cópia)
+        entry = (seq, bytes(header), bytes(body), time.monotonic())
+        with self._lock:
+            entries = self.entries.get(topic)
+            if entries is None:
+                capacity = self.topic_capacity.get(topic, self.capacity)
+                entries = self.entries[topic] = deque(maxlen=capacity)
+                self.sizes[topic] = 0
+            if len(entries) == entries.maxlen:
+                self._evict(topic, entries)
+            entries.append(entry)
+            self.sizes[topic] += len(entry[1]) + len(entry[2])
+            if self.max_bytes is not None:
+                while self.sizes[topic] > self.max_bytes and len(entries) > 1:
+                    self._evict(topic, entries)
+
+    def _evict(self, topic, entries):
+        _, header, body, _ = entries.popleft()
+        self.sizes[topic] -= len(header) + len(body)
+        self.evicted += 1
+
+    def _expire(self, topic, entries):
+        """Remove as mensagens mais velhas que max_age"""
+        if self.max_age is None:
+            return
+        oldest = time.monotonic() - self.max_age
+        while entries and entries[0][3] < oldest:
+            self._evict(topic, entries)
+
+    def read(self, topic, since=1):
+        """
+        Retrato do tópico: mensagens em cache com sequência >= since.
+
+        Returns:
+            Lista de (seq, cabecalho, corpo) em ordem de sequência
+        """
+        with self._lock:
+            entries = self.entries.get(topic)
+            if not entries:
+                return []
+            self._expire(topic, entries)
+            return [(seq, header, body) for seq, header, body, _ in entries if seq >= since]
+
+    def last_sequence(self, topic):
+        """Sequência da mensagem mais recente em cache (0 se vazio)"""
+        entries = self.entries.get(topic)
+        return entries[-1][0] if entries else 0
+
+    def __repr__(self):
+        counts = {topic: len(entries) for topic, entries in self.entries.items()}
+        return f"LastValueCache({counts}, evicted={self.evicted})"
+
+
+class SnapshotService(ReplayService):
+    """
+    Serviço ROUTER que entrega o retrato de um tópico a partir do cache.
+
+    Mesmo protocolo do ReplayService: pedido [topico, sequencia_inicial],
+    respostas [b"M", frames...] e por fim [b"E", ultima_sequencia].
+
+    Args:
+        cache: LastValueCache alimentado pelo publisher
+        address: Endereço para bind (padrão: tcp://HOST:SNAPSHOT_PORT)
+        context: zmq.Context compartilhado (None = usa a instância global)
+    """
+
+    def __init__(self, cache, address=None, context=None):
+        super().__init__(cache, address or f"tcp://{HOST}:{SNAPSHOT_PORT}", context)
+        self.cache = cache
+
+
+def request_snapshot(topic, address=None, context=None, timeout=2000):
+    """
+    Pede o retrato do tópico ao SnapshotService.
+
+    Returns:
+        Lista de protocolo.Message, da mais antiga para a mais recente
+    """
+    return list(request_replay(
+        topic, 1, address or f"tcp://{HOST}:{SNAPSHOT_PORT}", context, timeout
+    ))
@@ -1,34 +1,99 @@
+import sys
 import zmq
 import threading
 import time
+from collections import deque
 from constPS import *
+from endpoints import CHAT, connect_first, load_endpoints
+from handlers import HandlerPool
+from backpressure import configure_recv
+from console import console_from_args, default_console
+from message_log import request_replay
+from metrics import Metrics, MetricsReporter
+from protocolo import Message, SequenceTracker
+from registry import RegistryClient
+from snapshot import request_snapshot
+from topics import TopicTrie, is_pattern, subscription_filter
+
+# Corte de retrato ainda em busca: mensagens ao vivo do tópico ficam retidas
+PENDING = -1
 
 class ChatSubscriber:
     """
     Subscriber para sistema de chat em grupo baseado em tópicos.
     Permite inscrição em múltiplos tópicos/grupos simultaneamente.
+    
+    Args:
+        username: Nome do usuário
+        multipart: Recebe mensagens multipart (deve coincidir com o publisher)
+        context: zmq.Context compartilhado entre vários clientes no mesmo
+            processo (None = cria um contexto próprio)
+        hwm: Limite da fila de recebimento (ZMQ_RCVHWM)
+        conflate: Mantém apenas a última mensagem recebida (ZMQ_CONFLATE),
+            útil para tópicos de "último valor" como SISTEMA
+        snapshots: Ao se inscrever, busca as últimas mensagens do tópico no
+            SnapshotService (publisher com --retrato) antes do fluxo ao vivo;
+            requer multipart (as repetições são descartadas pela sequência)
+        address: Endpoint ou lista de endpoints; conecta no primeiro
+            utilizável (padrão: endpoints.load_endpoints())
+        console: console.ConsoleSink onde as mensagens recebidas são
+            exibidas sem bloquear o recebimento (padrão:
+            console.default_console(), compartilhado)
+        metrics: metrics.Metrics onde mensagens, bytes, perdas, tempo de
+            decodificação e latência por tópico são registrados
+        registry: registry.RegistryClient de onde vem a lista de tópicos
+            disponíveis, atualizada pelo feed de alterações do registro
     """
     
-    def __init__(self, username):
+    def __init__(self, username, multipart=False, context=None, hwm=None, conflate=False,
+                 snapshots=False, address=None, console=None, metrics=None, registry=None):
+        if snapshots and not multipart:
+            raise ValueError("snapshots requer multipart: sem sequência não há como descartar repetições")
         self.username = username
-        self.context = zmq.Context()
+        self.metrics = metrics
+        self.multipart = multipart
+        self.console = console or default_console()
+        self.context = context or zmq.Context()
         self.socket = self.context.socket(zmq.SUB)
-        self.address = f"tcp://{HOST}:{PORT}"
-        self.socket.connect(self.address)
+        configure_recv(self.socket, hwm, conflate, multipart)
+        self.address = connect_first(
+            self.socket, address or load_endpoints(), inproc=context is not None
+        )
         
         # Lista de tópicos disponíveis
-        self.available_topics = [
-            "GERAL",
-            "TECNOLOGIA", 
-            "ESPORTES",
-            "ENTRETENIMENTO",
-            "NOTICIAS",
-            "SISTEMA"
-        ]
+        self.available_topics = list(DEFAULT_TOPICS)
+        self.registry = registry
+        if registry is not None:
+            try:
+                registry.sync()
+            except zmq.Again:
+                print("Registro de tópicos indisponível: usando o catálogo local")
+            self.refresh_topics()
         
-        self.subscribed_topics = []
+        # tópico ou padrão (ex.: disciplinas.*.avisos) -> filtro do ZeroMQ
+        self.subscribed_topics = {}
+        # Padrões são inscritos pelo prefixo literal; a trie descarta o que
+        # chegar pelo prefixo sem casar com nenhuma inscrição
+        self.topic_index = TopicTrie()
+        self.wildcards = 0
         self.running = False
         
+        # Detecção de mensagens perdidas por tópico (modo multipart)
+        self.sequences = SequenceTracker()
+        
+        # tópico -> (publisher, última sequência) do retrato (PENDING durante
+        # a busca); mensagens ao vivo desse publisher até ela são duplicadas
+        # e descartadas
+        self.snapshots = snapshots
+        self.snapshot_seq = {}
+        # Mensagens ao vivo retidas durante a busca e liberadas depois dela
+        self._held = {}
+        self._released = deque()
+        self._snapshot_lock = threading.Lock()
+        
+        # Pool opcional que processa cada mensagem recebida (set_handler)
+        self.handlers = None
+        
         print("=" * 60)
         print(f"CHAT CLIENT - Usuário: {self.username}")
         print("=" * 60)
@@ -36,11 +101,20 @@ class ChatSubscriber:
         print("=" * 60)
     
     def subscribe_to_topic(self, topic):
-        """Inscreve-se em um tópico específico"""
+        """
+        Inscreve-se em um tópico específico ou em um padrão hierárquico
+        (* = um nível, # = zero ou mais níveis; ver topics.py)
+        """
         if topic not in self.subscribed_topics:
-            self.socket.setsockopt_string(zmq.SUBSCRIBE, topic)
-            self.subscribed_topics.append(topic)
+            subscription = subscription_filter(topic, self.multipart)
+            self.socket.setsockopt(zmq.SUBSCRIBE, subscription)
+            self.subscribed_topics[topic] = subscription
+            self.topic_index.add(topic)
+            if is_pattern(topic):
+                self.wildcards += 1
             print(f"✓ Inscrito no tópico: {topic}")
+            if self.snapshots and not is_pattern(topic):
+                self.load_snapshot(topic)
             return True
         else:
             print(f"✗ Já inscrito no tópico: {topic}")
@@ -49,26 +123,162 @@ class ChatSubscriber:
     def unsubscribe_from_topic(self, topic):
         """Cancela inscrição de um tópico"""
         if topic in self.subscribed_topics:
-            self.socket.setsockopt_string(zmq.UNSUBSCRIBE, topic)
-            self.subscribed_topics.remove(topic)
+            self.socket.setsockopt(zmq.UNSUBSCRIBE, self.subscribed_topics.pop(topic))
+            self.topic_index.remove(topic)
+            if is_pattern(topic):
+                self.wildcards -= 1
             print(f"✓ Desinscrição do tópico: {topic}")
             return True
         else:
             print(f"✗ Não está inscrito no tópico: {topic}")
             return False
     
+    def load_snapshot(self, topic):
+        """
+        Exibe as últimas mensagens do tópico guardadas pelo publisher.
+        
+        Deve ser chamado depois da inscrição. Enquanto o retrato é buscado,
+        recv() retém as mensagens ao vivo do tópico (mesmo com a thread de
+        recebimento já ativa); depois elas são liberadas em ordem, sem as
+        que o retrato já trouxe.
+        """
+        with self._snapshot_lock:
+            self.snapshot_seq[topic] = PENDING
+        try:
+            messages = request_snapshot(topic, context=self.context)
+        except zmq.Again:
+            print("Serviço de retrato indisponível (publisher sem --retrato?)")
+            messages = []
+        for message in messages:
+            print(f"  🕘 {message}")
+        # O retrato vem do cache de um único publisher
+        newest = max(messages, key=lambda message: message.sequence, default=None)
+        with self._snapshot_lock:
+            if newest is not None and newest.sequence:
+                self.snapshot_seq[topic] = (newest.publisher, newest.sequence)
+                self.sequences.last[(topic, newest.publisher)] = newest.sequence
+            else:
+                del self.snapshot_seq[topic]
+            # Passam de novo pelo corte em recv()
+            self._released.extend(self._held.pop(topic, ()))
+        return messages
+    
     def subscribe_to_all(self):
         """Inscreve-se em todos os tópicos disponíveis"""
         for topic in self.available_topics:
             self.subscribe_to_topic(topic)
     
+    def refresh_topics(self):
+        """Aplica as alterações do registro (salas criadas ou removidas)"""
+        if self.registry is None:
+            return
+        self.registry.poll_updates()
+        if self.registry.topics:
+            self.available_topics = self.registry.names()
+    
+    def search_topics(self, prefix, page_size=20):
+        """Busca no registro os tópicos que começam com o prefixo"""
+        if self.registry is None:
+            return [topic for topic in self.available_topics if topic.startswith(prefix)]
+        return [info["name"] for info in self.registry.search(prefix, page_size)]
+    
     def list_topics(self):
         """Lista todos os tópicos disponíveis"""
+        self.refresh_topics()
         print("\nTópicos disponíveis:")
         for i, topic in enumerate(self.available_topics, 1):
             status = "✓" if topic in self.subscribed_topics else " "
             print(f"  [{status}] {i}. {topic}")
     
+    def recv(self):
+        """
+        Recebe a próxima mensagem sem decodificá-la.
+        
+        Returns:
+            Message, cuja decodificação só acontece ao acessar seus campos;
+            no modo multipart a sequência é verificada ao receber
+        """
+        if not self.multipart:
+            while True:
+                raw = self.socket.recv()
+                started = time.perf_counter()
+                message = Message(raw)
+                if self.wildcards and not self.topic_index.match(message.topic):
+                    continue  # chegou pelo prefixo de um padrão sem casar
+                break
+            if self.metrics is not None:
+                self._record_metrics(message, started)
+            return message
+        
+        while True:
+            if self._released:
+                message = self._released.popleft()
+                started = time.perf_counter()
+            else:
+                if self._held and not self.socket.poll(50):
+                    continue  # retrato em busca: não bloqueia antes da liberação
+                frames = self.socket.recv_multipart(copy=False)
+                started = time.perf_counter()
+                message = Message.from_frames(frames)
+                if self.wildcards and not self.topic_index.match(message.topic):
+                    continue
+            if not self.snapshot_seq:
+                break
+            with self._snapshot_lock:
+                cutoff = self.snapshot_seq.get(message.topic)
+                if cutoff is None:
+                    break
+                if cutoff == PENDING:
+                    self._held.setdefault(message.topic, []).append(message)
+                    continue  # retrato em busca: entregue depois dele
+                publisher, last = cutoff
+                if message.publisher != publisher:
+                    break  # outro publisher do tópico (broker)
+                if 0 < message.sequence <= last:
+                    continue  # já entregue no retrato
+                del self.snapshot_seq[message.topic]
+                break
+        lost = self.sequences.track(message.topic, message.sequence, message.publisher)
+        if lost:
+            self.console.notice(f"{lost} mensagem(ns) perdida(s) no tópico {message.topic}", "\n⚠️  ")
+            if self.metrics is not None:
+                self.metrics.record_drop(message.topic, lost)
+        if self.metrics is not None:
+            self._record_metrics(message, started)
+        return message
+    
+    def set_handler(self, handler, workers=4, processes=False, ordered=False, max_in_flight=1000):
+        """
+        Processa cada mensagem recebida com handler(message) em um pool de
+        threads/processos, fora do laço de recebimento (ver handlers.py).
+        
+        Args:
+            ordered: Preserva a ordem das mensagens de cada tópico
+            max_in_flight: Máximo de mensagens aguardando processamento
+        """
+        self.handlers = HandlerPool(
+            handler, workers, processes, ordered, max_in_flight, self.context
+        )
+        return self.handlers
+    
+    def close_handlers(self):
+        """Aguarda as mensagens pendentes no pool de handlers e o encerra"""
+        if self.handlers is not None:
+            self.handlers.close()
+            self.handlers = None
+    
+    def _record_metrics(self, message, started):
+        """Registra tamanho, tempo de leitura do cabeçalho e latência da mensagem"""
+        topic = message.topic
+        sent_at = message.sent_at
+        decode_seconds = time.perf_counter() - started
+        latency = None if sent_at is None else time.time() - sent_at
+        self.metrics.record_message(topic, len(message), decode_seconds, latency)
+    
+    def recv_message(self):
+        """Recebe uma mensagem e retorna sua representação texto"""
+        return str(self.recv())
+    
     def receive_messages(self):
         """Thread para receber mensagens continuamente"""
         self.running = True
@@ -79,14 +289,17 @@ class ChatSubscriber:
         while self.running:
             try:
                 # Usar polling para verificar se há mensagens
-                if self.socket.poll(100):  # 100ms timeout
-                    message = self.socket.recv_string()
+                # Mensagens liberadas após um retrato não passam pelo socket
+                if self._released or self.socket.poll(100):  # 100ms timeout
+                    message = self.recv()
                     
                     # Colorir output baseado no tópico
-                    if message.startswith("SISTEMA"):
-                        print(f"\n🔔 {message}")
+                    if message.topic == "SISTEMA":
+                        self.console.notice(message, "\n🔔 ")
                     else:
-                        print(f"\n💬 {message}")
+                        self.console.message(message, "\n💬 ")
+                    if self.handlers is not None:
+                        self.handlers.submit(message)
                         
             except zmq.ZMQError as e:
                 if self.running:
@@ -95,6 +308,30 @@ class ChatSubscriber:
                 if self.running:
                     print(f"Erro inesperado: {e}")
     
+    def replay(self, topic, since=1):
+        """
+        Busca no serviço de replay as mensagens do tópico publicadas antes da
+        inscrição (publisher iniciado com --historico).
+        
+        Returns:
+            Lista de protocolo.Message em ordem de sequência
+        """
+        try:
+            return list(request_replay(topic, since, context=self.context))
+        except zmq.Again:
+            print("Serviço de histórico indisponível (publisher sem --historico?)")
+            return []
+    
+    def show_loss_stats(self):
+        """Exibe mensagens recebidas e perdidas por tópico"""
+        stats = self.sequences.stats()
+        if not stats:
+            print("\nNenhuma mensagem numerada recebida (use o modo multipart).")
+            return
+        print("\nMensagens por tópico (recebidas / perdidas / taxa de perda):")
+        for topic, (received, lost, rate) in stats.items():
+            print(f"  {topic}: {received} / {lost} / {rate:.2%}")
+    
     def show_menu(self):
         """Exibe o menu de comandos"""
         print("\n" + "=" * 60)
@@ -105,8 +342,11 @@ class ChatSubscriber:
         print("  3. desinscrever   - Desinscrever de um tópico")
         print("  4. todos          - Inscrever em todos os tópicos")
         print("  5. inscritos      - Ver tópicos inscritos")
-        print("  6. ajuda          - Mostrar este menu")
-        print("  7. sair           - Sair do chat")
+        print("  6. perdas         - Ver mensagens perdidas por tópico")
+        print("  7. historico      - Ver mensagens anteriores de um tópico")
+        print("  8. buscar         - Buscar tópicos no registro por prefixo")
+        print("  9. ajuda          - Mostrar este menu")
+        print(" 10. sair           - Sair do chat")
         print("=" * 60)
     
     def run_interactive(self):
@@ -138,7 +378,7 @@ class ChatSubscriber:
                 
                 elif command == 'inscrever':
                     self.list_topics()
-                    topic_num = input("\nNúmero do tópico: ").strip()
+                    topic_num = input("\nNúmero do tópico (ou nome/padrão, ex.: disciplinas.*.avisos): ").strip()
                     try:
                         idx = int(topic_num) - 1
                         if 0 <= idx < len(self.available_topics):
@@ -146,7 +386,10 @@ class ChatSubscriber:
                         else:
                             print("Número inválido!")
                     except ValueError:
-                        print("Digite um número válido!")
+                        if topic_num:
+                            self.subscribe_to_topic(topic_num)
+                        else:
+                            print("Digite um número válido!")
                 
                 elif command == 'desinscrever':
                     if not self.subscribed_topics:
@@ -162,7 +405,7 @@ class ChatSubscriber:
                     try:
                         idx = int(topic_num) - 1
                         if 0 <= idx < len(self.subscribed_topics):
-                            topic = self.subscribed_topics[idx]
+                            topic = list(self.subscribed_topics)[idx]
                             if topic != "SISTEMA":
                                 self.unsubscribe_from_topic(topic)
                             else:
@@ -183,6 +426,35 @@ class ChatSubscriber:
                     else:
                         print("\nVocê não está inscrito em nenhum tópico!")
                 
+                elif command == 'perdas':
+                    self.show_loss_stats()
+                
+                elif command == 'historico':
+                    self.list_topics()
+                    topic_num = input("\nNúmero do tópico: ").strip()
+                    try:
+                        idx = int(topic_num) - 1
+                        if 0 <= idx < len(self.available_topics):
+                            for message in self.replay(self.available_topics[idx]):
+                                print(f"  📜 {message}")
+                        else:
+                            print("Número inválido!")
+                    except ValueError:
+                        print("Digite um número válido!")
+                
+                elif command == 'buscar':
+                    prefix = input("\nPrefixo do tópico: ").strip()
+                    try:
+                        found = self.search_topics(prefix)
+                    except zmq.Again:
+                        print("Registro de tópicos indisponível")
+                        continue
+                    for topic in found:
+                        status = "✓" if topic in self.subscribed_topics else " "
+                        print(f"  [{status}] {topic}")
+                    if not found:
+                        print("Nenhum tópico encontrado")
+                
                 elif command == 'ajuda':
                     self.show_menu()
                 
@@ -200,13 +472,15 @@ class ChatSubscriber:
                 break
             except Exception as e:
                 print(f"Erro: {e}")
+        
+        self.close_handlers()
     
     def run_simple(self, topics=None, duration=None):
         """
         Modo simples: inscreve em tópicos específicos e recebe mensagens
         
         Args:
-            topics: Lista de tópicos para se inscrever (None = todos)
+            topics: Lista de tópicos ou padrões para se inscrever (None = todos)
             duration: Duração em segundos (None = indefinido)
         """
         # Inscrever em tópicos
@@ -214,7 +488,7 @@ class ChatSubscriber:
             self.subscribe_to_all()
         else:
             for topic in topics:
-                if topic in self.available_topics:
+                if topic in self.available_topics or is_pattern(topic):
                     self.subscribe_to_topic(topic)
         
         print("\n" + "=" * 60)
@@ -225,8 +499,10 @@ class ChatSubscriber:
         start_time = time.time()
         try:
             while True:
-                message = self.socket.recv_string()
-                print(f"📩 {message}")
+                message = self.recv()
+                self.console.message(message, "📩 ")
+                if self.handlers is not None:
+                    self.handlers.submit(message)
                 
                 # Verificar duração
                 if duration and (time.time() - start_time) >= duration:
@@ -235,6 +511,7 @@ class ChatSubscriber:
                     
         except KeyboardInterrupt:
             print("\n\n✋ Chat interrompido pelo usuário")
+        self.close_handlers()
 
 def main():
     print("=" * 60)
@@ -245,7 +522,38 @@ def main():
     if not username:
         username = "Anônimo"
     
-    subscriber = ChatSubscriber(username)
+    # python subscriber.py --multipart -> formato multipart (igual ao publisher)
+    # python subscriber.py --multipart --retrato -> mostra as últimas
+    #   mensagens ao se inscrever (requer --multipart)
+    # python subscriber.py --endpoints ipc:///tmp/chat.ipc -> escolhe o transporte
+    # python subscriber.py --amostra N -> exibe só 1 a cada N mensagens
+    # python subscriber.py --metricas -> grava metricas_<usuario>.prom
+    # python subscriber.py --registro -> tópicos do registry.py, com o
+    #   catálogo guardado em .catalogo_<usuario>.json entre execuções
+    multipart = "--multipart" in sys.argv
+    if "--retrato" in sys.argv and not multipart:
+        print("--retrato requer --multipart (publisher e subscriber)")
+        return
+    metrics = reporter = None
+    if "--metricas" in sys.argv:
+        metrics = Metrics("subscriber", username)
+        reporter = MetricsReporter(metrics, path=f"metricas_{username}.prom")
+        reporter.start()
+    registry = None
+    if "--registro" in sys.argv:
+        registry = RegistryClient(
+            feed_address=f"tcp://{HOST}:{REGISTRY_FEED_PORT}",
+            cache_path=f".catalogo_{username}.json",
+        )
+    subscriber = ChatSubscriber(
+        username,
+        multipart=multipart,
+        registry=registry,
+        console=console_from_args(sys.argv),
+        metrics=metrics,
+        snapshots="--retrato" in sys.argv,
+        address=load_endpoints(CHAT, sys.argv)
+    )
     
     print("\nEscolha o modo de operação:")
     print("1. Modo Interativo (gerenciar inscrições)")
@@ -271,6 +579,9 @@ def main():
     else:
         print("Opção inválida. Iniciando modo interativo...")
         subscriber.run_interactive()
+    
+    if reporter is not None:
+        reporter.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,129 @@
+"""
+Tabela de inscrições alimentada pelas notificações de um socket XPUB.
+
+Um socket XPUB entrega ao publisher uma mensagem para cada (des)inscrição
+dos subscribers: byte 1/0 seguido do filtro. A tabela mantém a contagem de
+inscrições por tópico e serve para:
+- não serializar mensagens de tópicos sem inscritos (ChatPublisher)
+- sincronizar a inicialização: o publisher começa a enviar assim que os
+  filtros esperados chegaram, em vez de dormir um tempo fixo (slow joiner)
+- manter o índice dos tópicos de filtro por conteúdo (filters.py)
+
+Filtros sem o terminador do tópico são prefixos (inscrições com curingas,
+ver topics.py) e casam com todos os tópicos que começam por eles.
+"""
+
+import time
+
+import zmq
+
+from filters import FilterIndex, is_filter
+from protocolo import ENCODING, topic_from_filter
+from topics import SEPARATOR
+
+
+def create_xpub(context):
+    """Cria um socket XPUB que notifica todas as (des)inscrições"""
+    socket = context.socket(zmq.XPUB)
+    # Recebe todas as (des)inscrições, não só a primeira/última
+    socket.setsockopt(zmq.XPUB_VERBOSER, 1)
+    return socket
+
+
+class SubscriptionTable:
+    """
+    Contagem de inscrições ativas por tópico ("" = inscrição em tudo).
+
+    Args:
+        socket: Socket XPUB de onde as notificações são lidas
+        exact_counts: False quando o XPUB está atrás de um broker; o XSUB do
+            broker só repassa a desinscrição do último interessado, então
+            nesse caso uma desinscrição zera o tópico
+    """
+
+    def __init__(self, socket, exact_counts=True):
+        self.socket = socket
+        self.exact_counts = exact_counts
+        self.counts = {}
+        self.prefixes = {}  # prefixo literal -> inscrições com curinga
+        self.filters = FilterIndex()
+
+    def update(self):
+        """Processa as notificações de (des)inscrição pendentes no socket"""
+        while True:
+            try:
+                event = self.socket.recv(zmq.NOBLOCK)
+            except zmq.Again:
+                return
+            if not event:
+                continue
+            raw = event[1:]
+            if not raw or raw.endswith((b" ", b"\0")):
+                counts, topic = self.counts, topic_from_filter(raw)
+            else:
+                counts, topic = self.prefixes, raw.decode(ENCODING)
+            if event[0] == 1:
+                counts[topic] = counts.get(topic, 0) + 1
+            elif not self.exact_counts or counts.get(topic, 0) <= 1:
+                counts.pop(topic, None)
+            else:
+                counts[topic] -= 1
+            if counts is self.counts and is_filter(topic):
+                if topic in counts:
+                    self.filters.add(topic)
+                else:
+                    self.filters.remove(topic)
+
+    def has_subscribers(self, topic):
+        """Indica se algum subscriber está inscrito no tópico"""
+        if topic in self.counts or "" in self.counts:
+            return True
+        prefixes = self.prefixes
+        if not prefixes:
+            return False
+        # Prefixos literais terminam em um nível: basta testar cada um
+        if topic in prefixes:
+            return True
+        end = topic.find(SEPARATOR)
+        while end >= 0:
+            if topic[:end] in prefixes or topic[:end + 1] in prefixes:
+                return True
+            end = topic.find(SEPARATOR, end + 1)
+        return False
+
+    def count(self, topic=None):
+        """Inscrições ativas no tópico (None = total em todos os tópicos)"""
+        if topic is None:
+            return sum(self.counts.values()) + sum(self.prefixes.values())
+        return self.counts.get(topic, 0)
+
+    def wait(self, expected=1, topic=None, timeout=5.0):
+        """
+        Aguarda até haver `expected` inscrições (no tópico ou no total).
+
+        Returns:
+            True se atingiu o esperado, False se o timeout expirou
+        """
+        return self._wait_until(lambda: self.count(topic) >= expected, timeout)
+
+    def wait_for_topics(self, topics, timeout=5.0):
+        """Aguarda até todos os tópicos terem ao menos um inscrito"""
+        return self._wait_until(
+            lambda: all(self.has_subscribers(topic) for topic in topics), timeout
+        )
+
+    def _wait_until(self, condition, timeout):
+        deadline = time.monotonic() + timeout
+        self.update()
+        while not condition():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.socket.poll(int(remaining * 1000) + 1):
+                return False
+            self.update()
+        return True
+
+    def __contains__(self, topic):
+        return topic in self.counts
+
+    def __repr__(self):
+        return f"SubscriptionTable({self.counts})"
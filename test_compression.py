@@ -0,0 +1,114 @@
+"""Testes da compressão por tópico (compression.py)"""
+
+import json
+import pickle
+import threading
+
+import pytest
+
+from compression import Compressor, Decompressor, MissingDictionary, is_compressed
+
+
+def body(i, priority="normal"):
+    return json.dumps({
+        "username": "Coordenador", "message": f"Aviso {i}: prazo de entrega do trabalho",
+        "metadata": {"priority": priority, "type": "notice"},
+    }).encode("utf-8")
+
+
+def test_below_threshold_is_untouched():
+    compressor = Compressor(threshold=1024, train_every=0)
+    payload = body(1)
+    assert compressor.compress("AVISOS", payload) == (payload, None)
+    assert Decompressor().decompress(payload) == payload
+
+
+def test_topic_thresholds():
+    compressor = Compressor(threshold=16, topic_thresholds={"SISTEMA": None}, train_every=0)
+    assert compressor.compress("SISTEMA", body(1)) == (body(1), None)
+    compressed, _ = compressor.compress("AVISOS", body(1))
+    assert is_compressed(compressed)
+
+
+def test_round_trip_without_dictionary():
+    compressor = Compressor(threshold=16, train_every=0)
+    compressed, announcement = compressor.compress("AVISOS", body(1) * 4)
+    assert announcement is None and is_compressed(compressed)
+    assert Decompressor().decompress(compressed) == body(1) * 4
+    assert compressor.ratio() < 1
+
+
+def test_dictionary_announcement_and_round_trip():
+    compressor = Compressor(threshold=16, train_every=5, announce_every=1000)
+    decompressor = Decompressor()
+    announcements = 0
+    for i in range(20):
+        compressed, announcement = compressor.compress("AVISOS", body(i))
+        if announcement is not None:
+            announcements += 1
+            assert decompressor.decompress(announcement) is None
+        assert bytes(decompressor.decompress(compressed)) == body(i)
+    assert announcements == 4
+    assert decompressor.missing == 0
+
+
+def test_missing_dictionary_is_not_an_announcement():
+    compressor = Compressor(threshold=16, train_every=5, announce_every=1000)
+    for i in range(5):
+        compressor.compress("AVISOS", body(i))
+    compressed, _ = compressor.compress("AVISOS", body(5, "high"))
+    decompressor = Decompressor()
+    with pytest.raises(MissingDictionary):
+        decompressor.decompress(compressed)
+    assert decompressor.missing == 1
+
+
+def test_decompressor_shared_by_threads():
+    compressors = [Compressor(threshold=16, train_every=5, announce_every=1000) for _ in range(4)]
+    decompressor = Decompressor(max_dictionaries=2)
+    errors = []
+
+    def worker(compressor, topic):
+        for i in range(200):
+            compressed, announcement = compressor.compress(topic, body(i))
+            if announcement is not None:
+                decompressor.decompress(announcement)
+            try:
+                if bytes(decompressor.decompress(compressed)) != body(i):
+                    errors.append(i)
+            except MissingDictionary:
+                pass  # dicionário descartado pelo limite: esperado aqui
+
+    threads = [threading.Thread(target=worker, args=(compressor, f"T{n}"))
+               for n, compressor in enumerate(compressors)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(decompressor.dictionaries) <= 2
+
+
+def test_decompressor_pickles_for_process_pools():
+    compressor = Compressor(threshold=16, train_every=5, announce_every=1000)
+    decompressor = Decompressor()
+    for i in range(6):
+        compressed, announcement = compressor.compress("AVISOS", body(i))
+        if announcement is not None:
+            decompressor.decompress(announcement)
+    copy = pickle.loads(pickle.dumps(decompressor))
+    assert bytes(copy.decompress(compressed)) == body(5)
+
+
+def test_announce_forces_a_resend():
+    compressor = Compressor(threshold=16, train_every=5, announce_every=1000)
+    for i in range(5):
+        compressor.compress("AVISOS", body(i))
+    assert compressor.compress("AVISOS", body(6))[1] is None
+    compressor.announce("AVISOS")
+    assert compressor.compress("AVISOS", body(7))[1] is not None
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError):
+        Compressor(algorithm="brotli")
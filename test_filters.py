@@ -0,0 +1,82 @@
+"""Testes dos filtros por conteúdo (filters.py)"""
+
+import pytest
+
+from filters import FilterIndex, base_topic, filter_topic, is_filter, parse_filter
+
+
+def test_filter_topic_is_canonical():
+    assert filter_topic("SD", username="Professor", type="file") == "SD?type=file&username=Professor"
+    assert parse_filter("SD?type=file&username=Professor") == (
+        "SD", {"type": "file", "username": "Professor"}
+    )
+    assert is_filter("AVISOS?priority=high") and not is_filter("AVISOS")
+    assert base_topic("AVISOS?priority=high") == "AVISOS"
+
+
+def test_values_are_quoted():
+    name = filter_topic("SD", username="Ana Maria&Co")
+    assert parse_filter(name) == ("SD", {"username": "Ana Maria&Co"})
+
+
+def test_invalid_filters():
+    with pytest.raises(ValueError):
+        filter_topic("SD")
+    with pytest.raises(ValueError):
+        filter_topic("SD", color="red")
+    with pytest.raises(ValueError):
+        parse_filter("SD?priority")
+
+
+def test_match_requires_every_predicate():
+    index = FilterIndex()
+    both = filter_topic("SD", type="file", username="Professor")
+    index.add(both)
+    assert index.match("SD", {"type": "file", "username": "Professor"}) == [both]
+    assert index.match("SD", {"type": "file", "username": "Aluno"}) == []
+    assert index.match("SD", {"type": "file"}) == []
+    assert index.match("BD", {"type": "file", "username": "Professor"}) == []
+
+
+def test_match_several_filters():
+    index = FilterIndex()
+    high = filter_topic("AVISOS", priority="high")
+    files = filter_topic("AVISOS", type="file")
+    high_files = filter_topic("AVISOS", priority="high", type="file")
+    for name in (high, files, high_files):
+        index.add(name)
+    assert sorted(index.match("AVISOS", {"priority": "high", "type": "file"})) == sorted(
+        [high, files, high_files]
+    )
+    assert index.match("AVISOS", {"priority": "high", "type": "poll"}) == [high]
+    assert index.match("AVISOS", {"priority": None, "type": "file"}) == [files]
+
+
+def test_values_compare_as_text():
+    index = FilterIndex()
+    index.add("SD?priority=1")
+    assert index.match("SD", {"priority": 1}) == ["SD?priority=1"]
+
+
+def test_add_ignores_invalid_and_repeated():
+    index = FilterIndex()
+    index.add("SD?color=red")
+    index.add(filter_topic("SD", type="file"))
+    index.add(filter_topic("SD", type="file"))
+    assert len(index) == 1
+
+
+def test_remove_cleans_the_index():
+    index = FilterIndex()
+    high = filter_topic("AVISOS", priority="high")
+    low = filter_topic("AVISOS", priority="low")
+    index.add(high)
+    index.add(low)
+    assert index.names("AVISOS") == [high, low]
+    index.remove(high)
+    assert index.match("AVISOS", {"priority": "high"}) == []
+    assert index.names("AVISOS") == [low]
+    index.remove(low)
+    index.remove(low)
+    assert index.topics == {}
+    assert index.names("AVISOS") == []
@@ -0,0 +1,72 @@
+"""Testes do log de mensagens e do replay (message_log.py)"""
+
+import zmq
+
+from message_log import MessageLog, ReplayService, request_replay
+
+
+def fill(log, topic, first, last, size=40):
+    for seq in range(first, last + 1):
+        log.append(topic, seq, b"", b"%d:" % seq + b"x" * size)
+
+
+def test_read_across_segments(tmp_path):
+    log = MessageLog(str(tmp_path), segment_size=100, index_interval=2)
+    fill(log, "T", 1, 10)
+    assert len(log.segments["T"]) > 1
+    assert [seq for seq, _, _ in log.read("T")] == list(range(1, 11))
+    assert [seq for seq, _, _ in log.read("T", 7)] == list(range(7, 11))
+    assert bytes(next(log.read("T", 4))[2]).startswith(b"4:")
+    log.close()
+
+
+def test_append_while_reading(tmp_path):
+    log = MessageLog(str(tmp_path), segment_size=100, index_interval=2)
+    fill(log, "T", 1, 7)
+    records = log.read("T")
+    assert next(records)[0] == 1
+    # Continua anexando (inclusive abrindo segmento novo) no meio da leitura
+    fill(log, "T", 8, 12)
+    assert [seq for seq, _, _ in records] == list(range(2, 8))
+    assert [seq for seq, _, _ in log.read("T", 6)] == list(range(6, 13))
+    log.close()
+
+
+def test_reopen_recovers_last_sequence(tmp_path):
+    log = MessageLog(str(tmp_path), segment_size=100, index_interval=3)
+    fill(log, "sala/1", 1, 9)
+    log.close()
+    reopened = MessageLog(str(tmp_path), segment_size=100, index_interval=3)
+    assert reopened.last_sequences() == {"sala/1": 9}
+    fill(reopened, "sala/1", 10, 11)
+    assert [seq for seq, _, _ in reopened.read("sala/1", 8)] == [8, 9, 10, 11]
+    reopened.close()
+
+
+def test_replay_survives_bad_requests(tmp_path):
+    context = zmq.Context()
+    log = MessageLog(str(tmp_path))
+    log.append("T", 1, b"", b"T [10:00:00] ana: oi")
+    log.append("T", 2, b"", b"T [10:00:01] ana: tudo bem?")
+    service = ReplayService(log, address="inproc://replay-test", context=context)
+    service.start()
+    try:
+        client = context.socket(zmq.DEALER)
+        client.connect("inproc://replay-test")
+        client.send_multipart([b"T", b"curto"])
+        client.send_multipart([b"so-um-frame"])
+        client.close()
+        messages = list(request_replay("T", 2, address="inproc://replay-test", context=context))
+        assert [message.raw for message in messages] == [b"T [10:00:01] ana: tudo bem?"]
+    finally:
+        service.stop()
+        log.close()
+        context.term()
+
+
+def test_since_zero_is_everything(tmp_path):
+    log = MessageLog(str(tmp_path))
+    fill(log, "T", 1, 3)
+    assert [seq for seq, _, _ in log.read("T", 0)] == [1, 2, 3]
+    assert list(log.read("desconhecido")) == []
+    log.close()
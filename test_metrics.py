@@ -0,0 +1,69 @@
+"""Testes das métricas: histograma de latências e exposição (metrics.py)"""
+
+import random
+
+from metrics import LatencyHistogram, Metrics
+
+
+def test_small_values_are_exact():
+    histogram = LatencyHistogram(precision_bits=5)
+    for micros in range(32):
+        index = histogram._index(micros)
+        assert index == micros
+        assert histogram._value(index) == micros
+
+
+def test_bucket_bounds_contain_the_value():
+    histogram = LatencyHistogram(precision_bits=5)
+    previous_index = -1
+    for micros in list(range(1, 5000)) + [2 ** 20, 2 ** 20 + 1, 10 ** 7, 2 ** 40 - 1]:
+        index = histogram._index(micros)
+        upper = histogram._value(index)
+        lower = histogram._value(index - 1) + 1
+        assert lower <= micros <= upper
+        # Erro relativo do balde limitado a 1 / 2**precision_bits
+        assert upper - lower + 1 <= max(1, micros / 32)
+        assert index >= previous_index
+        previous_index = index
+
+
+def test_powers_of_two_start_a_bucket():
+    histogram = LatencyHistogram(precision_bits=3)
+    for exponent in range(3, 30):
+        index = histogram._index(2 ** exponent)
+        assert histogram._value(index - 1) == 2 ** exponent - 1
+
+
+def test_percentiles_within_precision():
+    histogram = LatencyHistogram()
+    rng = random.Random(7)
+    samples = sorted(rng.uniform(0.0001, 0.5) for _ in range(10000))
+    for seconds in samples:
+        histogram.record(seconds)
+    for fraction in (0.5, 0.9, 0.99, 0.999):
+        exact = samples[int(fraction * len(samples)) - 1]
+        assert abs(histogram.percentile(fraction) - exact) <= exact / 32 + 1e-6
+
+
+def test_percentile_never_exceeds_max():
+    histogram = LatencyHistogram()
+    histogram.record(0.001234)
+    assert histogram.percentile(1.0) == 0.001234
+    assert histogram.count == 1
+
+
+def test_empty_and_negative():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(0.99) == 0.0
+    histogram.record(-0.5)  # relógios dessincronizados
+    assert histogram.percentile(0.5) == 0.0
+
+
+def test_prometheus_escapes_label_values():
+    metrics = Metrics("subscriber", 'ana "a"')
+    metrics.record_message('sala\\"x"\nfim', 10, 0.001, 0.002)
+    text = metrics.prometheus()
+    assert 'name="ana \\"a\\""' in text
+    assert 'topic="sala\\\\\\"x\\"\\nfim"' in text
+    # Cada amostra continua em uma única linha
+    assert all(line.startswith(("#", "chat_")) for line in text.splitlines())
@@ -0,0 +1,122 @@
+"""Testes do formato das mensagens (protocolo.py)"""
+
+import zmq
+
+from protocolo import (
+    EncodedCache, Message, SequenceTracker, encode_frames, format_text,
+)
+
+
+def test_sequence_gaps():
+    tracker = SequenceTracker()
+    assert tracker.track("T", 1) == 0
+    assert tracker.track("T", 2) == 0
+    assert tracker.track("T", 5) == 2
+    assert tracker.track("U", 7) == 0  # primeira mensagem do tópico
+    assert tracker.stats() == {"T": (3, 2, 0.4), "U": (1, 0, 0.0)}
+
+
+def test_sequence_restart_and_unnumbered():
+    tracker = SequenceTracker()
+    tracker.track("T", 10)
+    assert tracker.track("T", 1) == 0  # publisher reiniciado
+    assert tracker.track("T", 2) == 0
+    assert tracker.track("T", 0) == 0  # sem sequência: ignorada
+    assert tracker.stats() == {"T": (3, 0, 0.0)}
+    assert tracker.loss_rate("desconhecido") == 0.0
+
+
+def test_sequences_are_per_publisher():
+    # Dois publishers no mesmo tópico (broker): sequências intercaladas
+    tracker = SequenceTracker()
+    for seq in range(1, 4):
+        assert tracker.track("T", seq, publisher=7) == 0
+        assert tracker.track("T", seq + 100, publisher=9) == 0
+    assert tracker.track("T", 6, publisher=7) == 2
+    assert tracker.stats() == {"T": (7, 2, 2 / 9)}
+
+
+def multipart_message(topic, timestamp, username, body, seq=0, sent_at=None):
+    frames = encode_frames(topic, timestamp, username, body, seq, sent_at)
+    return Message.from_frames([zmq.Frame(frame) for frame in frames])
+
+
+def test_text_message_fields():
+    message = Message(format_text("GERAL", "10:00:00", "ana", "oi: tudo bem?").encode("utf-8"))
+    assert message.topic == "GERAL"
+    assert message.timestamp == "10:00:00"
+    assert message.username == "ana"
+    assert message.body == "oi: tudo bem?"
+    assert message.sequence == 0 and message.sent_at is None
+    assert str(message) == "GERAL [10:00:00] ana: oi: tudo bem?"
+
+
+def test_text_message_without_header():
+    message = Message(b"SISTEMA aviso sem remetente")
+    assert message.topic == "SISTEMA"
+    assert message.username is None and message.timestamp is None
+    assert message.body == "aviso sem remetente"
+
+
+def test_multipart_message_fields():
+    frames = encode_frames("SD", "10:00:00", "ana", "olá", seq=3, sent_at=12.5, publisher=42)
+    message = Message.from_frames([zmq.Frame(frame) for frame in frames])
+    assert message.topic == "SD" and message.publisher == 42
+    assert message.username == "ana" and message.timestamp == "10:00:00"
+    assert (message.sequence, message.sent_at) == (3, 12.5)
+    assert bytes(message.body_buffer) == "olá".encode("utf-8")
+    assert str(message) == "SD [10:00:00] ana: olá"
+    assert len(message) == sum(len(frame) for frame in message.raw)
+
+
+def test_message_is_lazy():
+    # Corpo inválido em UTF-8 só falha quando é decodificado
+    message = Message(b"T [10:00:00] ana: \xff\xfe")
+    assert message.topic == "T"
+    assert message.username == "ana"
+    assert bytes(message.body_buffer) == b"\xff\xfe"
+    multipart = multipart_message("T", "10:00:00", "ana", b"\xff\xfe", seq=1)
+    assert multipart.sequence == 1 and multipart.topic == "T"
+
+
+def test_cache_skips_small_and_text_mode():
+    cache = EncodedCache(capacity=2, multipart=True, min_size=8)
+    assert cache.get("10:00:00", "ana", "curta") == (b"[10:00:00] ana", b"curta")
+    assert not cache.entries
+    text = EncodedCache(capacity=2, min_size=0)
+    assert text.get("10:00:00", "ana", "mensagem") == (b"[10:00:00] ana: ", b"mensagem")
+    assert not text.entries
+
+
+def test_cache_promotes_reused_body_to_frame():
+    cache = EncodedCache(capacity=2, multipart=True, min_size=8)
+    message = "x" * 16
+    _, first = cache.get("10:00:00", "ana", message)
+    assert first == b"x" * 16
+    _, second = cache.get("10:00:00", "ana", message)
+    assert isinstance(second, zmq.Frame) and second.bytes == b"x" * 16
+    assert cache.get("10:00:00", "ana", message)[1] is second
+    assert (cache.hits, cache.misses) == (2, 1)
+    # Outro horário é outra entrada
+    cache.get("10:00:01", "ana", message)
+    assert cache.misses == 2
+
+
+def test_cache_evicts_least_recently_used():
+    cache = EncodedCache(capacity=2, multipart=True, min_size=8)
+    a, b, c = "a" * 16, "b" * 16, "c" * 16
+    cache.get("10:00:00", "ana", a)
+    cache.get("10:00:00", "ana", b)
+    cache.get("10:00:00", "ana", a)  # promove "a"
+    cache.get("10:00:00", "ana", c)  # descarta "b"
+    assert [entry[0] for entry in cache.entries.values()] == [a, c]
+    cache.get("10:00:00", "ana", b)
+    assert cache.misses == 4
+
+
+def test_message_from_sent_frames():
+    # Eco do publisher: frames em bytes, corpo binário exibido sem erro
+    message = Message.from_frames(encode_frames("SD", "10:00:00", "ana", b"\xff bin", seq=2))
+    assert (message.topic, message.sequence, message.username) == ("SD", 2, "ana")
+    assert str(message) == "SD [10:00:00] ana: � bin"
+    assert str(Message(b"SD [10:00:00] ana: \xff bin")) == "SD [10:00:00] ana: � bin"
@@ -0,0 +1,140 @@
+"""Testes do registro de tópicos (registry.py)"""
+
+import json
+import time
+
+import zmq
+
+from registry import RegistryClient, RegistryService, TopicRegistry
+
+
+def test_page_by_prefix_and_cursor():
+    registry = TopicRegistry()
+    for name in ("GERAL", "sd.avisos", "sd.duvidas", "sd.provas", "so.avisos"):
+        registry.register(name)
+    page, cursor = registry.page("sd.", limit=2)
+    assert [info["name"] for info in page] == ["sd.avisos", "sd.duvidas"]
+    assert cursor == "sd.duvidas"
+    page, cursor = registry.page("sd.", after=cursor, limit=2)
+    assert [info["name"] for info in page] == ["sd.provas"]
+    assert cursor is None
+    assert registry.page("xx") == ([], None)
+
+
+def test_register_is_versioned():
+    registry = TopicRegistry()
+    assert registry.register("GERAL")[0] == 1
+    assert registry.register("GERAL") == (1, None)  # nada mudou
+    assert registry.register("GERAL", "Sala geral")[1]["op"] == "add"
+    assert registry.unregister("GERAL")[1]["op"] == "remove"
+    assert registry.unregister("GERAL") == (3, None)
+    assert registry.names == []
+
+
+def test_changes_since():
+    registry = TopicRegistry(history=3)
+    for name in ("A", "B", "C", "D"):
+        registry.register(name)
+    assert [change["name"] for change in registry.changes_since(2)] == ["C", "D"]
+    assert [change["name"] for change in registry.changes_since(1)] == ["B", "C", "D"]
+    assert registry.changes_since(4) == []
+    # A alteração 1 já saiu do histórico
+    assert registry.changes_since(0) is None
+
+
+class Registry:
+    """RegistryService em inproc com um contexto próprio"""
+
+    count = 0
+
+    def __init__(self, history=1000):
+        Registry.count += 1
+        self.context = zmq.Context()
+        self.address = f"inproc://registry-test-{Registry.count}"
+        self.feed_address = f"{self.address}-feed"
+        self.service = RegistryService(TopicRegistry(history), address=self.address,
+                                       feed_address=self.feed_address, context=self.context)
+        self.service.start()
+
+    def restart(self):
+        # Um catálogo novo tem outra época, como um registro reiniciado
+        self.service.registry = TopicRegistry()
+
+    def client(self, **kwargs):
+        return RegistryClient(self.address, context=self.context, **kwargs)
+
+    def close(self):
+        self.service.stop()
+        self.context.term()
+
+
+def test_sync_applies_changes(tmp_path):
+    registry = Registry()
+    cache_path = str(tmp_path / "catalogo.json")
+    client = registry.client(cache_path=cache_path)
+    try:
+        client.register("GERAL")
+        assert client.sync() is True  # primeira sincronização
+        client.register("SD")
+        client.unregister("GERAL")
+        assert client.sync() is False
+        assert client.names() == ["SD"]
+        with open(cache_path, encoding="utf-8") as f:
+            assert json.load(f)["version"] == client.version == 3
+    finally:
+        client.close()
+        registry.close()
+
+
+def test_sync_reloads_on_new_epoch():
+    registry = Registry()
+    client = registry.client()
+    try:
+        client.register("GERAL")
+        client.sync()
+        registry.restart()
+        client.register("SD")
+        assert client.sync() is True
+        assert client.epoch == registry.service.registry.epoch
+        assert client.names() == ["SD"]
+    finally:
+        client.close()
+        registry.close()
+
+
+def test_sync_reloads_after_history_overflow():
+    registry = Registry(history=2)
+    client = registry.client()
+    try:
+        client.register("A")
+        client.sync()
+        for name in ("B", "C", "D"):
+            client.register(name)
+        client.unregister("A")
+        assert client.sync() is True  # RESET: alterações fora do histórico
+        assert client.names() == ["B", "C", "D"]
+        assert client.version == 5
+    finally:
+        client.close()
+        registry.close()
+
+
+def test_feed_gap_triggers_sync():
+    registry = Registry()
+    client = registry.client(feed_address=registry.feed_address)
+    try:
+        client.register("A")
+        client.sync()
+        service = registry.service.registry
+        # Alteração feita sem passar pelo feed: o cliente a perde
+        service.register("B")
+        client.register("C")
+        deadline = 50
+        while not client.poll_updates() and deadline:
+            time.sleep(0.02)
+            deadline -= 1
+        assert client.names() == ["A", "B", "C"]
+        assert client.version == service.version
+    finally:
+        client.close()
+        registry.close()
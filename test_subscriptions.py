@@ -0,0 +1,87 @@
+"""Testes da SubscriptionTable (subscriptions.py)"""
+
+import zmq
+
+from protocolo import topic_filter
+from subscriptions import SubscriptionTable
+from topics import subscription_filter
+
+
+class FakeXPub:
+    """Entrega notificações de (des)inscrição como um socket XPUB"""
+
+    def __init__(self):
+        self.events = []
+
+    def subscribe(self, filter_bytes):
+        self.events.append(b"\x01" + filter_bytes)
+
+    def unsubscribe(self, filter_bytes):
+        self.events.append(b"\x00" + filter_bytes)
+
+    def recv(self, flags=0):
+        if not self.events:
+            raise zmq.Again()
+        return self.events.pop(0)
+
+
+def table_with(*subscriptions, multipart=False):
+    socket = FakeXPub()
+    table = SubscriptionTable(socket)
+    for topic in subscriptions:
+        socket.subscribe(subscription_filter(topic, multipart))
+    table.update()
+    return table, socket
+
+
+def test_exact_topics():
+    table, _ = table_with("GERAL")
+    assert table.has_subscribers("GERAL")
+    assert not table.has_subscribers("GERAL.x")
+    assert not table.has_subscribers("GER")
+
+
+def test_prefix_from_one_wildcard():
+    # "disciplinas.*.avisos" é inscrito como "disciplinas."
+    table, _ = table_with("disciplinas.*.avisos")
+    assert table.prefixes == {"disciplinas.": 1}
+    assert table.has_subscribers("disciplinas.SD.avisos")
+    assert table.has_subscribers("disciplinas.BD")
+    assert not table.has_subscribers("disciplinas")
+    assert not table.has_subscribers("disciplinasX.SD")
+
+
+def test_prefix_from_many_wildcard_matches_zero_levels():
+    # "disciplinas.SD.#" é inscrito como "disciplinas.SD"
+    table, _ = table_with("disciplinas.SD.#", multipart=True)
+    assert table.has_subscribers("disciplinas.SD")
+    assert table.has_subscribers("disciplinas.SD.avisos.urgentes")
+    assert not table.has_subscribers("disciplinas.SDX")
+    assert not table.has_subscribers("disciplinas.BD")
+
+
+def test_counts_and_unsubscribe():
+    table, socket = table_with("GERAL", "GERAL", "a.*")
+    assert table.count("GERAL") == 2
+    assert table.count() == 3
+    socket.unsubscribe(topic_filter("GERAL"))
+    socket.unsubscribe(subscription_filter("a.*"))
+    table.update()
+    assert table.count("GERAL") == 1
+    assert not table.prefixes
+    assert not table.has_subscribers("a.b")
+
+
+def test_everything_subscription():
+    table, _ = table_with()
+    table.socket.subscribe(b"")
+    table.update()
+    assert table.has_subscribers("qualquer.coisa")
+
+
+def test_filter_topics_feed_the_filter_index():
+    table, socket = table_with("AVISOS?priority=high")
+    assert table.filters.match("AVISOS", {"priority": "high"}) == ["AVISOS?priority=high"]
+    socket.unsubscribe(topic_filter("AVISOS?priority=high"))
+    table.update()
+    assert len(table.filters) == 0
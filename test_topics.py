@@ -0,0 +1,90 @@
+"""Testes da TopicTrie e dos filtros de inscrição com curingas (topics.py)"""
+
+from protocolo import topic_filter
+from topics import TopicTrie, is_pattern, literal_prefix, subscription_filter
+
+
+def test_one_matches_exactly_one_level():
+    trie = TopicTrie()
+    trie.add("disciplinas.*.avisos")
+    assert trie.match("disciplinas.SD.avisos") == {"disciplinas.*.avisos"}
+    assert trie.match("disciplinas.avisos") == set()
+    assert trie.match("disciplinas.SD.BD.avisos") == set()
+
+
+def test_many_matches_zero_or_more_levels():
+    trie = TopicTrie()
+    trie.add("disciplinas.SD.#")
+    assert trie.match("disciplinas.SD") == {"disciplinas.SD.#"}
+    assert trie.match("disciplinas.SD.avisos") == {"disciplinas.SD.#"}
+    assert trie.match("disciplinas.SD.avisos.urgentes") == {"disciplinas.SD.#"}
+    assert trie.match("disciplinas.BD.avisos") == set()
+
+
+def test_many_in_the_middle():
+    trie = TopicTrie()
+    trie.add("a.#.z")
+    assert trie.match("a.z") == {"a.#.z"}
+    assert trie.match("a.b.c.z") == {"a.#.z"}
+    assert trie.match("a.b.c") == set()
+
+
+def test_match_collects_every_subscription_once():
+    trie = TopicTrie()
+    for pattern in ("a.b", "a.*", "#", "a.#"):
+        trie.add(pattern)
+    assert trie.match("a.b") == {"a.b", "a.*", "#", "a.#"}
+
+
+def test_values_identify_subscribers():
+    trie = TopicTrie()
+    trie.add("a.*", "ana")
+    trie.add("a.*", "bia")
+    trie.add("a.*", "ana")
+    assert len(trie) == 2
+    assert trie.match("a.x") == {"ana", "bia"}
+
+
+def test_remove_prunes_empty_nodes():
+    trie = TopicTrie()
+    trie.add("a.b.c")
+    trie.add("a.x")
+    assert trie.remove("a.b.c")
+    assert "b" not in trie.root.children["a"].children
+    assert "a.b.c" not in trie
+    assert trie.match("a.x") == {"a.x"}
+    assert trie.remove("a.x")
+    assert trie.root.children == {}
+    assert len(trie) == 0
+
+
+def test_remove_keeps_nodes_still_in_use():
+    trie = TopicTrie()
+    trie.add("a.b")
+    trie.add("a.b.c")
+    assert trie.remove("a.b")
+    assert trie.match("a.b.c") == {"a.b.c"}
+    assert trie.match("a.b") == set()
+
+
+def test_remove_unknown_subscription():
+    trie = TopicTrie()
+    trie.add("a.b", "ana")
+    assert not trie.remove("a.c")
+    assert not trie.remove("a.b", "bia")
+    assert not trie.remove("a")
+    assert trie.match("a.b") == {"ana"}
+
+
+def test_literal_prefix():
+    assert literal_prefix("disciplinas.*.avisos") == "disciplinas."
+    assert literal_prefix("disciplinas.SD.#") == "disciplinas.SD"
+    assert literal_prefix("#") == ""
+    assert literal_prefix("GERAL") == "GERAL"
+
+
+def test_subscription_filter():
+    assert is_pattern("a.*") and is_pattern("#") and not is_pattern("a.b")
+    assert subscription_filter("disciplinas.*.avisos") == b"disciplinas."
+    assert subscription_filter("GERAL") == topic_filter("GERAL")
+    assert subscription_filter("GERAL", multipart=True) == topic_filter("GERAL", True)
@@ -0,0 +1,150 @@
+"""
+Tópicos hierárquicos com curingas e índice de inscrições em trie.
+
+Tópicos podem ter níveis separados por ponto (disciplinas.SD.avisos) e as
+inscrições podem usar curingas por nível:
+
+    *   exatamente um nível      disciplinas.*.avisos
+    #   zero ou mais níveis      disciplinas.SD.#
+
+O filtro do ZeroMQ só entende prefixos, então um padrão é inscrito no
+socket SUB pelo seu prefixo literal (o trecho antes do primeiro curinga) e
+o restante é verificado localmente pela TopicTrie. A trie resolve um tópico
+publicado para as inscrições que casam com ele percorrendo um nó por nível:
+o custo depende da profundidade do tópico, não do número de inscrições, o
+que permite centenas de milhares de salas dinâmicas.
+"""
+
+from protocolo import ENCODING, topic_filter
+
+SEPARATOR = "."
+ONE = "*"
+MANY = "#"
+
+
+def is_pattern(topic):
+    """Indica se a inscrição usa curingas"""
+    return any(word in (ONE, MANY) for word in topic.split(SEPARATOR))
+
+
+def literal_prefix(pattern):
+    """
+    Prefixo literal de um padrão, usado como filtro do ZeroMQ.
+
+    Exemplos: "disciplinas.*.avisos" -> "disciplinas.",
+    "disciplinas.SD.#" -> "disciplinas.SD" (o # também casa com zero níveis)
+    """
+    words = pattern.split(SEPARATOR)
+    for index, word in enumerate(words):
+        if word == ONE:
+            return "".join(w + SEPARATOR for w in words[:index])
+        if word == MANY:
+            return SEPARATOR.join(words[:index])
+    return pattern
+
+
+def subscription_filter(topic, multipart=False):
+    """Filtro para zmq.SUBSCRIBE: tópico exato ou prefixo literal do padrão"""
+    if is_pattern(topic):
+        return literal_prefix(topic).encode(ENCODING)
+    return topic_filter(topic, multipart)
+
+
+class _Node:
+    __slots__ = ("children", "values")
+
+    def __init__(self):
+        self.children = {}
+        self.values = set()
+
+
+class TopicTrie:
+    """
+    Inscrições (tópicos exatos e padrões) indexadas por nível.
+
+    Cada inscrição guarda um conjunto de valores (por padrão, o próprio
+    padrão); match(topico) devolve os valores de todas as inscrições que
+    casam com o tópico.
+    """
+
+    def __init__(self):
+        self.root = _Node()
+        self.size = 0
+
+    def add(self, pattern, value=None):
+        """Registra uma inscrição; value identifica quem se inscreveu"""
+        node = self.root
+        for word in pattern.split(SEPARATOR):
+            child = node.children.get(word)
+            if child is None:
+                child = node.children[word] = _Node()
+            node = child
+        value = pattern if value is None else value
+        if value not in node.values:
+            node.values.add(value)
+            self.size += 1
+
+    def remove(self, pattern, value=None):
+        """
+        Remove uma inscrição, descartando os nós que ficarem vazios.
+
+        Returns:
+            True se a inscrição existia
+        """
+        value = pattern if value is None else value
+        path = [self.root]
+        words = pattern.split(SEPARATOR)
+        for word in words:
+            node = path[-1].children.get(word)
+            if node is None:
+                return False
+            path.append(node)
+        if value not in path[-1].values:
+            return False
+        path[-1].values.discard(value)
+        self.size -= 1
+        for depth in range(len(words), 0, -1):
+            node = path[depth]
+            if node.values or node.children:
+                break
+            del path[depth - 1].children[words[depth - 1]]
+        return True
+
+    def match(self, topic):
+        """Valores de todas as inscrições que casam com o tópico"""
+        words = topic.split(SEPARATOR)
+        last = len(words)
+        found = set()
+        pending = [(self.root, 0)]
+        while pending:
+            node, index = pending.pop()
+            children = node.children
+            many = children.get(MANY)
+            if many is not None:
+                # "#" consome de zero até todos os níveis restantes
+                for rest in range(index, last + 1):
+                    pending.append((many, rest))
+            if index == last:
+                found |= node.values
+                continue
+            child = children.get(words[index])
+            if child is not None:
+                pending.append((child, index + 1))
+            child = children.get(ONE)
+            if child is not None:
+                pending.append((child, index + 1))
+        return found
+
+    def __contains__(self, pattern):
+        node = self.root
+        for word in pattern.split(SEPARATOR):
+            node = node.children.get(word)
+            if node is None:
+                return False
+        return bool(node.values)
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return f"TopicTrie({self.size} inscrições)"